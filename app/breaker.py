@@ -0,0 +1,103 @@
+"""ホスト単位のサーキットブレーカーと、一時的な失敗の再試行方針。
+
+タイムアウトするサイトは、リクエストのたびに取得枠を10秒ふさぐ。TTL_ERROR は
+再試行を5分遅らせるだけなので、定時収集のたびに同じ枠が無駄になっていた。
+ここではホストごとに連続失敗(タイムアウト・接続エラー・5xx)を数え、
+
+- NEWS_BREAKER_THRESHOLD 回続いたらブレーカーを開き、開いている間はネットワークに
+  出ずに即座に失敗扱いにする(呼び出し側は従来どおりのフォールバック項目を返す)
+- 開いている時間は NEWS_BREAKER_OPEN_SECONDS から始めて、開くたびに倍にする
+  (上限 NEWS_BREAKER_MAX_OPEN_SECONDS)
+- 時間が過ぎたら試しに1回だけ通し(half-open)、成功すれば閉じ、失敗すれば開き直す
+
+状態は storage の host_breakers テーブルに置くので、再起動後も、複数のワーカー
+プロセス間でも共有される。試しの1回は DB 上で取り合うので、同時に2つは通らない。
+
+一時的な失敗(タイムアウト・接続エラー・502/503/504)は、同じ収集の中で
+NEWS_FETCH_RETRIES 回まで、揺らぎを入れた指数的な間隔を空けて再試行する。
+"""
+import random
+import time
+from urllib.parse import urlparse
+
+import requests
+
+from .envutil import env_int
+from . import storage
+
+BREAKER_THRESHOLD = env_int("NEWS_BREAKER_THRESHOLD", 3, minimum=1)
+BREAKER_OPEN_SECONDS = env_int("NEWS_BREAKER_OPEN_SECONDS", 300, minimum=1)
+BREAKER_MAX_OPEN_SECONDS = env_int("NEWS_BREAKER_MAX_OPEN_SECONDS", 21600, minimum=1)
+# half-open の試しのリクエストに与える時間。この間は他のワーカーは通さない
+BREAKER_PROBE_SECONDS = 60
+
+FETCH_RETRIES = env_int("NEWS_FETCH_RETRIES", 1, minimum=0)
+FETCH_RETRY_BACKOFF_MS = env_int("NEWS_FETCH_RETRY_BACKOFF_MS", 500, minimum=0)
+
+TRANSIENT_STATUS = (502, 503, 504)
+
+
+def host_of(url):
+    """ブレーカーのキー(host[:port])。http と https は同じサーバーとして扱う。"""
+    return urlparse(url).netloc.lower()
+
+
+class CircuitOpenError(Exception):
+    """ブレーカーが開いているためリクエストを送らなかった。"""
+
+    def __init__(self, host, open_until):
+        remaining = max(0, int(open_until - time.time()))
+        super().__init__(f"Circuit open for {host} ({remaining}s left)")
+        self.host = host
+        self.open_until = open_until
+
+
+def check(url):
+    """url のホストにリクエストを送ってよいか確かめる。送れなければ CircuitOpenError。
+    開いている時間が過ぎていれば、試しの1回(half-open)を取り合って勝った側だけ通す。
+    読んだ状態(記録がなければ None)を返す。record に渡すと成功時の無駄な書き込みを省ける。"""
+    host = host_of(url)
+    state = storage.get_breaker(host)
+    if not state or state["open_until"] is None:
+        return state
+    now = time.time()
+    if now < state["open_until"]:
+        raise CircuitOpenError(host, state["open_until"])
+    if not storage.claim_breaker_probe(host, now, now + BREAKER_PROBE_SECONDS):
+        raise CircuitOpenError(host, state["probe_until"] or now)
+    return state
+
+
+def is_failure(result):
+    """ブレーカーが数える失敗か(タイムアウト・接続エラー・5xx)。"""
+    if isinstance(result, Exception):
+        return isinstance(result, (requests.Timeout, requests.ConnectionError))
+    return getattr(result, "status_code", 0) >= 500
+
+
+def is_transient(result):
+    """同じ収集の中で再試行してよい一時的な失敗か。"""
+    if isinstance(result, Exception):
+        return isinstance(result, (requests.Timeout, requests.ConnectionError))
+    return getattr(result, "status_code", None) in TRANSIENT_STATUS
+
+
+_UNKNOWN = object()
+
+
+def record(url, result, state=_UNKNOWN):
+    """リクエストの結果をブレーカーに反映する(失敗にも成功にも数えない例外は無視)。
+    state は送る前に check が返した状態。記録がなかった(None)ホストの成功では、
+    消すものがないので DB に書き込まない(成功のたびに書き込みロックを取らないため)。"""
+    host = host_of(url)
+    if is_failure(result):
+        storage.record_breaker_failure(
+            host, BREAKER_THRESHOLD, BREAKER_OPEN_SECONDS, BREAKER_MAX_OPEN_SECONDS
+        )
+    elif not isinstance(result, Exception) and state is not None:
+        storage.record_breaker_success(host)
+
+
+def retry_delay(attempt):
+    """attempt 回目(0 始まり)の再試行までの待ち秒数(0.5〜1.5 倍の揺らぎ付き)。"""
+    return FETCH_RETRY_BACKOFF_MS / 1000 * (2 ** attempt) * random.uniform(0.5, 1.5)
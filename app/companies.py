@@ -5,14 +5,18 @@ COMPANIES = [
         "url": "https://www.7andi.com/company/news/2026.html", 
         "scraper_type": "auto",
         "badge_color": "#EA5514",
-        "date_format": "%Y年%m月%d日"
+        "date_format": "%Y年%m月%d日",
+        "early_stop": True,
+        "date_span": ("2026-01-01", "2026-12-31")
     },
     {
         "id": "seven_2025", "name": "セブン&アイ・HD(2025)", "category": "コンビニ",
         "url": "https://www.7andi.com/company/news/2025.html",
         "scraper_type": "auto",
         "badge_color": "#EA5514",
-        "date_format": "%Y年%m月%d日"
+        "date_format": "%Y年%m月%d日",
+        "early_stop": True,
+        "date_span": ("2025-01-01", "2025-12-31")
     },
     # 【修正】URLを 2026.html に戻しました
     {
@@ -20,14 +24,18 @@ COMPANIES = [
         "url": "https://www.sej.co.jp/company/news_release/news/2026.html",
         "scraper_type": "auto",
         "badge_color": "#EA5514",
-        "date_format": "%Y.%m.%d"
+        "date_format": "%Y.%m.%d",
+        "early_stop": True,
+        "date_span": ("2026-01-01", "2026-12-31")
     },
     {
         "id": "seven_sej_2025", "name": "セブン-イレブン(2025)", "category": "コンビニ",
         "url": "https://www.sej.co.jp/company/news_release/news/2025.html",
         "scraper_type": "auto",
         "badge_color": "#EA5514",
-        "date_format": "%Y.%m.%d"
+        "date_format": "%Y.%m.%d",
+        "early_stop": True,
+        "date_span": ("2025-01-01", "2025-12-31")
     },
     {
         "id": "famima", "name": "ファミリーマート", "category": "コンビニ",
@@ -42,14 +50,18 @@ COMPANIES = [
         "url": "https://www.ministop.co.jp/corporate/release/2026.html",
         "scraper_type": "auto",
         "badge_color": "#FFD200",
-        "date_format": "%Y.%m.%d"
+        "date_format": "%Y.%m.%d",
+        "early_stop": True,
+        "date_span": ("2026-01-01", "2026-12-31")
     },
     {
         "id": "ministop_2025", "name": "ミニストップ(2025)", "category": "コンビニ",
         "url": "https://www.ministop.co.jp/corporate/release/2025.html",
         "scraper_type": "auto",
         "badge_color": "#FFD200",
-        "date_format": "%Y.%m.%d"
+        "date_format": "%Y.%m.%d",
+        "early_stop": True,
+        "date_span": ("2025-01-01", "2025-12-31")
     },
     {
         "id": "lawson", "name": "ローソン", "category": "コンビニ",
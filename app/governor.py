@@ -0,0 +1,113 @@
+"""メモリ使用量を見て収集の同時実行数を調整するガバナー。
+
+NEWS_FETCH_MAX_WORKERS を固定値にすると、小さいホスティング環境ではメモリ超過で
+落ちないよう手で下げることになり、空いている日も少ない並列数のままになる。
+ここでは収集中にプロセスの RSS をサンプリングし、上限(NEWS_MEMORY_CEILING_MB)に
+近づいたら同時に取得・解析するページ数を半分に減らし、余裕が戻ったら1つずつ戻す
+(上限は NEWS_FETCH_MAX_WORKERS)。
+
+上限を設定しなければ、コンテナ(cgroup)のメモリ上限があればその 80% を使う。
+どちらもなければ調整は行わず、従来どおり NEWS_FETCH_MAX_WORKERS 件で動く。
+RSS が読めない環境(/proc のない OS)でも調整は行わない。
+"""
+import os
+import time
+
+from .envutil import env_int
+
+MEMORY_CEILING_MB = env_int("NEWS_MEMORY_CEILING_MB", 0, minimum=0)
+# cgroup の上限から自動で決めるときの割合(%)
+CGROUP_CEILING_PERCENT = 80
+# 上限に対する割合(%)。HIGH を超えたら減らし、LOW を下回ったら増やす
+HIGH_WATERMARK_PERCENT = 90
+LOW_WATERMARK_PERCENT = 70
+# サンプリングの最小間隔(秒)。増やすのもこの間隔に1つまで
+SAMPLE_INTERVAL_SECONDS = 0.5
+
+CGROUP_LIMIT_FILES = (
+    "/sys/fs/cgroup/memory.max",                    # cgroup v2
+    "/sys/fs/cgroup/memory/memory.limit_in_bytes",  # cgroup v1
+)
+# cgroup v1 で「上限なし」を表す値はページ境界に丸めた巨大な数になる
+CGROUP_UNLIMITED_BYTES = 1 << 60
+
+
+def rss_bytes():
+    """このプロセスの現在の RSS(バイト)。読めなければ None。"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def cgroup_limit_bytes():
+    """コンテナ(cgroup)のメモリ上限(バイト)。上限がない・読めなければ None。"""
+    for path in CGROUP_LIMIT_FILES:
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value == "max":
+            return None
+        try:
+            limit = int(value)
+        except ValueError:
+            continue
+        return limit if 0 < limit < CGROUP_UNLIMITED_BYTES else None
+    return None
+
+
+def memory_ceiling_bytes():
+    """調整の基準にするメモリ上限(バイト)。設定も cgroup の上限もなければ None。"""
+    if MEMORY_CEILING_MB:
+        return MEMORY_CEILING_MB * 1024 * 1024
+    limit = cgroup_limit_bytes()
+    if limit is None:
+        return None
+    return limit * CGROUP_CEILING_PERCENT // 100
+
+
+class MemoryGovernor:
+    """同時実行数の上限(limit)を RSS に合わせて 1〜maximum の間で上下させる。
+    1回の収集(fetch_news)ごとに作り、判断の記録は logs に残す。"""
+
+    def __init__(self, maximum, ceiling=None, sample=None, clock=time.monotonic):
+        self.maximum = maximum
+        self.limit = maximum
+        self.ceiling = ceiling
+        self.logs = []
+        self._sample = sample or rss_bytes
+        self._clock = clock
+        self._sampled_at = None
+
+    @property
+    def enabled(self):
+        return self.ceiling is not None
+
+    def observe(self):
+        """RSS をサンプリングして limit を調整する(間隔内の呼び出しは何もしない)。
+        limit を変えたら True。"""
+        if not self.enabled:
+            return False
+        now = self._clock()
+        if self._sampled_at is not None and now - self._sampled_at < SAMPLE_INTERVAL_SECONDS:
+            return False
+        self._sampled_at = now
+        used = self._sample()
+        if used is None:
+            return False
+        previous = self.limit
+        if used * 100 >= self.ceiling * HIGH_WATERMARK_PERCENT:
+            self.limit = max(1, self.limit // 2)
+        elif used * 100 <= self.ceiling * LOW_WATERMARK_PERCENT:
+            self.limit = min(self.maximum, self.limit + 1)
+        if self.limit == previous:
+            return False
+        self.logs.append(
+            f"Memory governor: RSS {used // 1048576} MB / ceiling {self.ceiling // 1048576} MB. "
+            f"Concurrency {previous} -> {self.limit}."
+        )
+        return True
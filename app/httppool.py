@@ -0,0 +1,130 @@
+"""ホスト単位で使い回す HTTP セッションのプール。
+
+以前は 1 URL ごとに requests.Session を作って閉じていたため、同じホストの
+ページ(7andi.com / sej.co.jp / ministop.co.jp の年別ページなど)でも毎回
+DNS・TCP・TLS をやり直していた。ここではホストごとに Session を貸し出し・返却し、
+keep-alive 接続(REQUEST_HEADERS の Connection: keep-alive)を実際に再利用させる。
+
+- requests.Session は複数スレッドからの同時利用を保証しないため、貸し出し中の
+  Session は借り手が専有する(同じホストへの同時アクセスには別の Session を渡す)
+- ホストごとに待機させておく Session は NEWS_HTTP_POOL_PER_HOST 個まで。超えた分は閉じる
+- NEWS_HTTP_POOL_IDLE_SECONDS 秒使われなかった Session は閉じる(相手サーバーも
+  いずれ接続を切るため、古い接続を抱え続けない)
+- 待機させるホスト数は NEWS_HTTP_POOL_MAX_HOSTS まで。超えたら最も古いホストから閉じる
+
+共有インスタンスは scraper.HTTP_POOL。NewsScraper はインスタンスごとではなく
+このプールから Session を借りるので、スケジューラの定時収集と画面からの
+オンデマンド収集が同じ接続を使い回す。
+"""
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+
+from .envutil import env_int
+
+POOL_PER_HOST = env_int("NEWS_HTTP_POOL_PER_HOST", 2, minimum=1)
+POOL_IDLE_SECONDS = env_int("NEWS_HTTP_POOL_IDLE_SECONDS", 60, minimum=0)
+POOL_MAX_HOSTS = env_int("NEWS_HTTP_POOL_MAX_HOSTS", 64, minimum=1)
+
+
+def host_key(url):
+    """プールのキー(scheme + host[:port])。"""
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc.lower()}"
+
+
+class SessionPool:
+    def __init__(self, headers=None, per_host=POOL_PER_HOST, idle_seconds=POOL_IDLE_SECONDS,
+                 max_hosts=POOL_MAX_HOSTS):
+        self.headers = dict(headers or {})
+        self.per_host = per_host
+        self.idle_seconds = idle_seconds
+        self.max_hosts = max_hosts
+        self._lock = threading.Lock()
+        # {host: [(session, 返却時刻), ...]}。最近使ったホストほど末尾
+        self._idle = OrderedDict()
+
+    def _new_session(self):
+        session = requests.Session()
+        session.headers.update(self.headers)
+        return session
+
+    def acquire(self, url):
+        """url のホスト向けの Session を借りる。待機中のものがなければ新しく作る。"""
+        key = host_key(url)
+        session = None
+        with self._lock:
+            expired = self._evict_expired_locked(time.monotonic())
+            entries = self._idle.get(key)
+            if entries:
+                session, _ = entries.pop()
+                if not entries:
+                    del self._idle[key]
+        for s in expired:
+            s.close()
+        return session or self._new_session()
+
+    def release(self, url, session):
+        """借りた Session を返す。枠が埋まっていれば閉じる。"""
+        key = host_key(url)
+        to_close = []
+        with self._lock:
+            entries = self._idle.setdefault(key, [])
+            self._idle.move_to_end(key)
+            if len(entries) < self.per_host:
+                entries.append((session, time.monotonic()))
+            else:
+                to_close.append(session)
+            while len(self._idle) > self.max_hosts:
+                _host, old = self._idle.popitem(last=False)
+                to_close.extend(s for s, _ in old)
+        for s in to_close:
+            s.close()
+
+    @contextmanager
+    def session(self, url):
+        """with POOL.session(url) as s: ... の形で借りて必ず返す。"""
+        session = self.acquire(url)
+        try:
+            yield session
+        except BaseException:
+            # 途中で失敗した Session は接続状態が不明なので使い回さない
+            session.close()
+            raise
+        else:
+            self.release(url, session)
+
+    def _evict_expired_locked(self, now):
+        expired = []
+        for key in list(self._idle):
+            entries = self._idle[key]
+            keep = []
+            for s, released_at in entries:
+                if now - released_at > self.idle_seconds:
+                    expired.append(s)
+                else:
+                    keep.append((s, released_at))
+            if keep:
+                self._idle[key] = keep
+            else:
+                del self._idle[key]
+        return expired
+
+    def idle_count(self, url=None):
+        """待機中の Session 数(url 指定時はそのホストぶん)。"""
+        with self._lock:
+            if url is not None:
+                return len(self._idle.get(host_key(url), []))
+            return sum(len(v) for v in self._idle.values())
+
+    def close(self):
+        """待機中の Session をすべて閉じる。"""
+        with self._lock:
+            entries = [s for v in self._idle.values() for s, _ in v]
+            self._idle.clear()
+        for s in entries:
+            s.close()
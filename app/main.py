@@ -31,9 +31,12 @@ STALE_ACTIVE_WINDOW_DAYS = 60
 
 def _stale_source_warnings(selected_ids, today):
     company_map = {c["id"]: c for c in COMPANIES}
+    today_str = today.strftime("%Y-%m-%d")
+    # date_span が終わった年別ページは新着がなくて当然なので警告しない
     normal_ids = [
         cid for cid in selected_ids
         if cid in company_map and company_map[cid].get("scraper_type") != "force_link"
+        and (company_map[cid].get("date_span") or (None, today_str))[1] >= today_str
     ]
     warnings = []
     for cid, last_date in storage.last_item_dates(normal_ids).items():
@@ -71,6 +74,10 @@ def script_safe_json(obj):
     return json.dumps(obj, ensure_ascii=False).replace("<", "\\u003c")
 
 
+def _format_collected(last_collected):
+    return datetime.fromtimestamp(last_collected).strftime("%m/%d %H:%M") if last_collected else None
+
+
 # ==========================================
 #  UI生成ロジック
 # ==========================================
@@ -124,12 +131,11 @@ def read_root(request: Request, start_date: str = Query(None), end_date: str = Q
     start_date_str = start_date if start_date and DATE_PARAM_RE.match(start_date) else today_str
     end_date_str = end_date if end_date and DATE_PARAM_RE.match(end_date) else today_str
 
-    items, logs, checked_names, last_collected = service.get_news(
+    # 古くなった企業も保存済みの内容ですぐ表示し、再収集はバックグラウンドで行う
+    # (画面は /refresh で完了を確認して差し替える)
+    items, logs, checked_names, last_collected, refreshing = service.serve_news(
         selected_ids, start_date_str, end_date_str, force=(force == "1")
     )
-    last_collected_str = (
-        datetime.fromtimestamp(last_collected).strftime("%m/%d %H:%M") if last_collected else None
-    )
 
     return templates.TemplateResponse(
         request=request,
@@ -142,7 +148,8 @@ def read_root(request: Request, start_date: str = Query(None), end_date: str = Q
             "items_json": script_safe_json(items),
             "checked_names_json": script_safe_json(checked_names),
             "logs": logs,
-            "last_collected": last_collected_str,
+            "last_collected": _format_collected(last_collected),
+            "refreshing_json": script_safe_json(refreshing),
             "ai_enabled": ai.is_enabled(),
             "stale_warnings": _stale_source_warnings(selected_ids, today),
         },
@@ -155,6 +162,28 @@ def read_root(request: Request, start_date: str = Query(None), end_date: str = Q
     )
 
 
+@app.get("/refresh")
+def get_refresh(start_date: str = Query(None), end_date: str = Query(None), companies: list[str] = Query(None)):
+    """バックグラウンドで再収集中の企業の状況を返す(画面が数秒おきに呼ぶ)。
+    pending が空になったら items を表示に反映する。DB と処理中の状態を読むだけで、
+    収集や再収集の予約はしない。"""
+    today_str = datetime.now().strftime("%Y-%m-%d")
+    start_date_str = start_date if start_date and DATE_PARAM_RE.match(start_date) else today_str
+    end_date_str = end_date if end_date and DATE_PARAM_RE.match(end_date) else today_str
+    valid_ids = {c["id"] for c in COMPANIES}
+    selected_ids = [cid for cid in (companies or []) if cid in valid_ids]
+
+    items, checked_names, last_collected, pending = service.refresh_status(
+        selected_ids, start_date_str, end_date_str
+    )
+    return JSONResponse({
+        "pending": pending,
+        "items": items,
+        "checked_names": checked_names,
+        "last_collected": _format_collected(last_collected),
+    }, headers={"Cache-Control": "no-store"})
+
+
 @app.get("/digest")
 def get_digest(start_date: str = Query(None), end_date: str = Query(None), companies: list[str] = Query(None)):
     """収集済みニュース(SQLite)から AI ダイジェストを生成して返す。
@@ -168,9 +197,8 @@ def get_digest(start_date: str = Query(None), end_date: str = Query(None), compa
     valid_ids = {c["id"] for c in COMPANIES}
     selected_ids = [cid for cid in (companies or []) if cid in valid_ids] or [c["id"] for c in COMPANIES]
 
-    items = []
-    for cid in selected_ids:
-        items.extend(storage.get_items(cid, start_date_str, end_date_str))
+    stored = storage.get_items_bulk(selected_ids, start_date_str, end_date_str)
+    items = [item for cid in selected_ids for item in stored.get(cid, [])]
     items.sort(key=lambda i: i["date"])
 
     if not items:
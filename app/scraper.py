@@ -1,17 +1,36 @@
+import asyncio
+import bisect
+import codecs
+import functools
+import hashlib
+import mmap
+import multiprocessing
 import os
 import re
+import tempfile
+import threading
+import time
 import unicodedata
 import xml.etree.ElementTree as ET
-from concurrent.futures import ThreadPoolExecutor
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
 from email.utils import parsedate_to_datetime
+from html.parser import HTMLParser
 from urllib.parse import urljoin, urlparse, urlunparse
-import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, CData, NavigableString, SoupStrainer, Tag
+from bs4.builder import builder_registry
+from requests.compat import chardet
+import soupsieve
 
 # companies.py から設定を読み込む
 from .companies import COMPANIES
 from .envutil import env_int
+from . import breaker, storage
+from .governor import MemoryGovernor, memory_ceiling_bytes
+from .httppool import SessionPool, host_key
+from .singleflight import SingleFlight
 
 # 日付抽出用の正規表現(要素ごとに再コンパイルしないよう事前コンパイル)
 DATE_FLEX_FINDALL_RE = re.compile(r"\d{4}\s*[./年]\s*\d{1,2}\s*[./月]\s*\d{1,2}")
@@ -35,19 +54,198 @@ MAX_FETCH_BYTES = 3_000_000
 # 1ページから解析する HTML の上限文字数(デコード後の第2の防衛線)
 MAX_HTML_CHARS = 2_000_000
 
-# 同時に張る接続数の上限(相手サイトはすべて別ドメインなので各サイトへは1接続)。
+# これより大きい本文は受信しながら一時ファイルに書き出し、解析時はメモリマップから
+# デコードする(チャンクのリストと連結後のバイト列がメモリに同時に載らないように)。
+# 小さいページは従来どおりメモリ上で扱う。0 なら空でない本文はすべて一時ファイルへ
+SPOOL_THRESHOLD_BYTES = env_int("NEWS_SPOOL_THRESHOLD_KB", 256, minimum=0) * 1024
+
+# 同時に張る接続数の上限(全ホスト合計)。
 # 同時並列数が多いほどピーク時のメモリ使用量が増える(小さいホスティング環境では
 # メモリ超過の原因になりうる)ため、環境変数 NEWS_FETCH_MAX_WORKERS で調整可能。
+# メモリの上限が分かる環境では、収集中は governor.MemoryGovernor がこの値を最大として
+# 同時実行数を上下させる。
 # 不正値は既定値5にフォールバックし、0以下は1に切り上げる(envutil.env_int)
 FETCH_MAX_WORKERS = env_int("NEWS_FETCH_MAX_WORKERS", 5, minimum=1)
 
+# 同じホストへの同時接続数と、同じホストへのリクエスト開始の最小間隔(ミリ秒)。
+# 年別ページのように1つのホストに複数の情報源がある(7andi.com / sej.co.jp /
+# ministop.co.jp など)ため、同じサーバーへ一度に押しかけてアクセス拒否(403)を
+# 招かないようにする。順番待ちの間も全体の枠は他のホストの取得に使う
+FETCH_PER_HOST = env_int("NEWS_FETCH_PER_HOST", 1, minimum=1)
+FETCH_HOST_INTERVAL_MS = env_int("NEWS_FETCH_HOST_INTERVAL_MS", 1000, minimum=0)
+
+# HTML 解析を行うプロセスプールのワーカー数。0(既定)ならプロセスプールを使わず
+# 取得用のスレッドで1件ずつ解析する。解析は GIL に縛られ1コアしか使えないため、
+# 取得後の解析が律速になる多コア環境では 2 以上にすると全コアを使える。
+# 結果は直列の場合と同一。ワーカー1つあたりのメモリ上限(MB, 0 で無制限)と、
+# メモリ断片化を避けるためワーカーを作り直すまでの処理件数も調整できる
+PARSE_WORKERS = env_int("NEWS_PARSE_WORKERS", 0, minimum=0)
+PARSE_WORKER_MEMORY_MB = env_int("NEWS_PARSE_WORKER_MEMORY_MB", 1024, minimum=0)
+PARSE_WORKER_MAX_TASKS = env_int("NEWS_PARSE_WORKER_MAX_TASKS", 50, minimum=1)
+
+# HTML の解析に使う BeautifulSoup のツリービルダー。既定は標準ライブラリの
+# html.parser(追加インストール不要だが遅くメモリも食う)。lxml をインストールして
+# NEWS_HTML_PARSER=lxml にすると C 実装で高速に解析できる。companies.py の各社設定の
+# "parser" キーで情報源ごとにも指定でき、そちらが優先。指定したビルダーが
+# インストールされていなければ html.parser で解析する
+DEFAULT_HTML_PARSER = "html.parser"
+HTML_PARSER = os.environ.get("NEWS_HTML_PARSER", DEFAULT_HTML_PARSER).strip() or DEFAULT_HTML_PARSER
+
+# companies.py の "region"(ニュース一覧の入れ物の指定)があるとき、フィードの宣言を
+# 探すために別途解析する <head> の範囲。</head> が見つからなければ先頭からこの文字数まで
+HEAD_END_RE = re.compile(r"</head\s*>", re.IGNORECASE)
+HEAD_SCAN_CHARS = 65536
+
+# ホスト単位で Session(keep-alive 接続)を使い回すプール。プロセス内で共有し、
+# 定時収集とオンデマンド収集、複数回の収集をまたいで接続を再利用する
+HTTP_POOL = SessionPool(REQUEST_HEADERS)
+
+# 取得中のページ(企業・URL・期間)。同時に来た収集は取得・解析を1回にまとめて結果を共有する
+_PAGE_FLIGHTS = SingleFlight()
+
 # フィード(RSS/Atom)自動発見の対象となる <link> の type 属性値
 FEED_LINK_TYPES = ("application/rss+xml", "application/atom+xml")
 
+# 文字コード判定: <meta charset> を探す先頭バイト数と、宣言値の読み替え。
+# 日本のサイトが宣言する Shift_JIS は実際には Windows 拡張(丸数字など)を含むことが多く、
+# 宣言どおり厳密な shift_jis で読むと文字化けするため上位互換の cp932 で読む
+# (latin-1 / ascii も同様に cp1252 で読む。ブラウザと同じ扱い)
+META_CHARSET_SCAN_BYTES = 4096
+META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_\-:.]+)""", re.IGNORECASE)
+CONTENT_TYPE_CHARSET_RE = re.compile(r"""charset\s*=\s*["']?\s*([A-Za-z0-9_\-:.]+)""", re.IGNORECASE)
+ENCODING_SUPERSETS = {"shift_jis": "cp932", "iso8859-1": "cp1252", "ascii": "cp1252"}
+ENCODING_ALIASES = {"windows-31j": "cp932", "x-sjis": "cp932"}
+BOM_ENCODINGS = ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
+
+# 早期打ち切り(companies.py の "early_stop": True の情報源)で、ダウンロードを
+# 止めるまでに続けて見る「期間より古い日付」の数
+EARLY_STOP_OLDER_DATES = 5
+
+# フィード優先の収集: 使えることを確認済みのフィードがある情報源は一覧ページより先に
+# フィードを読む。HTML もこの時間(時間単位)ごとに1回は読み、フィード候補の発見と
+# 確認をやり直す。0 でフィード優先を無効化(HTML から0件のときのフォールバックのみ)
+FEED_HTML_CHECK_HOURS = env_int("NEWS_FEED_HTML_CHECK_HOURS", 24, minimum=0)
+
+# 汎用ロジックで日付を探す要素
+GENERIC_TARGET_TAGS = ('dt', 'dd', 'li', 'div', 'p', 'span', 'time', 'td', 'tr')
+
 # 日付の隣にある「タイトルではないリンク」を拾わないための除外語
 SIBLING_LINK_IGNORE = {"一覧を見る", "もっと見る", "詳しくはこちら", "詳細はこちら", "続きを読む", "一覧へ", "READ MORE"}
 
 
+def _normalize_encoding(name):
+    """宣言された文字コード名を Python のコーデック名にする(未知の名前は None)。"""
+    if isinstance(name, bytes):
+        name = name.decode("ascii", "ignore")
+    try:
+        name = name.strip().lower()
+        codec = codecs.lookup(ENCODING_ALIASES.get(name, name)).name
+    except (LookupError, AttributeError):
+        return None
+    return ENCODING_SUPERSETS.get(codec, codec)
+
+
+def declared_encoding(body, content_type=None):
+    """本文と Content-Type から宣言済みの文字コードを探す(BOM → ヘッダー → 先頭の
+    <meta charset>)。見つからなければ None(呼び出し側が統計的な判定に回す)。"""
+    for bom, encoding in BOM_ENCODINGS:
+        if body[:len(bom)] == bom:  # メモリマップの本文には startswith がない
+            return encoding
+    if content_type:
+        match = CONTENT_TYPE_CHARSET_RE.search(content_type)
+        encoding = match and _normalize_encoding(match.group(1))
+        if encoding:
+            return encoding
+    match = META_CHARSET_RE.search(body[:META_CHARSET_SCAN_BYTES])
+    encoding = match and _normalize_encoding(match.group(1))
+    if encoding:
+        # ASCII 互換のバイト列の中で UTF-16 を名乗るのは誤り(ブラウザも UTF-8 として読む)
+        return "utf-8" if encoding.startswith("utf-16") else encoding
+    return None
+
+
+# companies.py の date_format の書式指定子と、それに対応する正規表現
+DATE_FORMAT_FIELDS = {"%Y": r"(?P<y>\d{4})", "%m": r"(?P<m>\d{1,2})", "%d": r"(?P<d>\d{1,2})"}
+DATE_FORMAT_TOKEN_RE = re.compile(r"(%.)")
+
+
+@functools.lru_cache(maxsize=None)
+def date_matcher(date_format):
+    """情報源の date_format(例: "%Y年%m月%d日")から、その書式の日付だけに合う正規表現を作る。
+    区切り文字の前後の空白は許す(索引のテキストは文字列片を空白でつなぐため)。
+    年月日の3つがそろわない書式や、ほかの書式指定子を含む書式は None(汎用の正規表現を使う)。"""
+    if not date_format:
+        return None
+    pattern = []
+    fields = set()
+    for token in DATE_FORMAT_TOKEN_RE.split(unicodedata.normalize("NFKC", date_format)):
+        if token in DATE_FORMAT_FIELDS:
+            if token in fields:
+                return None
+            fields.add(token)
+            pattern.append(DATE_FORMAT_FIELDS[token])
+        elif token.startswith("%"):
+            return None
+        elif token.strip():
+            pattern.append(r"\s*" + re.escape(token.strip()) + r"\s*")
+        elif token:
+            pattern.append(r"\s*")
+    if len(fields) != 3:
+        return None
+    return re.compile("".join(pattern).removeprefix(r"\s*").removesuffix(r"\s*"))
+
+
+def _match_date(match):
+    """日付の正規表現(date_matcher / DATE_FLEX_CAPTURE_RE)の一致を YYYY-MM-DD にする。"""
+    groups = match.groupdict()
+    y, m, d = (groups["y"], groups["m"], groups["d"]) if groups else match.groups()
+    return f"{y}-{int(m):02d}-{int(d):02d}"
+
+
+# 期間外の日付の記事も取る(harvest)ときに使う、すべての日付を含む範囲
+HARVEST_RANGE = ("0000-00-00", "9999-99-99")
+
+# 抽出ロジック(_extract_items・parse_page)の版。抽出結果が変わる修正をしたら上げる。
+# 保存済みの抽出結果(本文ハッシュ一致時の再利用)と抽出レシピは同じ版のものだけ使う
+EXTRACTOR_VERSION = 1
+
+# 網羅する期間を求めるとき、新しい順の並びの続きとみなす記事の日付の間隔(日数)の上限。
+# これより離れた古い記事(フッターの「改定」日付など)から先は網羅しているとみなさない
+HARVEST_MAX_GAP_DAYS = 31
+
+
+def _days_between(older, newer):
+    return (datetime.strptime(newer, "%Y-%m-%d") - datetime.strptime(older, "%Y-%m-%d")).days
+
+
+def harvest_span(dates, start_date_str, end_date_str, complete=True, today_str=None):
+    """ページ(フィード)から取れた記事の日付(ページ上の順)から、そのページが網羅して
+    いると言える期間 (first, last) を返す。
+
+    先頭から新しい順に途切れず並ぶ記事(間隔が HARVEST_MAX_GAP_DAYS 日以内)のうち
+    最も古い日付を oldest とすると、oldest の翌日から今日までの記事はすべて載っている
+    (oldest の日そのものは「直近 N 件」の一覧で途中から切れていることがあるので含めない)。
+    それが要求された期間とつながっていれば (min(開始, oldest の翌日), max(終了, 今日))。
+    本文を途中で読み止めた(complete でない)・先頭が最新の記事でない・記事がない・
+    期間とつながらないときは、従来どおり要求された期間だけ。"""
+    if not complete or not dates or dates[0] != max(dates):
+        return start_date_str, end_date_str
+    oldest = dates[0]
+    for newer, older in zip(dates, dates[1:]):
+        if older > newer or _days_between(older, newer) > HARVEST_MAX_GAP_DAYS:
+            break
+        oldest = older
+    first = (datetime.strptime(oldest, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+    if _days_between(end_date_str, first) > 1:
+        return start_date_str, end_date_str
+    today_str = today_str or datetime.now().strftime("%Y-%m-%d")
+    return min(start_date_str, first), max(end_date_str, today_str)
+
+
+def _in_range(items, start_date_str, end_date_str):
+    return [i for i in items if start_date_str <= i["date"] <= end_date_str]
+
+
 def _parse_feed_datetime(text):
     """フィードの日時文字列(RFC822 / ISO8601)を datetime にする。失敗時は None。"""
     if not text:
@@ -62,54 +260,482 @@ def _parse_feed_datetime(text):
     except ValueError:
         return None
 
+class _TextIndex:
+    """解析ツリーの正規化済みテキストを1回の走査で作り、各要素の範囲を記録する索引。
+
+    全文書の文字列(strip して空でないもの)を NFKC 正規化して空白1つで連結した buffer を作り、
+    要素ごとに buffer 上の [start, end) を覚えておく。要素の
+    unicodedata.normalize("NFKC", element.get_text(" ", strip=True)) は buffer[start:end] と
+    一致するので、長さは O(1)、日付の数え上げは buffer を切り出さずに正規表現の
+    pos/endpos 指定で行える(日付の正規表現はアンカーや先読みを使わないので結果は同じ)。
+    get_text の対象が通常と異なる要素(script / style / template など)は索引に載せず、
+    従来どおり get_text で求める。"""
+
+    _MAIN_TYPES = (NavigableString, CData)
+
+    def __init__(self, root, target_names=(), matcher=None):
+        pieces = []
+        starts = []  # 各文字列片の buffer 上の開始位置
+        pos = 0
+        self._spans = {}
+        self.targets = []  # target_names の要素(文書順。find_all と同じ並び)
+        stack = [(root, 0, iter(root.contents))]
+        while stack:
+            node, first, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                last = len(pieces)
+                if last > first:
+                    self._spans[id(node)] = (starts[first], starts[last - 1] + len(pieces[last - 1]))
+                else:
+                    self._spans[id(node)] = (pos, pos)
+                continue
+            if isinstance(child, Tag):
+                if child.name in target_names:
+                    self.targets.append(child)
+                stack.append((child, len(pieces), iter(child.contents)))
+            elif type(child) in self._MAIN_TYPES:
+                stripped = child.strip()
+                if stripped:
+                    if pieces:
+                        pos += 1  # 区切りの空白
+                    starts.append(pos)
+                    pieces.append(unicodedata.normalize("NFKC", stripped))
+                    pos += len(pieces[-1])
+        self.buffer = " ".join(pieces)
+        # ページ中の日付がすべて情報源の書式(date_matcher)で書かれていれば、その書式で
+        # buffer を1回だけ走査して日付の位置を覚え、要素ごとの判定は二分探索で済ませる
+        # (日付のない要素は正規表現を走らせずに落ちる)。1つも合わない、または書式の
+        # 違う日付が混じるページは、従来どおり要素ごとに汎用の正規表現で探す
+        self.date_re = DATE_FLEX_CAPTURE_RE
+        self._date_starts = None
+        if matcher is not None:
+            found = list(matcher.finditer(self.buffer))
+            if found and len(found) == sum(1 for _ in DATE_FLEX_FINDALL_RE.finditer(self.buffer)):
+                self.date_re = matcher
+                self._date_starts = [m.start() for m in found]
+                self._date_ends = [m.end() for m in found]
+                self._date_values = [_match_date(m) for m in found]
+
+    def _span(self, tag):
+        types = getattr(tag, "interesting_string_types", None)
+        if types is not None and types != Tag.MAIN_CONTENT_STRING_TYPES:
+            return None
+        return self._spans.get(id(tag))
+
+    def length(self, tag):
+        span = self._span(tag)
+        if span is None:
+            return len(self.text_of(tag))
+        return span[1] - span[0]
+
+    def text(self, tag):
+        span = self._span(tag)
+        if span is None:
+            return self.text_of(tag)
+        return self.buffer[span[0]:span[1]]
+
+    @staticmethod
+    def text_of(tag):
+        return unicodedata.normalize("NFKC", tag.get_text(" ", strip=True))
+
+    def _date_matches(self, tag):
+        span = self._span(tag)
+        if span is None:
+            return self.date_re.finditer(self.text_of(tag))
+        return self.date_re.finditer(self.buffer, span[0], span[1])
+
+    def dates(self, tag, limit=None):
+        """要素のテキストに含まれる日付(YYYY-MM-DD。limit 個見つかった時点でやめる)。"""
+        span = self._span(tag) if self._date_starts is not None else None
+        if span is not None:
+            found = []
+            i = bisect.bisect_left(self._date_starts, span[0])
+            while i < len(self._date_starts) and self._date_starts[i] < span[1]:
+                if self._date_ends[i] <= span[1]:
+                    found.append(self._date_values[i])
+                    if limit is not None and len(found) >= limit:
+                        break
+                i += 1
+            return found
+        found = []
+        for match in self._date_matches(tag):
+            found.append(_match_date(match))
+            if limit is not None and len(found) >= limit:
+                break
+        return found
+
+    def date_count(self, tag, limit=None):
+        """要素のテキストに含まれる日付の数(limit 個見つかった時点で数えるのをやめる)。"""
+        if self._date_starts is not None:
+            return len(self.dates(tag, limit))
+        count = 0
+        for _ in self._date_matches(tag):
+            count += 1
+            if limit is not None and count >= limit:
+                break
+        return count
+
+
+class _EarlyStopScanner(HTMLParser):
+    """新しい順に並ぶ一覧ページを、ダウンロードしながら逐次解析して日付を数える。
+
+    iter_content の各チャンクを feed() に渡すと、それまでに届いた部分の一覧の行
+    (li / tr / dt / dd / article。header / nav / aside / footer の中と script / style は除く)
+    のテキストから日付を拾い、start_date_str より古い日付が EARLY_STOP_OLDER_DATES 個
+    続いた時点で True を返す(それ以降は期間外の記事だけなので、ダウンロードも解析も
+    そこで打ち切れる)。ヘッダーやメニューの日付では止まらない。期間内や期間より新しい
+    日付が現れたら数え直す(一覧の途中に古い「固定表示」の記事が挟まる場合のため)。"""
+
+    _SKIP_TAGS = ("script", "style")
+    _LIST_TAGS = ("li", "tr", "dt", "dd", "article")
+    _CHROME_TAGS = ("header", "nav", "aside", "footer")
+
+    def __init__(self, start_date_str, encoding=None):
+        super().__init__(convert_charrefs=True)
+        self.start_date_str = start_date_str
+        self.encoding = encoding
+        self.older_run = 0
+        self.stopped = False
+        self._decoder = None
+        self._skip_depth = 0
+        self._list_depth = 0  # 閉じタグを省略した li などでは閉じずに残る(多めに数えるだけ)
+        self._chrome_depth = 0
+        self._tail = ""  # チャンク・テキストの境目をまたぐ日付のための持ち越し
+        self._after_tag = True  # 直前がタグか(False なら前の文字列片の続きがチャンク境目で分かれたもの)
+
+    def feed(self, chunk, content_type=None):
+        if self.stopped:
+            return True
+        if self._decoder is None:
+            # 1つ目のチャンクで文字コードを決める(宣言 → 前回判定した文字コード → UTF-8)。
+            # 日付の数字と区切りさえ読めればよいので、外れても replace で読み進める
+            encoding = declared_encoding(chunk, content_type) or self.encoding or "utf-8"
+            try:
+                self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+            except LookupError:
+                self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        super().feed(self._decoder.decode(chunk))
+        return self.stopped
+
+    def handle_starttag(self, tag, attrs):
+        self._after_tag = True
+        if tag in self._SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in self._LIST_TAGS:
+            self._list_depth += 1
+        elif tag in self._CHROME_TAGS:
+            self._chrome_depth += 1
+
+    def handle_endtag(self, tag):
+        self._after_tag = True
+        if tag in self._SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in self._LIST_TAGS and self._list_depth:
+            self._list_depth -= 1
+        elif tag in self._CHROME_TAGS and self._chrome_depth:
+            self._chrome_depth -= 1
+
+    def handle_data(self, data):
+        separator = " " if self._after_tag else ""
+        self._after_tag = False
+        if self._skip_depth or self._chrome_depth or not self._list_depth or self.stopped:
+            return
+        stripped = data.strip()
+        if not stripped:
+            return
+        text = f"{self._tail}{separator}{unicodedata.normalize('NFKC', stripped)}"
+        consumed = 0
+        for match in DATE_FLEX_CAPTURE_RE.finditer(text):
+            if match.end() == len(text):
+                break  # 日の数字が次の片に続くかもしれないので次回に持ち越す
+            consumed = match.end()
+            y, m, d = match.groups()
+            if f"{y}-{int(m):02d}-{int(d):02d}" < self.start_date_str:
+                self.older_run += 1
+                if self.older_run >= EARLY_STOP_OLDER_DATES:
+                    self.stopped = True
+                    return
+            else:
+                self.older_run = 0
+        self._tail = text[consumed:][-32:]
+
+
+class _PlainText(_TextIndex):
+    """索引を作らず、要素ごとに get_text で求める _TextIndex 互換の実装
+    (レシピで絞った少数の要素だけを見るときは、全文書の索引を作るほうが高くつく)。"""
+
+    def __init__(self, matcher=None):
+        self._spans = {}
+        self.buffer = ""
+        self.targets = []
+        self.matcher = matcher
+        self._date_starts = None
+
+    def _date_matches(self, tag):
+        # ページ全体を見ないので、要素ごとに情報源の書式 → 汎用の正規表現の順に試す
+        text = self.text_of(tag)
+        if self.matcher is not None and self.matcher.search(text):
+            return self.matcher.finditer(text)
+        return DATE_FLEX_CAPTURE_RE.finditer(text)
+
+
+def _element_selector(element):
+    """要素の位置を表す CSS セレクタ(親2段までのタグ名と先頭のクラス名)。
+    レシピとして保存し、次回はこのセレクタに合う要素だけを見る。"""
+    parts = []
+    node = element
+    while node is not None and node.name and node.name != "[document]" and len(parts) < 3:
+        part = node.name
+        classes = node.get("class") or []
+        if isinstance(classes, str):
+            classes = classes.split()
+        if classes:
+            part += "." + soupsieve.escape(classes[0])
+        parts.append(part)
+        node = node.parent
+    return " > ".join(reversed(parts))
+
+
+def _recipe_container(soup, index, elements):
+    """記事が取れた要素 elements をすべて含む入れ物のうち、次回 find で直接たどれる
+    最も内側の要素の目印(id、または文書中で1つだけのタグ名+クラス名)を返す。
+    記事の入れ物らしく日付を2つ以上含む要素に限る。見つからなければ <body>、
+    それもなければ None(文書全体)。"""
+    common = elements[0]
+    for element in elements[1:]:
+        while common is not None and common is not element and common not in element.parents:
+            common = common.parent
+    node = common.parent if len(elements) == 1 else common
+    while node is not None and node.name and node.name != "[document]":
+        if node.name == "body":
+            return {"name": "body"}
+        if index.date_count(node, limit=2) >= 2:
+            if node.get("id"):
+                return {"name": node.name, "id": node["id"]}
+            classes = node.get("class") or []
+            if isinstance(classes, str):
+                classes = classes.split()
+            if classes and len(soup.find_all(node.name, class_=classes[0], limit=2)) == 1:
+                return {"name": node.name, "class": classes[0]}
+        node = node.parent
+    return None
+
+
+def _find_container(soup, anchor):
+    """_recipe_container の目印が指す要素(None なら文書全体。見つからなければ None)。"""
+    if anchor is None:
+        return soup
+    attrs = {key: anchor[key] for key in ("id", "class") if key in anchor}
+    return soup.find(anchor["name"], attrs=attrs)
+
+
+class _AdaptiveSlots:
+    """asyncio.Semaphore と同じように async with で使う枠。同時に使える数は cap と
+    ガバナー(MemoryGovernor)の limit の小さいほうで、取得・返却のたびに RSS を見て変わる。
+    limit が下がっても使用中の枠は取り上げず、返却されるまで新しい貸し出しを止める。"""
+
+    def __init__(self, cap, governor):
+        self.cap = cap
+        self.governor = governor
+        self.active = 0
+        self._changed = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._changed:
+            self.governor.observe()
+            await self._changed.wait_for(lambda: self.active < min(self.cap, self.governor.limit))
+            self.active += 1
+
+    async def __aexit__(self, *exc_info):
+        async with self._changed:
+            self.active -= 1
+            self.governor.observe()
+            self._changed.notify_all()
+
+
+class _HostGate:
+    """取得エンジン用のホスト単位の順番待ち。ホストごとの同時実行数を per_host に
+    制限し、同じホストへのリクエスト開始を interval 秒以上空ける。
+    slot / pace はイベントループ内で使う(枠を取る前に大まかに間隔を空け、待っている間は
+    他のホストが枠を使う)。実際の送信間隔は、取得スレッドが GET の直前に呼ぶ wait_turn が守る
+    (枠を取ってから GET までの DB の読み出しなどで、送信の時刻が前後するため)。"""
+
+    def __init__(self, per_host, interval):
+        self.per_host = per_host
+        self.interval = interval
+        self._slots = {}
+        self._next_at = {}
+        self._turns = {}
+        self._turns_lock = threading.Lock()
+
+    @asynccontextmanager
+    async def slot(self, url):
+        """async with gate.slot(url): の間、そのホストの枠を1つ占有する。"""
+        key = host_key(url)
+        semaphore = self._slots.setdefault(key, asyncio.Semaphore(self.per_host))
+        async with semaphore:
+            await self.pace(url)
+            yield
+
+    async def pace(self, url):
+        """前回そのホストへ始めたリクエストから interval 秒経つまで待つ。"""
+        key = host_key(url)
+        now = asyncio.get_running_loop().time()
+        start_at = max(now, self._next_at.get(key, now))
+        self._next_at[key] = start_at + self.interval
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
+
+    def wait_turn(self, url):
+        """そのホストへ前回 GET を送り始めてから interval 秒経つまで待つ(取得スレッドから、
+        session.get の直前に呼ぶ)。"""
+        key = host_key(url)
+        with self._turns_lock:
+            turn = self._turns.setdefault(key, [threading.Lock(), None])
+        with turn[0]:
+            if turn[1] is not None:
+                wait = turn[1] + self.interval - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+            turn[1] = time.monotonic()
+
+
 # ==========================================
 #  スクレイピングロジック (NewsScraper)
 # ==========================================
 class NewsScraper:
-    def __init__(self) -> None:
-        self.session = requests.Session()
-        self.session.headers.update(REQUEST_HEADERS)
-
-    def _fetch_one(self, url):
-        """1サイト分の GET。並列実行のためスレッドごとに独立した Session を使う。
-        例外は握りつぶさず呼び出し側で従来どおり処理できるよう値として返す。"""
-        session = requests.Session()
-        session.headers.update(REQUEST_HEADERS)
+    def __init__(self, pool=None) -> None:
+        self.pool = pool or HTTP_POOL
+        # 取得エンジンの実行中は、GET の直前にホストの送信間隔を守らせる(_HostGate.wait_turn)
+        self._wait_turn = None
+        # 1社ぶんの収集を終えるたびに company_id を渡して呼ぶ関数(取得エンジンのスレッドで実行)。
+        # サービス層が収集リースの延長に使う
+        self.on_page_done = None
+        # 期間外も含めてページから取れた記事と、そのページが網羅する期間:
+        # {company_id: (items, first, last)}。保存と coverage の記録はサービス層が行う
+        self.last_harvest = {}
+
+    def _fetch_page(self, company, start_date_str, end_date_str, early_stop=False, force=False):
+        """情報源ページの GET。前回の検証子があれば条件付き GET にする(force なら送らず、
+        304 で保存済みの記事を使い回さない)。
+        early_stop なら受信しながら日付を数え、期間より古い記事だけになった所で読み止める。"""
+        scanner = None
+        if early_stop:
+            scanner = _EarlyStopScanner(
+                start_date_str, storage.get_source_encoding(company["id"], company["url"])
+            )
+        headers = None if force else self._conditional_headers(company, start_date_str)
+        return self._fetch_one(company["url"], headers, scanner)
+
+    @staticmethod
+    def _conditional_headers(company, start_date_str):
+        """前回の応答の ETag / Last-Modified から条件付き GET のヘッダーを作る。
+        304 のときは DB の保存済みニュースで代用するので、前回保存した範囲の始まりが
+        今回の範囲の始まり以前の場合だけ送る(それより古い記事は保存していないため本文を
+        取り直す)。範囲の終わりは問わない: 304 は保存時から本文が変わっていない、
+        つまりその後の日付の記事も増えていないことを示す。"""
+        validators = storage.get_validators(company["id"], company["url"])
+        if not validators:
+            return None
+        if validators["range_start"] > start_date_str:
+            return None
+        headers = {}
+        if validators["etag"]:
+            headers["If-None-Match"] = validators["etag"]
+        if validators["last_modified"]:
+            headers["If-Modified-Since"] = validators["last_modified"]
+        return headers
+
+    def _fetch_one(self, url, headers=None, scanner=None):
+        """1サイト分の GET。Session はホスト単位のプールから借り、本文を読み終えたら返す
+        (借りている間は専有するので並列実行でも Session を共有しない)。
+        例外は握りつぶさず呼び出し側で従来どおり処理できるよう値として返す。
+
+        ホストのブレーカーが開いていればネットワークに出ず CircuitOpenError を返す。
+        一時的な失敗(タイムアウト・接続エラー・502/503/504)は breaker.FETCH_RETRIES 回まで
+        揺らぎ付きの間隔を空けて再試行し、最後の結果だけをブレーカーに記録する。"""
         try:
-            resp = session.get(url, timeout=10.0, stream=True)
-            self._cap_response_body(resp)
+            breaker_state = breaker.check(url)
+        except breaker.CircuitOpenError as exc:
+            return exc
+        attempt = 0
+        while True:
+            result = self._get_once(url, headers, scanner)
+            if attempt >= breaker.FETCH_RETRIES or not breaker.is_transient(result):
+                break
+            time.sleep(breaker.retry_delay(attempt))
+            attempt += 1
+        breaker.record(url, result, breaker_state)
+        return result
+
+    def _get_once(self, url, headers, scanner):
+        try:
+            with self.pool.session(url) as session:
+                if self._wait_turn is not None:
+                    self._wait_turn(url)
+                resp = session.get(url, timeout=10.0, stream=True, headers=headers)
+                self._cap_response_body(resp, scanner)
             return resp
         except Exception as exc:
             return exc
-        finally:
-            session.close()
 
     @staticmethod
-    def _cap_response_body(resp):
+    def _cap_response_body(resp, scanner=None):
         """レスポンス本文を MAX_FETCH_BYTES で読み止めて resp.content として確定する。
         巨大ページの本文全体をメモリに載せないための処置(全文をダウンロードしてから
         切り詰めるのではなく、ダウンロード自体を上限で打ち切る)。
-        ストリーミングに対応しないオブジェクト(テスト用ダミー等)はそのまま通す。"""
+        scanner(_EarlyStopScanner)を渡すと届いたチャンクを逐次解析させ、
+        期間より古い日付が続いた時点でも読み止める(resp._news_early_stopped)。
+        ストリーミングに対応しないオブジェクト(テスト用ダミー等)はそのまま通す。
+
+        受信したチャンクは SpooledTemporaryFile に書き、SPOOL_THRESHOLD_BYTES を超えた本文は
+        一時ファイルに逃がして読み取り専用のメモリマップを resp.content にする(バイト列と
+        同じようにハッシュ・デコードできる)。それ以下の本文は従来どおり bytes。"""
         resp._news_truncated = False
+        resp._news_early_stopped = False
         iter_content = getattr(resp, "iter_content", None)
         if iter_content is None or getattr(resp, "raw", None) is None:
             return
-        chunks = []
+        if resp.status_code != 200:
+            scanner = None  # エラーページの日付は数えない
+        content_type = (getattr(resp, "headers", None) or {}).get("Content-Type")
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_THRESHOLD_BYTES)
+        if not SPOOL_THRESHOLD_BYTES:
+            spool.rollover()  # max_size=0 は「一時ファイルに移さない」の意味なので、最初からファイルにする
         total = 0
         try:
             for chunk in iter_content(chunk_size=65536):
-                chunks.append(chunk)
+                spool.write(chunk)
                 total += len(chunk)
                 if total >= MAX_FETCH_BYTES:
                     resp._news_truncated = True
                     resp.close()  # 以降のダウンロードを打ち切る
                     break
+                if scanner is not None and scanner.feed(chunk, content_type):
+                    resp._news_early_stopped = True
+                    resp.close()
+                    break
         except Exception:
             pass  # 途中まで読めた分で続行する(接続断など)
-        resp._content = b"".join(chunks)
+        resp._content = NewsScraper._spooled_body(spool, total)
         resp._content_consumed = True
 
-    def _feed_candidates(self, company, soup):
+    @staticmethod
+    def _spooled_body(spool, size):
+        """SpooledTemporaryFile に書いた本文を取り出す。一時ファイルに移っていれば
+        (size が SPOOL_THRESHOLD_BYTES を超えていれば)メモリマップ、そうでなければ bytes。
+        ファイルは閉じてよい(マップは参照がなくなるか close されるまで残る)。"""
+        with spool:
+            if size <= SPOOL_THRESHOLD_BYTES:
+                spool.seek(0)
+                return spool.read()
+            spool.flush()
+            return mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @staticmethod
+    def _feed_candidates(company, soup):
         """この情報源で試すべきフィード URL の候補を返す。
         1. companies.py に rss_url が設定されていればそれを最優先
         2. ページの <head> が宣言している RSS/Atom フィード(自動発見)"""
@@ -133,71 +759,168 @@ class NewsScraper:
                 unique.append(c)
         return unique[:3]
 
-    def _fetch_feed_items(self, company, feed_url, start_date_str, end_date_str, debug_logs):
-        """RSS 2.0 / Atom フィードから期間内の記事を抽出する。失敗しても例外は投げない。"""
+    def _fallback_feed(self, company, feed_url, start_date_str, end_date_str, cancel):
+        """フィードフォールバックの1候補を読む(取得エンジンのスレッドで実行)。
+        (_read_feed の結果, ログ, 期間外も含めて読めた記事) を返す。
+        取り消されたら結果は記録しない。"""
+        logs = []
+        harvested = []
+        read = self._read_feed(company, feed_url, start_date_str, end_date_str, logs, cancel, harvested)
+        if not cancel.is_set():
+            self._record_feed(company, feed_url, read)
+        return read, logs, harvested
+
+    def _read_feed(self, company, feed_url, start_date_str, end_date_str, debug_logs, cancel=None, harvested=None):
+        """RSS 2.0 / Atom フィードを読み、(期間内の記事, フィード中で最も古い記事の日付,
+        最後まで読んだか) を返す。日付付きの記事が1件もなければ日付は None。取得・解析に
+        失敗したら None(例外は投げない)。harvested(リスト)を渡すと、期間外も含めて
+        読んだ記事を追記する。
+
+        本文全体を読み込んでから木を作るのではなく、受信したチャンクを順に
+        XMLPullParser に渡し、item / entry を1件読み終えるたびに処理して木から外す
+        (本文に HTML を丸ごと載せる数百件のフィードでも、メモリに残るのは1件ぶん)。
+        新しい順に並んでいるフィードでは、期間より古い記事が EARLY_STOP_OLDER_DATES 件
+        続いた時点でダウンロードごと打ち切る。
+        ホストのブレーカーが開いていれば読まない(結果はブレーカーにも記録する)。"""
+        items = []
+        seen = set()
+        state = {"oldest": None, "previous": None, "descending": True, "older_run": 0}
         try:
-            resp = self.session.get(feed_url, timeout=10.0, stream=True)
-            self._cap_response_body(resp)
-            if resp.status_code != 200:
-                debug_logs.append(f"Feed {feed_url}: status {resp.status_code}")
-                return []
-            root = ET.fromstring(resp.content)
+            breaker_state = breaker.check(feed_url)
+            with self.pool.session(feed_url) as session:
+                try:
+                    if self._wait_turn is not None:
+                        self._wait_turn(feed_url)
+                    resp = session.get(feed_url, timeout=10.0, stream=True)
+                except Exception as exc:
+                    breaker.record(feed_url, exc, breaker_state)
+                    raise
+                breaker.record(feed_url, resp, breaker_state)
+                try:
+                    if resp.status_code != 200:
+                        debug_logs.append(f"Feed {feed_url}: status {resp.status_code}")
+                        return None
+                    parser = ET.XMLPullParser(events=("start", "end"))
+                    stack = []
+                    stopped = False
+                    received = 0
+                    for chunk in self._iter_body(resp):
+                        received += len(chunk)
+                        if cancel is not None and cancel.is_set():
+                            return None  # 別の候補で記事が取れた
+                        parser.feed(chunk)
+                        for event, node in parser.read_events():
+                            if event == "start":
+                                stack.append(node)
+                                continue
+                            stack.pop()
+                            if node.tag.split("}")[-1].lower() not in ("item", "entry"):
+                                continue
+                            if self._feed_entry(company, feed_url, node, start_date_str, end_date_str,
+                                                items, seen, state, harvested):
+                                stopped = True
+                            # 処理済みのエントリは木から外して解放する
+                            node.clear()
+                            if stack:
+                                stack[-1].remove(node)
+                            if stopped:
+                                break
+                        if stopped:
+                            debug_logs.append(f"Feed {feed_url}: older than {start_date_str} from here on. Stopped reading.")
+                            break
+                    if not stopped:
+                        parser.close()
+                finally:
+                    close = getattr(resp, "close", None)  # 読み止めたら残りのダウンロードも打ち切る
+                    if close is not None:
+                        close()
         except Exception as exc:
             debug_logs.append(f"Feed error ({feed_url}): {exc}")
-            return []
+            return None
+        # 読み止めた・MAX_FETCH_BYTES で切れたフィードは、読んだ範囲より先を網羅していない
+        return items, state["oldest"], not stopped and received < MAX_FETCH_BYTES
 
-        items = []
-        seen = set()
-        for node in root.iter():
-            tag = node.tag.split("}")[-1].lower()
-            if tag not in ("item", "entry"):
-                continue
-            title = link = date_text = None
-            link_is_alternate = False
-            for child in node:
-                ctag = child.tag.split("}")[-1].lower()
-                if ctag == "title":
-                    title = (child.text or "").strip()
-                elif ctag == "link":
-                    # RSS はテキスト、Atom は href 属性。Atom では1エントリに複数の
-                    # <link>(記事本体 / rel="self" / enclosure 等)が並ぶことがあるため、
-                    # 記事本体を指す rel="alternate"(rel 省略時は alternate 扱い)を優先し、
-                    # 後から来る self や enclosure で上書きしない
-                    candidate = (child.text or "").strip() or child.get("href")
-                    if not candidate:
-                        continue
-                    rel = (child.get("rel") or "alternate").lower()
-                    if rel == "alternate":
-                        if not link_is_alternate:
-                            link = candidate
-                            link_is_alternate = True
-                    elif link is None:
+    @staticmethod
+    def _iter_body(resp):
+        """応答本文をチャンクごとに返す(合計 MAX_FETCH_BYTES まで)。
+        ストリーミングに対応しないオブジェクト(テスト用ダミー等)は本文をまとめて返す。"""
+        if getattr(resp, "iter_content", None) is None or getattr(resp, "raw", None) is None:
+            yield NewsScraper._response_bytes(resp)[:MAX_FETCH_BYTES]
+            return
+        total = 0
+        for chunk in resp.iter_content(chunk_size=65536):
+            yield chunk
+            total += len(chunk)
+            if total >= MAX_FETCH_BYTES:
+                return
+
+    @staticmethod
+    def _feed_entry(company, feed_url, node, start_date_str, end_date_str, items, seen, state, harvested=None):
+        """item / entry 要素1件を処理する。期間内なら items に、harvested があれば期間外でも
+        harvested に追加する。新しい順のフィードで期間より古い記事が続き、読み止めてよければ True。"""
+        title = link = date_text = None
+        link_is_alternate = False
+        for child in node:
+            ctag = child.tag.split("}")[-1].lower()
+            if ctag == "title":
+                title = (child.text or "").strip()
+            elif ctag == "link":
+                # RSS はテキスト、Atom は href 属性。Atom では1エントリに複数の
+                # <link>(記事本体 / rel="self" / enclosure 等)が並ぶことがあるため、
+                # 記事本体を指す rel="alternate"(rel 省略時は alternate 扱い)を優先し、
+                # 後から来る self や enclosure で上書きしない
+                candidate = (child.text or "").strip() or child.get("href")
+                if not candidate:
+                    continue
+                rel = (child.get("rel") or "alternate").lower()
+                if rel == "alternate":
+                    if not link_is_alternate:
                         link = candidate
-                elif ctag in ("pubdate", "published", "date"):
-                    date_text = child.text
-                elif ctag == "updated" and date_text is None:
-                    date_text = child.text
-            parsed = _parse_feed_datetime(date_text)
-            if not (title and link and parsed):
-                continue
-            found_date_str = parsed.strftime("%Y-%m-%d")
-            if not (start_date_str <= found_date_str <= end_date_str):
-                continue
-            url = urljoin(feed_url, link.strip())
-            key = (url, found_date_str, title)
-            if key in seen:
-                continue
-            seen.add(key)
-            items.append({
-                "company_name": company["name"],
-                "badge_color": company["badge_color"],
-                "title": title[:100] + "..." if len(title) > 100 else title,
-                "url": url,
-                "date": found_date_str,
-                "is_link_only": False,
-                "is_error": False
-            })
-        return items
+                        link_is_alternate = True
+                elif link is None:
+                    link = candidate
+            elif ctag in ("pubdate", "published", "date"):
+                date_text = child.text
+            elif ctag == "updated" and date_text is None:
+                date_text = child.text
+        parsed = _parse_feed_datetime(date_text)
+        if not (title and link and parsed):
+            return False
+        found_date_str = parsed.strftime("%Y-%m-%d")
+        if state["oldest"] is None or found_date_str < state["oldest"]:
+            state["oldest"] = found_date_str
+        # ここまで新しい順に並んでいるか(一度でも逆転したら最後まで読む)
+        if state["previous"] is not None and found_date_str > state["previous"]:
+            state["descending"] = False
+        state["previous"] = found_date_str
+        stop = False
+        if found_date_str < start_date_str:
+            state["older_run"] += 1
+            stop = state["descending"] and state["older_run"] >= EARLY_STOP_OLDER_DATES
+        else:
+            state["older_run"] = 0
+        in_range = start_date_str <= found_date_str <= end_date_str
+        if not in_range and harvested is None:
+            return stop
+        url = urljoin(feed_url, link.strip())
+        key = (url, found_date_str, title)
+        if key in seen:
+            return stop
+        seen.add(key)
+        item = {
+            "company_name": company["name"],
+            "badge_color": company["badge_color"],
+            "title": title[:100] + "..." if len(title) > 100 else title,
+            "url": url,
+            "date": found_date_str,
+            "is_link_only": False,
+            "is_error": False
+        }
+        if in_range:
+            items.append(item)
+        if harvested is not None:
+            harvested.append(item)
+        return stop
 
     def _fallback_item(self, company, target_date_str, status_code=None):
         if status_code == 403:
@@ -222,7 +945,8 @@ class NewsScraper:
             "is_error": True if status_code != 403 else False
         }
 
-    def fetch_news(self, company_ids, start_date_str, end_date_str):
+    def fetch_news(self, company_ids, start_date_str, end_date_str, force=False):
+        """force は強制収集(定時収集など)。保存済みの検証子を使わず本文を取り直す。"""
         start_date = datetime.strptime(start_date_str, "%Y-%m-%d")
         end_date = datetime.strptime(end_date_str, "%Y-%m-%d")
         all_items = []
@@ -236,31 +960,18 @@ class NewsScraper:
         # 各社の取得結果ステータス。呼び出し側(キャッシュ層など)が参照できるよう
         # インスタンス属性として記録する: {company_id: (status, status_code)}
         self.last_status = {}
+        self.last_harvest = {}
 
-        # HTTP取得はバッチ単位で並列実行する(解析・結果の並び・ログは
-        # 従来どおり company_ids の順に直列処理するので出力は変わらない)。
-        # 以前は全社分のページを一度にメモリへ溜めてから処理していたため、
-        # 収集のたびに「全ページの合計サイズ」までメモリ使用量が跳ね上がっていた。
-        # バッチ方式では同時に保持するページが最大 FETCH_MAX_WORKERS 件に抑えられ、
-        # 小さいホスティング環境でのメモリ制限超過を防ぐ
-        fetch_targets = [
-            cid for cid in company_ids
+        # 取得と解析は _run_fetch_engine が並行に進める。結果の並び・ログは
+        # 従来どおり company_ids の順に組み立てるので出力は変わらない
+        fetch_targets = list({
+            cid: company_map[cid] for cid in company_ids
             if cid in company_map and company_map[cid].get("scraper_type") != "force_link"
-        ]
-        prefetched = {}
-        next_fetch_idx = 0
-
-        def _ensure_fetched(target_cid):
-            nonlocal next_fetch_idx
-            while target_cid not in prefetched and next_fetch_idx < len(fetch_targets):
-                batch = fetch_targets[next_fetch_idx:next_fetch_idx + FETCH_MAX_WORKERS]
-                next_fetch_idx += len(batch)
-                with ThreadPoolExecutor(max_workers=min(FETCH_MAX_WORKERS, len(batch))) as pool:
-                    for c, result in zip(
-                        batch,
-                        pool.map(lambda x: self._fetch_one(company_map[x]["url"]), batch),
-                    ):
-                        prefetched[c] = result
+        }.values())
+        self.governor_logs = []
+        results = self._run_fetch_engine(fetch_targets, start_date_str, end_date_str, force)
+        # 同時実行数の調整の記録(メモリの上限が分かる環境だけ)
+        debug_logs.extend(self.governor_logs)
 
         for cid in company_ids:
             company = company_map.get(cid)
@@ -282,272 +993,915 @@ class NewsScraper:
                 })
                 continue
 
-            html_content = None
+            items, logs, status = results[cid]
+            all_items.extend(items)
+            debug_logs.extend(logs)
+            self.last_status[cid] = status
+
+        return all_items, debug_logs, checked_company_names
+
+    def _run_fetch_engine(self, companies, start_date_str, end_date_str, force=False):
+        """companies の各ページを取得・解析し、{company_id: (items, logs, status)} を返す。
+
+        以前は FETCH_MAX_WORKERS 件ずつのバッチで取得しており、バッチ内で一番遅い
+        サイト(タイムアウトなら10秒)を待つ間、他の枠が遊んでいた。ここでは
+        asyncio のセマフォで「取得中〜解析完了まで」のページ枠を FETCH_MAX_WORKERS 個
+        用意し、1件終わるたびに次の取得を始めるので、常に上限いっぱいの接続が動く。
+        取得を終えたページはすぐに解析へ回す。解析は1件ずつ(BeautifulSoup は GIL に
+        縛られるため並べても速くならず、解析ツリーを同時に複数持つとメモリが増える)。
+        同時にメモリに載るページは従来どおり最大 FETCH_MAX_WORKERS 件。メモリの上限が
+        分かる環境では、ページ枠と解析枠の数を MemoryGovernor が RSS に合わせて減らし、
+        余裕が戻ったら FETCH_MAX_WORKERS まで戻す(判断は self.governor_logs に記録)。
+        "early_stop" の情報源は先頭部分だけ取得・解析し、期間内の記事がなければ
+        同じ枠のまま全文を取り直す。
+        HTML から0件のときのフィード候補も同じページ枠で並行に読み、最初に記事が取れた
+        ものを採用する(1社のフォールバックが他社の処理を止めない)。
+        同期コード(FastAPI のスレッドプール・スケジューラのスレッド)から呼ぶ前提。"""
+        if not companies:
+            return {}
+        return asyncio.run(self._fetch_all(companies, start_date_str, end_date_str, force))
+
+    async def _fetch_all(self, companies, start_date_str, end_date_str, force=False):
+        loop = asyncio.get_running_loop()
+        parse_executor = _parse_executor()
+        governor = MemoryGovernor(FETCH_MAX_WORKERS, memory_ceiling_bytes())
+        if governor.enabled:
+            governor.logs.append(
+                f"Memory governor: ceiling {governor.ceiling // 1048576} MB, "
+                f"up to {FETCH_MAX_WORKERS} concurrent pages."
+            )
+        self.governor_logs = governor.logs
+        page_slots = _AdaptiveSlots(FETCH_MAX_WORKERS, governor)
+        hosts = _HostGate(FETCH_PER_HOST, FETCH_HOST_INTERVAL_MS / 1000)
+        self._wait_turn = hosts.wait_turn
+        # 解析の同時実行数。プロセスプールがあればワーカー数ぶん、なければ1件ずつ
+        parse_slots = _AdaptiveSlots(PARSE_WORKERS if parse_executor else 1, governor)
+        results = {}
 
+        async def collect(company, early_stop):
+            """1ページの取得〜解析。(結果, 試すべきフィード候補, 確かめるべきフィード候補) を返す。
+            早期打ち切りした先頭部分に期間内の記事がなければ (None, [], [])(先頭の固定表示の
+            記事などで読み止めたのかもしれず、その期間に記事がないとは言い切れない)。"""
+            fetched = [await loop.run_in_executor(
+                pool, self._fetch_page, company, start_date_str, end_date_str, early_stop, force
+            )]
+            done, job = await loop.run_in_executor(
+                pool, self._prepare_page, company, fetched, start_date_str, end_date_str, force
+            )
+            if done is not None:
+                return done, [], []
+            parsed = None
+            if job["cached"] is None:
+                async with parse_slots:
+                    parsed = await self._parse_stage(loop, pool, parse_executor, job)
+            extracted = parsed or job["cached"]
+            if (job["early_stopped"] and not _in_range(extracted[0], start_date_str, end_date_str)
+                    and (parsed is None or parsed[3][0] == "ok")):
+                return None, [], []
+            done = await loop.run_in_executor(
+                pool, self._finish_page, company, job, parsed, start_date_str, end_date_str
+            )
+            return done, job.get("pending_feeds", []), job.get("unverified_feeds", [])
+
+        async def read_feed(company, feed_url, cancel):
+            async with hosts.slot(feed_url), page_slots:
+                if cancel.is_set():
+                    return None, []
+                return await loop.run_in_executor(
+                    pool, self._fallback_feed, company, feed_url, start_date_str, end_date_str, cancel
+                )
+
+        async def feed_fallback(company, done, feed_urls):
+            """フィード候補をまとめて(ページ枠の範囲で並行に)読み、最初に記事が取れたものを
+            採用して残りは取り消す。ログは候補の順に並べる。"""
+            items, logs, _status = done
+            cancel = threading.Event()
+            tasks = {asyncio.ensure_future(read_feed(company, u, cancel)): u for u in feed_urls}
+            outcomes = {}
+            winner = None
+            pending = set(tasks)
             try:
-                _ensure_fetched(cid)
-                # pop で取り出して参照を手放す(処理済みページをメモリに残さない)
-                resp = prefetched.pop(cid, None)
-                if resp is None:
-                    resp = self._fetch_one(company["url"])
-                if isinstance(resp, Exception):
-                    raise resp
-                resp.encoding = resp.apparent_encoding
-
-                if resp.status_code == 404:
-                    debug_logs.append(f"Status 404: Page not found. Skipped.")
-                    self.last_status[cid] = ("404", 404)
-                    continue
-                elif resp.status_code == 403:
-                    debug_logs.append("Status 403 (Access Denied). Fallback to link.")
-                    all_items.append(self._fallback_item(company, start_date_str, 403))
-                    self.last_status[cid] = ("403", 403)
+                while pending and winner is None:
+                    finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in sorted(finished, key=lambda t: feed_urls.index(tasks[t])):
+                        read, feed_logs, harvested = task.result()
+                        outcomes[tasks[task]] = feed_logs
+                        if winner is None and read and read[0]:
+                            winner = (tasks[task], read[0], harvested, read[2])
+            finally:
+                cancel.set()
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+            for feed_url in feed_urls:
+                logs.extend(outcomes.get(feed_url, []))
+            if winner:
+                feed_url, feed_items, harvested, complete = winner
+                items.extend(feed_items)
+                self._keep_harvest(company, harvested, start_date_str, end_date_str, complete)
+                logs.append(f"  -> Feed fallback: {len(feed_items)} items from {feed_url}")
+            else:
+                logs.append("Result: 0 items found.")
+
+        async def run(company):
+            # 同じページ・同じ期間を別の収集(別スレッドの fetch_news)が取得中なら、その結果を使う
+            # (強制収集は強制収集どうしでだけ共有する)
+            key = (company["id"], company["url"], start_date_str, end_date_str, force)
+            flight, leader = _PAGE_FLIGHTS.begin(key)
+            if not leader:
+                shared = await asyncio.wrap_future(flight)
+                if shared is not None:
+                    items, logs, status = shared
+                    results[company["id"]] = (
+                        [dict(item) for item in items],
+                        ["Joined a concurrent fetch of the same page.", *logs],
+                        status,
+                    )
+                    return
+                # 取得していた側が失敗した(例外)。自分で取得する
+                await fetch(company)
+                return
+            try:
+                await fetch(company)
+            finally:
+                _PAGE_FLIGHTS.finish(key, flight, results.get(company["id"]))
+
+        async def verify_feeds(company, logs, feed_urls):
+            """HTML から記事が取れた情報源の未確認のフィード候補を、使えるものが見つかるまで
+            順に読む。フィードのホストの枠と送信間隔を守り、他社のページ取得と同じ枠で読む。"""
+            for feed_url in feed_urls:
+                async with hosts.slot(feed_url), page_slots:
+                    verified = await loop.run_in_executor(pool, self._verify_feed, company, feed_url, logs)
+                if verified:
+                    return
+
+        async def fetch(company):
+            done, feed_logs, feed_urls, verify_urls = None, [], [], []
+            # 確認済みのフィードがあれば先に読む(フィードのホストの枠で)
+            feed = await loop.run_in_executor(pool, self._known_feed, company)
+            if feed is not None:
+                async with hosts.slot(feed["feed_url"]), page_slots:
+                    done, feed_logs = await loop.run_in_executor(
+                        pool, self._feed_first, company, feed, start_date_str, end_date_str
+                    )
+            if done is None:
+                # ホストの順番待ちを先に済ませてから全体の枠を取る(待っている間は他のホストが枠を使う)
+                async with hosts.slot(company["url"]), page_slots:
+                    done, feed_urls, verify_urls = await collect(company, bool(company.get("early_stop")))
+                    if done is None:
+                        # 並び順の想定が外れて先頭部分に記事がなかった。全文を取り直して従来どおり解析する
+                        await hosts.pace(company["url"])
+                        done, feed_urls, verify_urls = await collect(company, False)
+                        done[1].insert(0, "Early stop found no items. Refetched the full page.")
+                done[1][:0] = feed_logs
+            # フィード候補は、ページ枠を返してから(解析済みのページはもう持っていない)
+            # 他社のページ取得と同じ枠で読む
+            if feed_urls:
+                # HTML から0件
+                await feed_fallback(company, done, feed_urls)
+            elif verify_urls:
+                await verify_feeds(company, done[1], verify_urls)
+            results[company["id"]] = done
+            if self.on_page_done is not None:
+                await loop.run_in_executor(pool, self.on_page_done, company["id"])
+
+        # 各ページ枠はスレッドを1本ずつしか使わないので、スレッド数も FETCH_MAX_WORKERS で足りる
+        pool = ThreadPoolExecutor(max_workers=FETCH_MAX_WORKERS)
+        try:
+            await asyncio.gather(*(run(c) for c in companies))
+        finally:
+            # 取り消したフィードの読み込みが残っていても待たない(読み止めの合図は送り済み)
+            pool.shutdown(wait=False, cancel_futures=True)
+            self._wait_turn = None
+        return results
+
+    @staticmethod
+    async def _parse_stage(loop, pool, parse_executor, job):
+        """parse_page をプロセスプール(設定時)またはスレッドで実行する。
+        ワーカーの異常終了やメモリ上限超過は、その1件の例外扱いにして収集全体は止めない。"""
+        if parse_executor is None:
+            return await loop.run_in_executor(pool, _parse_job, job)
+        body = job.pop("body")
+        if isinstance(body, mmap.mmap):
+            # メモリマップは pickle できないので、ワーカーへはバイト列で渡す
+            with body:
+                body = body[:]
+        try:
+            return await loop.run_in_executor(
+                parse_executor, parse_page, body, job["encoding"],
+                job["company"], job["start_date_str"], job["end_date_str"], job["recipe"], True,
+            )
+        except BrokenProcessPool as exc:
+            _discard_parse_executor(parse_executor)
+            return [], [], [f"Exception: parse worker died ({exc})"], ("exception", None), {}
+        except Exception as exc:
+            return [], [], [f"Exception: {exc!r}"], ("exception", None), {}
+
+    def _prepare_page(self, company, fetched, start_date_str, end_date_str, force=False):
+        """取得結果のステータス確認と、解析の要否の判断。
+        (items, logs, status) が確定したら (結果, None)、本文を扱う必要があれば (None, job) を返す。
+        job["cached"] が None なら解析が必要、そうでなければ前回の抽出結果を再利用できる
+        (force なら本文が同じでも、抽出レシピも使わずに解析し直す)。"""
+        items = []
+        logs = []
+        try:
+            # 呼び出し側が本文の参照を持ち続けないよう、1要素のリストから取り出して受け取る
+            resp = fetched.pop()
+            if isinstance(resp, Exception):
+                raise resp
+            if resp.status_code == 304:
+                # 前回から変わっていない。本文のダウンロード・解析は不要で、
+                # 記事は呼び出し側(サービス層)が DB の保存済みから返す。保存した範囲の
+                # 始まりから今日までは記事が増えていないので、その期間を網羅したことにする
+                logs.append("Status 304: Not modified. Reusing stored items.")
+                validators = storage.get_validators(company["id"], company["url"])
+                if validators:
+                    today_str = datetime.now().strftime("%Y-%m-%d")
+                    self.last_harvest[company["id"]] = (
+                        [], min(validators["range_start"], start_date_str), max(end_date_str, today_str)
+                    )
+                return (items, logs, ("not_modified", 304)), None
+
+            if resp.status_code == 404:
+                logs.append(f"Status 404: Page not found. Skipped.")
+                return (items, logs, ("404", 404)), None
+            elif resp.status_code == 403:
+                logs.append("Status 403 (Access Denied). Fallback to link.")
+                items.append(self._fallback_item(company, start_date_str, 403))
+                return (items, logs, ("403", 403)), None
+            elif resp.status_code != 200:
+                logs.append(f"Error Status: {resp.status_code}")
+                items.append(self._fallback_item(company, start_date_str, resp.status_code))
+                return (items, logs, ("error", resp.status_code)), None
+
+            if getattr(resp, "_news_truncated", False):
+                logs.append(f"Page too large (> {MAX_FETCH_BYTES} bytes). Truncated at download.")
+            headers = getattr(resp, "headers", None) or {}
+            job = {
+                "company": company,
+                "start_date_str": start_date_str,
+                "end_date_str": end_date_str,
+                "logs": logs,
+                "validators": (headers.get("ETag"), headers.get("Last-Modified")),
+                "early_stopped": getattr(resp, "_news_early_stopped", False),
+            }
+            body = self._response_bytes(resp)
+            # 本文を最後まで解析するか(読み止め・切り詰めがあればページの続きは見ていない。
+            # MAX_HTML_CHARS を超えうる長さなら解析時に切り詰められる)
+            job["complete"] = not (job["early_stopped"] or getattr(resp, "_news_truncated", False)) \
+                and len(body) <= MAX_HTML_CHARS
+            if job["early_stopped"]:
+                logs.append(f"Early stop: read {len(body)} bytes (older than {start_date_str} from here on).")
+            # 本文が前回と同じなら、デコードも解析もせず前回の抽出結果を使う
+            # (検証子を返さず毎回 200 で同じ本文を返すサイトが多いため)
+            job["body_hash"] = hashlib.sha256(body).hexdigest()
+            job["cached"] = None if force else self._cached_extraction(company, job["body_hash"])
+            if job["cached"] is None:
+                job["encoding"] = self._page_encoding(company, resp, body, headers, logs)
+                # 強制収集ではレシピを使わず全要素を走査し、学習し直す
+                job["recipe"] = None if force else storage.get_recipe(
+                    company["id"], company["url"], EXTRACTOR_VERSION
+                )
+                job["body"] = body
+            body = resp = None  # 以降は job が本文を持つ。参照を切る
+        except Exception as exc:
+            logs.append(f"Exception: {exc}")
+            items.append(self._fallback_item(company, start_date_str))
+            return (items, logs, ("exception", None)), None
+
+        return None, job
+
+    def _finish_page(self, company, job, parsed, start_date_str, end_date_str):
+        """抽出結果(解析したもの、または本文ハッシュ一致で再利用したもの)から
+        レシピ・検証子の保存までを行い (items, logs, status) を返す。HTML から0件なら
+        読むべきフィード候補を job["pending_feeds"] に、記事が取れたなら使えるか確かめる
+        フィード候補を job["unverified_feeds"] に入れる(読むのは取得エンジン)。"""
+        items = []
+        logs = job["logs"]
+        # 抽出結果はページ上のすべての日付の記事(期間外も含む)。返すのは期間内の記事で、
+        # 全体はページが網羅する期間とともに last_harvest に残す(サービス層が保存する)
+        if parsed is None:
+            harvested, feed_candidates = job["cached"]
+            html_items = _in_range(harvested, start_date_str, end_date_str)
+            logs.append(f"Body unchanged (fingerprint match). Reused {len(html_items)} extracted items.")
+        else:
+            harvested, feed_candidates, parse_logs, status, recipe = parsed
+            logs.extend(parse_logs)
+            if status[0] != "ok":
+                items.append(self._fallback_item(company, start_date_str))
+                return items, logs, status
+            html_items = _in_range(harvested, start_date_str, end_date_str)
+        first, last = self._keep_harvest(company, harvested, start_date_str, end_date_str, job["complete"])
+        if parsed is not None:
+            # 記事が取れた要素を次回の抽出レシピとして覚える(0件の日は前回のものを残す)
+            if recipe and recipe != job["recipe"]:
+                storage.save_recipe(company["id"], company["url"], EXTRACTOR_VERSION, recipe)
+            storage.save_page_fingerprint(
+                company["id"], company["url"], job["body_hash"], EXTRACTOR_VERSION,
+                harvested, feed_candidates,
+            )
+        if len(harvested) > len(html_items):
+            logs.append(f"Harvested {len(harvested)} items covering {first} ~ {last}.")
+        items.extend(html_items)
+
+        # --- フィード(RSS/Atom)フォールバック ---
+        # HTML からの抽出が0件だった場合、設定済みの rss_url またはページが
+        # <head> で宣言しているフィードを自動発見して読む。サイトの見た目
+        # (HTML 構造)が変わってもフィードは安定しているため、自己修復として機能する。
+        # 読むのは呼び出し側の取得エンジン(ページ枠を返してから候補をまとめて並行に読む)。
+        # 記事が取れたときも、未確認のフィード候補は取得エンジンがページ枠を返してから確かめる
+        if not items:
+            job["pending_feeds"] = list(feed_candidates)
+        else:
+            job["unverified_feeds"] = self._unverified_feeds(company, feed_candidates)
+        # HTML を見たことを記録する(フィード優先の情報源でも定期的にここを通す)
+        storage.touch_feed_html_check(company["id"], company["url"])
+
+        if not items and not feed_candidates:
+            logs.append("Result: 0 items found.")
+
+        # 次回の条件付き GET 用に検証子を保存(304 ならページが網羅する範囲は DB から再現できる)
+        storage.save_validators(company["id"], company["url"], *job["validators"], first, last)
+        return items, logs, ("ok", 200)
+
+    def _keep_harvest(self, company, harvested, start_date_str, end_date_str, complete):
+        """期間外も含めてページ(フィード)から取れた記事を、そのページが網羅する期間とともに
+        last_harvest に残す。網羅する期間 (first, last) を返す(complete でなければ要求された期間)。"""
+        first, last = harvest_span([i["date"] for i in harvested], start_date_str, end_date_str, complete)
+        self.last_harvest[company["id"]] = (harvested, first, last)
+        return first, last
+
+    @staticmethod
+    def _known_feed(company):
+        """フィード優先で読むフィード(使えることを確認済みのもの)。ないとき、または
+        HTML の定期確認(FEED_HTML_CHECK_HOURS ごと)の時期なら None。"""
+        if not FEED_HTML_CHECK_HOURS:
+            return None
+        feed = next((f for f in storage.get_feeds(company["id"], company["url"]) if f["good"]), None)
+        if feed is None or time.time() - feed["html_checked_at"] >= FEED_HTML_CHECK_HOURS * 3600:
+            return None
+        return feed
+
+    def _feed_first(self, company, feed, start_date_str, end_date_str):
+        """使えることを確認済みのフィード feed(_known_feed)を、HTML より先に読む。
+        (items, logs, status) が確定すれば (結果, logs)、HTML を読むべきなら (None, logs)。
+
+        フィードは一覧ページより桁違いに小さいので、取得も解析も軽い。ただし
+        フィードが期間の始まりまで遡れない(直近 N 件しか載せない)ときは HTML を読む。"""
+        logs = []
+        harvested = []
+        read = self._read_feed(company, feed["feed_url"], start_date_str, end_date_str, logs, harvested=harvested)
+        self._record_feed(company, feed["feed_url"], read)
+        if read is None:
+            logs.append("Feed-first failed. Scraping HTML.")
+            return None, logs
+        items, oldest, complete = read
+        if oldest is None or oldest > start_date_str:
+            logs.append(f"Feed does not reach back to {start_date_str}. Scraping HTML.")
+            return None, logs
+        self._keep_harvest(company, harvested, start_date_str, end_date_str, complete)
+        logs.append(f"Feed-first: {len(items)} items from {feed['feed_url']}")
+        if not items:
+            logs.append("Result: 0 items found.")
+        return (items, logs, ("ok", 200)), logs
+
+    @staticmethod
+    def _unverified_feeds(company, feed_candidates):
+        """HTML から記事が取れた情報源でも、発見したフィードを一度読んで使えるか確かめる
+        (使えれば次回からフィード優先になる)。確かめるべき候補を返す。使えるフィードが
+        すでにあれば確かめない。使えないと分かったフィードは FEED_HTML_CHECK_HOURS が
+        過ぎるまで試し直さない。"""
+        if not FEED_HTML_CHECK_HOURS or not feed_candidates:
+            return []
+        known_feeds = {f["feed_url"]: f for f in storage.get_feeds(company["id"], company["url"])}
+        if any(f["good"] for f in known_feeds.values()):
+            return []
+        return [
+            feed_url for feed_url in feed_candidates
+            if feed_url not in known_feeds
+            or time.time() - known_feeds[feed_url]["checked_at"] >= FEED_HTML_CHECK_HOURS * 3600
+        ]
+
+    def _verify_feed(self, company, feed_url, logs):
+        """フィード候補を読んで使えるか確かめ、結果を保存する(取得エンジンのスレッドで実行)。
+        範囲は問わず、日付付きの記事を読めるかだけを見る。使えれば True。"""
+        read = self._read_feed(company, feed_url, "0000-00-00", "0000-00-00", logs)
+        if self._record_feed(company, feed_url, read):
+            logs.append(f"Feed verified: {feed_url}")
+            return True
+        return False
+
+    @staticmethod
+    def _record_feed(company, feed_url, read):
+        """フィードを読んだ結果を保存する。日付付きの記事を読めたら使えるフィード。"""
+        good = read is not None and read[1] is not None
+        storage.save_feed_check(company["id"], company["url"], feed_url, good)
+        return good
+
+    @staticmethod
+    def _page_encoding(company, resp, body, headers, logs):
+        """本文の文字コードを決める。BOM・Content-Type・<meta charset> で宣言されていれば
+        それを使い、統計的な判定(apparent_encoding。最大 MAX_FETCH_BYTES の全バイトを
+        走査するので重い)は宣言がないときだけ行う。判定結果は情報源ごとに保存し、
+        次回からはその文字コードで先頭部分を読めるか確かめるだけで済ませる。"""
+        encoding = declared_encoding(body, headers.get("Content-Type"))
+        if encoding:
+            return encoding
+        remembered = storage.get_source_encoding(company["id"], company["url"])
+        if remembered:
+            try:
+                # 先頭だけ厳密にデコードしてみる(マルチバイト文字の途中で切れても失敗しないよう
+                # 末尾は捨てる)。読めなければサイト側が変わったとみなして判定し直す
+                codecs.getincrementaldecoder(remembered)().decode(body[:META_CHARSET_SCAN_BYTES * 4])
+                return remembered
+            except (UnicodeDecodeError, LookupError):
+                pass
+        if isinstance(body, mmap.mmap):
+            # requests の apparent_encoding はメモリマップを受け付けない(この判定は情報源ごとに
+            # 初回だけなので、一時的なコピーで判定する)
+            encoding = chardet.detect(body[:])["encoding"]
+        else:
+            encoding = resp.apparent_encoding
+        if encoding:
+            storage.save_source_encoding(company["id"], company["url"], encoding)
+            logs.append(f"Charset detected: {encoding}")
+        return encoding
+
+    @staticmethod
+    def _response_bytes(resp):
+        """応答本文のバイト列(content を持たないテスト用ダミーは text から作る)。"""
+        content = getattr(resp, "content", None)
+        if content is None:
+            content = resp.text.encode("utf-8")
+        return content
+
+    @staticmethod
+    def _cached_extraction(company, body_hash):
+        """本文ハッシュが前回と一致し、同じ版の抽出ロジックで抽出したものなら
+        (前回抽出した記事, フィード候補) を返す。使えなければ None。
+        記事はページ上のすべての日付のもの(harvest)なので、今回の期間は問わない。"""
+        fingerprint = storage.get_page_fingerprint(company["id"], company["url"], EXTRACTOR_VERSION)
+        if not fingerprint or fingerprint["body_hash"] != body_hash:
+            return None
+        return fingerprint["items"], fingerprint["feed_candidates"]
+
+    @staticmethod
+    def _extract_items(company, soup, start_date_str, end_date_str, logs, recipe=None, learned=None, harvest=False):
+        """解析済みページから期間内の記事を抽出する(ライフ専用ロジック → 汎用ロジック)。
+        recipe があれば汎用ロジックはまずその要素だけを見る。learned(dict)を渡すと、
+        記事が取れた要素のレシピ({"container": 入れ物の目印, "steps": [[セレクタ, 探し方], ...]})
+        を入れる。
+        harvest なら期間外の日付の記事も含めて、ページ上のすべての記事を返す。"""
+        items = []
+        found_count = 0
+        low, high = HARVEST_RANGE if harvest else (start_date_str, end_date_str)
+
+        # --- ライフ専用ロジック (構造が特殊なため維持) ---
+        if company["id"] == "life":
+            life_dates = soup.find_all(string=LIFE_DATE_RE)
+            candidates_map = {}
+            for date_node in life_dates:
+                try:
+                    date_text = date_node.strip()
+                    y, m, d = date_text.split("/")
+                    found_date_str = f"{y}-{int(m):02d}-{int(d):02d}"
+                    if low <= found_date_str <= high:
+                        card_node = date_node.parent
+                        link_node = None
+                        for _ in range(5):
+                            if not card_node: break
+                            if card_node.name == 'a' and card_node.has_attr('href'):
+                                link_node = card_node
+                                break
+                            found_child_link = card_node.find('a', href=True)
+                            if found_child_link:
+                                link_node = found_child_link
+                                break
+                            card_node = card_node.parent
+
+                        if not link_node or not card_node: continue
+
+                        raw_url = urljoin(company["url"], link_node['href'])
+                        parsed = urlparse(raw_url)
+                        clean_url = urlunparse((parsed.scheme, parsed.netloc, parsed.path, '', '', ''))
+
+                        title_candidates = []
+                        img = card_node.find('img', alt=True)
+                        if img and len(img['alt'].strip()) > 1:
+                            title_candidates.append(img['alt'].strip())
+
+                        link_text = link_node.get_text(" ", strip=True)
+                        if len(link_text) > 1:
+                            title_candidates.append(link_text)
+
+                        card_full_text = card_node.get_text(" ", strip=True)
+                        ignore_words = [date_text, "社会・環境", "商品・サービス", "新店・改装", "その他", "すべて", "NEW", "お知らせ", "ニュースリリース", "重要なお知らせ"]
+                        for w in ignore_words:
+                            card_full_text = card_full_text.replace(w, "")
+                        clean_card_text = WHITESPACE_RE.sub(' ', card_full_text).strip()
+                        if len(clean_card_text) > 1:
+                            title_candidates.append(clean_card_text)
+
+                        best_title = ""
+                        if title_candidates:
+                            best_title = max(title_candidates, key=len)
+
+                        if not best_title: best_title = "【ライフ】ニュース詳細"
+
+                        if clean_url not in candidates_map:
+                            candidates_map[clean_url] = {
+                                "company_name": company["name"],
+                                "badge_color": company["badge_color"],
+                                "title": best_title,
+                                "url": clean_url,
+                                "date": found_date_str,
+                                "is_link_only": False,
+                                "is_error": False
+                            }
+                        else:
+                            if len(best_title) > len(candidates_map[clean_url]["title"]):
+                                candidates_map[clean_url]["title"] = best_title
+
+                except Exception as e:
+                    logs.append(f"Life error: {e}")
                     continue
-                elif resp.status_code != 200:
-                    debug_logs.append(f"Error Status: {resp.status_code}")
-                    all_items.append(self._fallback_item(company, start_date_str, resp.status_code))
-                    self.last_status[cid] = ("error", resp.status_code)
+
+            for item in candidates_map.values():
+                items.append(item)
+                found_count += 1
+                if start_date_str <= item["date"] <= end_date_str:
+                    logs.append(f"  -> Found (Life Best): {item['title'][:15]}...")
+
+        # --- 汎用ロジック (コンビニも含む全企業用) ---
+        # 「採点」や「強力検索」などの余計なことはせず、シンプルに探す
+        if found_count == 0 and recipe:
+            # 前回記事が取れた要素の位置と探し方(レシピ)があれば、まずその要素だけを見る
+            recipe_items = NewsScraper._extract_with_recipe(
+                company, soup, recipe, start_date_str, end_date_str, logs, harvest
+            )
+            if recipe_items is not None:
+                items.extend(recipe_items)
+                found_count += len(recipe_items)
+                if learned is not None:
+                    learned.update(recipe)
+        if found_count == 0:
+            # 各要素の正規化済みテキストを1回の走査でまとめて作る(要素ごとに get_text すると
+            # 入れ子の深さぶん同じ部分木を何度も文字列化し、巨大ページでほぼ二乗の時間になる)
+            index = _TextIndex(soup, GENERIC_TARGET_TAGS, date_matcher(company.get("date_format")))
+            # (url, date, title) で重複判定する。入れ子要素(例: li の中の div)が
+            # 同じ記事を二重に拾うのを防ぎつつ、統計ページ等の「同じURLに日付違いの
+            # お知らせが複数リンクする」ケースを別記事として残すため、url 単独ではなく
+            # 日付・タイトルまで含めたキーにしている
+            processed_keys = set()
+            steps = []
+            matched = []
+
+            for element in index.targets:
+                found = NewsScraper._element_item(company, element, index, start_date_str, end_date_str, logs, harvest)
+                if found is None:
                     continue
-                else:
-                    if getattr(resp, "_news_truncated", False):
-                        debug_logs.append(f"Page too large (> {MAX_FETCH_BYTES} bytes). Truncated at download.")
-                    html_content = resp.text
-                    # デコード後の第2の防衛線(通常のニュース一覧ページは数十万文字以内)
-                    if len(html_content) > MAX_HTML_CHARS:
-                        debug_logs.append(f"Page too large ({len(html_content)} chars). Truncated.")
-                        html_content = html_content[:MAX_HTML_CHARS]
-
-                resp = None  # ページ本文の生データはもう不要。参照を切って解放
-                soup = BeautifulSoup(html_content, "html.parser")
-                html_content = None  # 解析ツリーができたら文字列側も解放
+                item, strategy, dedup_key = found
+                if dedup_key not in processed_keys:
+                    items.append(item)
+                    processed_keys.add(dedup_key)
+                    found_count += 1
+                    if start_date_str <= item["date"] <= end_date_str:
+                        logs.append(f"  -> Found: {item['title'][:15]}...")
+                    # あえて break しない（同じ日に複数ニュースがある場合のため）
+                    matched.append(element)
+                    step = [_element_selector(element), strategy]
+                    if step not in steps:
+                        steps.append(step)
+            if learned is not None and steps:
+                learned.update({"container": _recipe_container(soup, index, matched), "steps": steps})
 
-            except Exception as exc:
-                debug_logs.append(f"Exception: {exc}")
-                all_items.append(self._fallback_item(company, start_date_str))
-                self.last_status[cid] = ("exception", None)
+        return items
+
+    @staticmethod
+    def _extract_with_recipe(company, soup, recipe, start_date_str, end_date_str, logs, harvest=False):
+        """レシピの入れ物の中の、レシピ([セレクタ, 探し方] の一覧)の要素だけから記事を抽出する。
+        入れ物は find で目印(id など)から直接たどるので、文書全体は走査しない。
+        0件、または検証に失敗したら None(呼び出し側が全要素の走査に戻る)。
+        harvest なら期間外の日付の記事も返す(検証は期間内の日付で行う)。
+
+        検証: 選んだ要素ではレシピと同じ探し方でリンクが見つかること、かつ
+        入れ物の本文にある期間内の日付がすべて抽出した記事で説明できること
+        (レイアウトが変わったり、入れ物の中のレシピにない場所に記事が増えたりしたら全走査に戻す)。"""
+        if not isinstance(recipe, dict):
+            return None  # 入れ物を持たない旧形式のレシピ。全走査で学習し直す
+        container = _find_container(soup, recipe["container"])
+        if container is None:
+            logs.append("Recipe container not found. Running full scan.")
+            return None
+        strategies = {}
+        for selector, strategy in recipe["steps"]:
+            strategies.setdefault(selector, set()).add(strategy)
+        try:
+            elements = container.select(", ".join(strategies))
+        except Exception as exc:
+            logs.append(f"Recipe selector error: {exc}")
+            return None
+        text = _PlainText(date_matcher(company.get("date_format")))
+        items = []
+        processed_keys = set()
+        for element in elements:
+            found = NewsScraper._element_item(company, element, text, start_date_str, end_date_str, logs, harvest)
+            if found is None:
                 continue
+            item, strategy, dedup_key = found
+            if strategy not in strategies.get(_element_selector(element), ()):
+                logs.append("Recipe validation failed (layout changed). Running full scan.")
+                return None
+            if dedup_key not in processed_keys:
+                items.append(item)
+                processed_keys.add(dedup_key)
+                if start_date_str <= item["date"] <= end_date_str:
+                    logs.append(f"  -> Found: {item['title'][:15]}...")
+        if not items:
+            return None
+        container_text = unicodedata.normalize("NFKC", container.get_text(" "))
+        container_dates = {
+            f"{y}-{int(m):02d}-{int(d):02d}" for y, m, d in DATE_FLEX_CAPTURE_RE.findall(container_text)
+        }
+        in_range = {d for d in container_dates if start_date_str <= d <= end_date_str}
+        if not in_range <= {i["date"] for i in items}:
+            logs.append("Recipe validation failed (dates outside the recipe). Running full scan.")
+            return None
+        logs.append(f"Recipe: {len(items)} items from {len(elements)} learned elements.")
+        return items
 
-            self.last_status[cid] = ("ok", 200)
-            found_count = 0
-
-            # --- ライフ専用ロジック (構造が特殊なため維持) ---
-            if company["id"] == "life":
-                life_dates = soup.find_all(string=LIFE_DATE_RE)
-                candidates_map = {}
-                for date_node in life_dates:
-                    try:
-                        date_text = date_node.strip()
-                        y, m, d = date_text.split("/")
-                        found_date_str = f"{y}-{int(m):02d}-{int(d):02d}"
-                        if start_date_str <= found_date_str <= end_date_str:
-                            card_node = date_node.parent
-                            link_node = None
-                            for _ in range(5):
-                                if not card_node: break
-                                if card_node.name == 'a' and card_node.has_attr('href'):
-                                    link_node = card_node
-                                    break
-                                found_child_link = card_node.find('a', href=True)
-                                if found_child_link:
-                                    link_node = found_child_link
-                                    break
-                                card_node = card_node.parent
-
-                            if not link_node or not card_node: continue
-
-                            raw_url = urljoin(company["url"], link_node['href'])
-                            parsed = urlparse(raw_url)
-                            clean_url = urlunparse((parsed.scheme, parsed.netloc, parsed.path, '', '', ''))
-
-                            title_candidates = []
-                            img = card_node.find('img', alt=True)
-                            if img and len(img['alt'].strip()) > 1:
-                                title_candidates.append(img['alt'].strip())
-
-                            link_text = link_node.get_text(" ", strip=True)
-                            if len(link_text) > 1:
-                                title_candidates.append(link_text)
-
-                            card_full_text = card_node.get_text(" ", strip=True)
-                            ignore_words = [date_text, "社会・環境", "商品・サービス", "新店・改装", "その他", "すべて", "NEW", "お知らせ", "ニュースリリース", "重要なお知らせ"]
-                            for w in ignore_words:
-                                card_full_text = card_full_text.replace(w, "")
-                            clean_card_text = WHITESPACE_RE.sub(' ', card_full_text).strip()
-                            if len(clean_card_text) > 1:
-                                title_candidates.append(clean_card_text)
-
-                            best_title = ""
-                            if title_candidates:
-                                best_title = max(title_candidates, key=len)
-
-                            if not best_title: best_title = "【ライフ】ニュース詳細"
-
-                            if clean_url not in candidates_map:
-                                candidates_map[clean_url] = {
-                                    "company_name": company["name"],
-                                    "badge_color": company["badge_color"],
-                                    "title": best_title,
-                                    "url": clean_url,
-                                    "date": found_date_str,
-                                    "is_link_only": False,
-                                    "is_error": False
-                                }
-                            else:
-                                if len(best_title) > len(candidates_map[clean_url]["title"]):
-                                    candidates_map[clean_url]["title"] = best_title
-
-                    except Exception as e:
-                        debug_logs.append(f"Life error: {e}")
-                        continue
-
-                for item in candidates_map.values():
-                    all_items.append(item)
-                    found_count += 1
-                    debug_logs.append(f"  -> Found (Life Best): {item['title'][:15]}...")
-
-            # --- 汎用ロジック (コンビニも含む全企業用) ---
-            # 「採点」や「強力検索」などの余計なことはせず、シンプルに探す
-            if found_count == 0:
-                target_tags = soup.find_all(['dt', 'dd', 'li', 'div', 'p', 'span', 'time', 'td', 'tr'])
-                # (url, date, title) で重複判定する。入れ子要素(例: li の中の div)が
-                # 同じ記事を二重に拾うのを防ぎつつ、統計ページ等の「同じURLに日付違いの
-                # お知らせが複数リンクする」ケースを別記事として残すため、url 単独ではなく
-                # 日付・タイトルまで含めたキーにしている
-                processed_keys = set()
-
-                for element in target_tags:
-                    full_text = unicodedata.normalize("NFKC", element.get_text(" ", strip=True))
-                    if len(full_text) > 500: continue
-
-                    # 複数の日付を含む要素はコンテナ（複数ニュースの親要素）なのでスキップ
-                    all_date_matches = DATE_FLEX_FINDALL_RE.findall(full_text)
-                    if len(all_date_matches) > 1: continue
-
-                    match = DATE_FLEX_CAPTURE_RE.search(full_text)
-                    if not match: continue
-                    y, m, d = match.groups()
-                    found_date_str = f"{y}-{int(m):02d}-{int(d):02d}"
+    @staticmethod
+    def _element_item(company, element, index, start_date_str, end_date_str, logs, harvest=False):
+        """日付を1つだけ含む期間内の要素から記事を作る。(記事, リンクの探し方, 重複判定キー)
+        または None。探し方は "dt_dd" / "inner" / "parent" / "sibling"(学習するレシピに記録する)。
+        harvest なら期間外の日付の要素からも作る(ログに残すのは期間内の要素だけ)。"""
+        if index.length(element) > 500: return None
 
-                    if start_date_str <= found_date_str <= end_date_str:
-                        if company["id"] == "life": continue # ライフは済んでいるのでスキップ
-
-                        debug_logs.append(f"★ MATCH: {found_date_str} in <{element.name}>")
-                        link_tag = None
-
-                        # 1. dtなら隣のddを見る (よくあるパターン)
-                        if element.name == 'dt':
-                            dd_node = element.find_next_sibling('dd')
-                            if dd_node: link_tag = dd_node.find('a', href=True)
-
-                        # 2. 自分自身の中にリンクがあるか。
-                        #    「一覧を見る」等の案内リンクは飛ばしてタイトルらしいリンクを優先し、
-                        #    有効なリンクが1つもなければ従来どおり最初のリンクを使う
-                        #    (リンク文字列が空の画像リンク型サイトを壊さないため)
-                        if not link_tag:
-                            anchors = element.find_all('a', href=True)
-                            if anchors:
-                                link_tag = next(
-                                    (a for a in anchors
-                                     if len(a.get_text(strip=True)) > 4
-                                     and a.get_text(strip=True) not in SIBLING_LINK_IGNORE),
-                                    anchors[0],
-                                )
-
-                        # 3. 親や兄弟を探す (少し範囲を広げる)
-                        if not link_tag:
-                            curr = element
-                            for _ in range(5):
-                                if not curr: break
-                                if curr.name == 'a' and curr.has_attr('href'):
-                                    link_tag = curr
-                                    break
-                                # 親要素が複数日付を含む場合はコンテナなので探索を中止
-                                if curr != element:
-                                    parent_text = unicodedata.normalize("NFKC", curr.get_text(" ", strip=True))
-                                    parent_dates = DATE_FLEX_FINDALL_RE.findall(parent_text)
-                                    if len(parent_dates) > 1:
-                                        break
-                                # 親の要素内にある他のリンクを探す（行全体がリンクになっていない場合など）
-                                if curr.name in ['li', 'tr', 'article', 'td'] or (curr.name=='div' and any(c in str(curr.get('class')) for c in ['item', 'news', 'col', 'block'])):
-                                    links = curr.find_all("a", href=True)
-                                    valid = [l for l in links if len(l.get_text(strip=True)) > 4] # 短すぎるリンクは無視
-                                    if valid:
-                                        # 一番文字数が長いリンクを採用（「詳細」などよりタイトルを選ぶため）
-                                        link_tag = max(valid, key=lambda l: len(l.get_text(strip=True)))
-                                        break
-                                curr = curr.parent
-
-                        # 4. 日付要素の直後の兄弟要素にリンクがあるパターン
-                        #    (日付とタイトルが別々の div/p として並ぶレイアウト。省庁サイト等に多い)
-                        if not link_tag:
-                            sibling = element.find_next_sibling()
-                            hops = 0
-                            while sibling is not None and hops < 3:
-                                sib_text = unicodedata.normalize("NFKC", sibling.get_text(" ", strip=True))
-                                # 兄弟に別の日付があれば次の行に入ったとみなして打ち切り
-                                if DATE_FLEX_FINDALL_RE.search(sib_text):
-                                    break
-                                cand = sibling if (sibling.name == "a" and sibling.has_attr("href")) else sibling.find("a", href=True)
-                                if cand is not None:
-                                    cand_text = cand.get_text(strip=True)
-                                    if len(cand_text) > 4 and cand_text not in SIBLING_LINK_IGNORE:
-                                        link_tag = cand
-                                        break
-                                sibling = sibling.find_next_sibling()
-                                hops += 1
-
-                        if not link_tag:
-                            debug_logs.append("  (date matched but no link found nearby)")
-
-                        if link_tag and link_tag.get("href"):
-                            title = link_tag.get_text(strip=True)
-                            url = urljoin(company["url"], link_tag["href"])
-
-                            # タイトル補完 (リンク自体に文字がない場合、親要素のテキストを使う)
-                            if not title or len(title) < 5:
-                                if link_tag.parent:
-                                    parent_text = link_tag.parent.get_text(" ", strip=True)
-                                    # 日付だけ削除してタイトルにする
-                                    clean_title = DATE_STRIP_RE.sub("", parent_text).strip()
-                                    if len(clean_title) > 5:
-                                        title = clean_title
-                                    else:
-                                        title = "ニュース詳細"
-
-                            dedup_key = (url, found_date_str, title)
-                            if dedup_key not in processed_keys:
-                                all_items.append({
-                                    "company_name": company["name"],
-                                    "badge_color": company["badge_color"],
-                                    "title": title[:100] + "..." if len(title) > 100 else title,
-                                    "url": url,
-                                    "date": found_date_str,
-                                    "is_link_only": False,
-                                    "is_error": False
-                                })
-                                processed_keys.add(dedup_key)
-                                found_count += 1
-                                debug_logs.append(f"  -> Found: {title[:15]}...")
-                                # あえて break しない（同じ日に複数ニュースがある場合のため）
-
-            # --- フィード(RSS/Atom)フォールバック ---
-            # HTML からの抽出が0件だった場合、設定済みの rss_url またはページが
-            # <head> で宣言しているフィードを自動発見して読む。サイトの見た目
-            # (HTML 構造)が変わってもフィードは安定しているため、自己修復として機能する
-            if found_count == 0:
-                for feed_url in self._feed_candidates(company, soup):
-                    feed_items = self._fetch_feed_items(company, feed_url, start_date_str, end_date_str, debug_logs)
-                    if feed_items:
-                        all_items.extend(feed_items)
-                        found_count += len(feed_items)
-                        debug_logs.append(f"  -> Feed fallback: {len(feed_items)} items from {feed_url}")
+        # 日付のない要素はここで落とす。複数の日付を含む要素はコンテナ
+        # （複数ニュースの親要素）なのでスキップ
+        dates = index.dates(element, limit=2)
+        if len(dates) != 1: return None
+        found_date_str = dates[0]
+
+        in_range = start_date_str <= found_date_str <= end_date_str
+        if not (in_range or harvest):
+            return None
+        if company["id"] == "life": return None # ライフは済んでいるのでスキップ
+
+        if in_range:
+            logs.append(f"★ MATCH: {found_date_str} in <{element.name}>")
+        link_tag = None
+        strategy = None
+
+        # 1. dtなら隣のddを見る (よくあるパターン)
+        if element.name == 'dt':
+            dd_node = element.find_next_sibling('dd')
+            if dd_node: link_tag = dd_node.find('a', href=True)
+            strategy = "dt_dd"
+
+        # 2. 自分自身の中にリンクがあるか。
+        #    「一覧を見る」等の案内リンクは飛ばしてタイトルらしいリンクを優先し、
+        #    有効なリンクが1つもなければ従来どおり最初のリンクを使う
+        #    (リンク文字列が空の画像リンク型サイトを壊さないため)
+        if not link_tag:
+            strategy = "inner"
+            anchors = element.find_all('a', href=True)
+            if anchors:
+                link_tag = next(
+                    (a for a in anchors
+                     if len(a.get_text(strip=True)) > 4
+                     and a.get_text(strip=True) not in SIBLING_LINK_IGNORE),
+                    anchors[0],
+                )
+
+        # 3. 親や兄弟を探す (少し範囲を広げる)
+        if not link_tag:
+            strategy = "parent"
+            curr = element
+            for _ in range(5):
+                if not curr: break
+                if curr.name == 'a' and curr.has_attr('href'):
+                    link_tag = curr
+                    break
+                # 親要素が複数日付を含む場合はコンテナなので探索を中止
+                if curr != element:
+                    if index.date_count(curr, limit=2) > 1:
                         break
+                # 親の要素内にある他のリンクを探す（行全体がリンクになっていない場合など）
+                if curr.name in ['li', 'tr', 'article', 'td'] or (curr.name=='div' and any(c in str(curr.get('class')) for c in ['item', 'news', 'col', 'block'])):
+                    links = curr.find_all("a", href=True)
+                    valid = [l for l in links if len(l.get_text(strip=True)) > 4] # 短すぎるリンクは無視
+                    if valid:
+                        # 一番文字数が長いリンクを採用（「詳細」などよりタイトルを選ぶため）
+                        link_tag = max(valid, key=lambda l: len(l.get_text(strip=True)))
+                        break
+                curr = curr.parent
 
-            # 解析ツリーを明示的に解放する。BeautifulSoup のツリーは循環参照を
-            # 含むため、放置すると GC が回るまでメモリに残り続ける
+        # 4. 日付要素の直後の兄弟要素にリンクがあるパターン
+        #    (日付とタイトルが別々の div/p として並ぶレイアウト。省庁サイト等に多い)
+        if not link_tag:
+            strategy = "sibling"
+            sibling = element.find_next_sibling()
+            hops = 0
+            while sibling is not None and hops < 3:
+                # 兄弟に別の日付があれば次の行に入ったとみなして打ち切り
+                if index.date_count(sibling, limit=1):
+                    break
+                cand = sibling if (sibling.name == "a" and sibling.has_attr("href")) else sibling.find("a", href=True)
+                if cand is not None:
+                    cand_text = cand.get_text(strip=True)
+                    if len(cand_text) > 4 and cand_text not in SIBLING_LINK_IGNORE:
+                        link_tag = cand
+                        break
+                sibling = sibling.find_next_sibling()
+                hops += 1
+
+        if not link_tag and in_range:
+            logs.append("  (date matched but no link found nearby)")
+
+        if not (link_tag and link_tag.get("href")):
+            return None
+        title = link_tag.get_text(strip=True)
+        url = urljoin(company["url"], link_tag["href"])
+
+        # タイトル補完 (リンク自体に文字がない場合、親要素のテキストを使う)
+        if not title or len(title) < 5:
+            if link_tag.parent:
+                parent_text = link_tag.parent.get_text(" ", strip=True)
+                # 日付だけ削除してタイトルにする
+                clean_title = DATE_STRIP_RE.sub("", parent_text).strip()
+                if len(clean_title) > 5:
+                    title = clean_title
+                else:
+                    title = "ニュース詳細"
+
+        return {
+            "company_name": company["name"],
+            "badge_color": company["badge_color"],
+            "title": title[:100] + "..." if len(title) > 100 else title,
+            "url": url,
+            "date": found_date_str,
+            "is_link_only": False,
+            "is_error": False
+        }, strategy, (url, found_date_str, title)
+
+
+# ==========================================
+#  解析ステージ(スレッド / プロセスプール共通)
+# ==========================================
+def html_parser_backend(company):
+    """この情報源の解析に使うツリービルダー名と、フォールバックしたかどうかを返す。"""
+    requested = company.get("parser") or HTML_PARSER
+    if builder_registry.lookup(requested) is None:
+        return DEFAULT_HTML_PARSER, requested
+    return requested, None
+
+
+def region_strainer(company):
+    """companies.py の "region"(SoupStrainer の引数。例: {"id": "news"},
+    {"name": "ul", "class": "news-list"})から、その要素の部分木だけを作るストレーナー。
+    指定がなければ None(文書全体を解析する)。"""
+    region = company.get("region")
+    if not region:
+        return None
+    return SoupStrainer(**region)
+
+
+def _head_soup(html_content, backend):
+    """<head> 部分の <link> だけを解析する(region で本文を絞ったときのフィード候補用)。"""
+    match = HEAD_END_RE.search(html_content, 0, MAX_HTML_CHARS)
+    head = html_content[:match.end()] if match else html_content[:HEAD_SCAN_CHARS]
+    return BeautifulSoup(head, backend, parse_only=SoupStrainer("link"))
+
+
+def _region_needs_full_parse(soup, start_date_str, end_date_str):
+    """region で絞った部分木から記事が取れなかったとき、文書全体を解析し直すべきか。
+    日付が1つもない(入れ物が見つからない・レイアウトが変わった)か、期間内の日付は
+    あるのに記事にならなかった(リンクが入れ物の外にある)なら True。期間外の日付しか
+    なければ、全体を解析しても記事はないので False。"""
+    text = unicodedata.normalize("NFKC", soup.get_text(" "))
+    dates = [f"{y}-{int(m):02d}-{int(d):02d}" for y, m, d in DATE_FLEX_CAPTURE_RE.findall(text)]
+    return not dates or any(start_date_str <= d <= end_date_str for d in dates)
+
+
+def parse_page(body, encoding, company, start_date_str, end_date_str, recipe=None, harvest=False):
+    """本文のバイト列をデコード・解析して (html_items, feed_candidates, logs, status, recipe) を返す。
+    recipe は前回学習した抽出レシピ(なければ None)で、戻り値の recipe は今回記事が
+    取れた要素のレシピ(取れなければ空の dict)。引数も戻り値も pickle できる素のデータ
+    なので、プロセスプールのワーカーでもスレッドでも同じ結果になる。
+    harvest なら html_items は期間外の日付も含むページ上のすべての記事。
+
+    情報源に "region" があれば、ヘッダー・メニュー・フッター等を木にせず、その要素の
+    部分木だけを作って抽出する(解析時間とピーク時のメモリを減らす)。フィード候補は
+    <head> の <link> だけを別に解析して探す。部分木から記事が取れず、全体を見れば
+    取れる可能性があるときは文書全体を解析し直す。"""
+    logs = []
+    try:
+        # requests の Response.text と同じデコード(未知の文字コードは UTF-8 扱い)
+        try:
+            html_content = str(body, encoding or "utf-8", errors="replace")
+        except (LookupError, TypeError):
+            html_content = str(body, errors="replace")
+        if isinstance(body, mmap.mmap):
+            body.close()  # 一時ファイルに逃がした本文のマップを外す
+        body = None  # デコードできたら生データは不要
+        # デコード後の第2の防衛線(通常のニュース一覧ページは数十万文字以内)
+        if len(html_content) > MAX_HTML_CHARS:
+            logs.append(f"Page too large ({len(html_content)} chars). Truncated.")
+            html_content = html_content[:MAX_HTML_CHARS]
+        backend, unavailable = html_parser_backend(company)
+        if unavailable:
+            logs.append(f"Parser '{unavailable}' not available. Using {backend}.")
+        strainer = region_strainer(company)
+        if strainer is not None:
+            soup = BeautifulSoup(html_content, backend, parse_only=strainer)
+            head = _head_soup(html_content, backend)
+        else:
+            soup = BeautifulSoup(html_content, backend)
+            html_content = None  # 解析ツリーができたら文字列側も解放
+            head = None
+    except Exception as exc:
+        logs.append(f"Exception: {exc}")
+        return [], [], logs, ("exception", None), {}
+
+    learned = {}
+    items = NewsScraper._extract_items(company, soup, start_date_str, end_date_str, logs, recipe, learned, harvest)
+    if strainer is not None:
+        if (not _in_range(items, start_date_str, end_date_str)
+                and _region_needs_full_parse(soup, start_date_str, end_date_str)):
+            logs.append("Region yielded no items. Parsing the full page.")
             soup.decompose()
+            head.decompose()
+            try:
+                soup = BeautifulSoup(html_content, backend)
+            except Exception as exc:
+                logs.append(f"Exception: {exc}")
+                return [], [], logs, ("exception", None), {}
+            head = None
+            learned = {}
+            items = NewsScraper._extract_items(
+                company, soup, start_date_str, end_date_str, logs, recipe, learned, harvest
+            )
+        html_content = None
+    feed_candidates = NewsScraper._feed_candidates(company, head if head is not None else soup)
+    # 解析ツリーを明示的に解放する。BeautifulSoup のツリーは循環参照を
+    # 含むため、放置すると GC が回るまでメモリに残り続ける
+    soup.decompose()
+    if head is not None:
+        head.decompose()
+    return items, feed_candidates, logs, ("ok", 200), learned
 
-            if found_count == 0:
-                debug_logs.append("Result: 0 items found.")
 
-        return all_items, debug_logs, checked_company_names
+def _parse_job(job):
+    """スレッドで parse_page を実行する。job から本文を取り出して渡し、
+    解析中に生データとデコード後の文字列・解析ツリーが同時に残らないようにする。"""
+    return parse_page(
+        job.pop("body"), job["encoding"], job["company"], job["start_date_str"], job["end_date_str"],
+        job["recipe"], harvest=True,
+    )
+
+
+def _limit_worker_memory(limit_mb):
+    """プロセスプールのワーカー初期化: アドレス空間の上限を設定する(対応 OS のみ)。
+    上限を超えた解析は MemoryError になり、その1件だけがエラー扱いになる。"""
+    if not limit_mb:
+        return
+    try:
+        import resource
+        limit = limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+_parse_executor_lock = threading.Lock()
+_parse_executor_instance = None
+
+
+def _parse_executor():
+    """解析用プロセスプール(NEWS_PARSE_WORKERS が 0 なら None = スレッドで直列に解析)。
+    起動コストが大きいのでプロセス内で1つを使い回す。"""
+    global _parse_executor_instance
+    if PARSE_WORKERS <= 0:
+        return None
+    with _parse_executor_lock:
+        if _parse_executor_instance is None:
+            # fork だと親プロセスのスレッドやメモリ配置を引き継ぎ、アドレス空間の
+            # 上限設定が正しく効かないため spawn で起動する
+            _parse_executor_instance = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_limit_worker_memory,
+                initargs=(PARSE_WORKER_MEMORY_MB,),
+                max_tasks_per_child=PARSE_WORKER_MAX_TASKS,
+            )
+        return _parse_executor_instance
+
+
+def _discard_parse_executor(executor):
+    """異常終了したプロセスプールを捨てる(次回の収集で作り直す)。"""
+    global _parse_executor_instance
+    with _parse_executor_lock:
+        if _parse_executor_instance is executor:
+            _parse_executor_instance = None
+    executor.shutdown(wait=False, cancel_futures=True)
@@ -5,14 +5,21 @@
 画面へ返す形式(items, logs, checked_names)はスクレイパー単体の
 出力と互換で、フロントエンドはこの層の存在を意識しない。
 """
+import logging
+import threading
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
 
 from .companies import COMPANIES
 from .envutil import env_int
 from .scraper import NewsScraper
+from .singleflight import SingleFlight
 from . import storage
 
+logger = logging.getLogger("uvicorn.error")
+
 # キャッシュの鮮度(秒)。環境変数で調整可能(不正値は既定値にフォールバック)
 TTL_TODAY = env_int("NEWS_TTL_TODAY", 1800, minimum=0)    # 今日を含む日付: 30分
 TTL_PAST = env_int("NEWS_TTL_PAST", 86400, minimum=0)     # 過去日: 24時間
@@ -22,6 +29,23 @@ TTL_ERROR = env_int("NEWS_TTL_ERROR", 300, minimum=0)     # エラーだった
 # 上限を超えた分はキャッシュ対象外となり毎回スクレイピングされるだけで、結果は正しい)
 MAX_COVERAGE_DAYS = 400
 
+# 画面の表示(serve_news)では、古くなった企業もこの秒数以内に収集したものなら保存済みの
+# 内容をすぐ返し、再収集はバックグラウンドで行う。これより古い・未収集の企業は従来どおり
+# 収集を待つ。0 で無効(常に収集を待つ)
+STALE_SERVE_MAX_SECONDS = env_int("NEWS_STALE_SERVE_MAX_SECONDS", 172800, minimum=0)
+# バックグラウンドの再収集を同時に行う数(1回の再収集の中の並列数は NEWS_FETCH_MAX_WORKERS)
+REFRESH_WORKERS = env_int("NEWS_REFRESH_WORKERS", 2, minimum=1)
+
+# 企業の収集リースの期限(秒)。収集中は1社ぶんの収集を終えるたびに期限を延ばすので、
+# 長い収集でも他のワーカーに奪われない。収集中のワーカーが落ちたり止まったりすれば
+# 最後の延長からこの時間で他が引き継げる。他のスレッドの収集を待つのもこの時間まで
+SCRAPE_LEASE_SECONDS = env_int("NEWS_SCRAPE_LEASE_SECONDS", 120, minimum=1)
+# 他のワーカーのリースが外れたかを確認する間隔(秒)
+LEASE_POLL_SECONDS = 0.2
+
+# このプロセスで収集中の企業。同時に来たリクエストは収集を待って結果を共有する
+_SOURCE_FLIGHTS = SingleFlight()
+
 
 def _date_range(start_str, end_str, cap=MAX_COVERAGE_DAYS):
     try:
@@ -39,28 +63,228 @@ def _date_range(start_str, end_str, cap=MAX_COVERAGE_DAYS):
     return days
 
 
-def _is_fresh(cov_entry, day, today_str, now):
-    if not cov_entry:
+def _next_day(day):
+    return (datetime.strptime(day, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def _covering(spans, first, last):
+    """収集記録の区間(storage.get_coverage_spans の1企業ぶん、first_date 順)のうち
+    first〜last を隙間なく覆うものを、first〜last に切り詰めて返す。覆えなければ None。"""
+    covering = []
+    expected = first
+    for span_first, span_last, *result in spans or ():
+        if span_last < expected:
+            continue
+        if span_first > expected:
+            return None
+        covering.append((expected, min(span_last, last), *result))
+        if span_last >= last:
+            return covering
+        expected = _next_day(span_last)
+    return None
+
+
+def _is_fresh(covering, today_str, now):
+    """期間を覆う収集記録(_covering の結果)がすべて鮮度内か。"""
+    if not covering:
         return False
-    fetched_at, status, _code = cov_entry
-    if status in ("error", "exception"):
-        ttl = TTL_ERROR
-    elif day >= today_str:
-        ttl = TTL_TODAY
-    else:
-        ttl = TTL_PAST
-    return (now - fetched_at) <= ttl
+    for first, last, fetched_at, status, _code in covering:
+        if status in ("error", "exception"):
+            ttl = TTL_ERROR
+        elif first >= today_str:
+            ttl = TTL_TODAY
+        elif last < today_str:
+            ttl = TTL_PAST
+        else:
+            ttl = min(TTL_TODAY, TTL_PAST)  # 今日と過去日をまたぐ区間は短い方で判断する
+        if now - fetched_at > ttl:
+            return False
+    return True
+
+
+def _span_overlaps(company, start_str, end_str):
+    """情報源が宣言する日付範囲(companies.py の date_span)と検索範囲が重なるか。
+    宣言のない情報源は常に重なるものとして扱う。"""
+    span = company.get("date_span")
+    if not span:
+        return True
+    return span[0] <= end_str and start_str <= span[1]
+
+
+_refresh_lock = threading.Lock()
+_refresh_executor = None
+# 再収集を予約済みの (company_id, start, end)。同じ範囲を重ねて予約しない
+_refreshing = set()
+
+
+def _servable_while_stale(covering, now):
+    """古くなった企業でも、期間全体を STALE_SERVE_MAX_SECONDS 以内に収集していれば
+    保存済みの内容を返してよい。"""
+    return bool(covering) and now - min(span[2] for span in covering) <= STALE_SERVE_MAX_SECONDS
+
+
+def _schedule_refresh(company_ids, start_date_str, end_date_str):
+    """company_ids の再収集をバックグラウンドのスレッドプールに予約する。"""
+    global _refresh_executor
+    with _refresh_lock:
+        keys = [(cid, start_date_str, end_date_str) for cid in company_ids]
+        keys = [key for key in keys if key not in _refreshing]
+        if not keys:
+            return
+        _refreshing.update(keys)
+        if _refresh_executor is None:
+            _refresh_executor = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix="news-refresh")
+        _refresh_executor.submit(_refresh, keys, start_date_str, end_date_str)
+
+
+def _refresh(keys, start_date_str, end_date_str):
+    try:
+        # 予約から実行までに別のリクエストが収集していれば、get_news はキャッシュから返すだけ
+        get_news([cid for cid, _s, _e in keys], start_date_str, end_date_str)
+    except Exception:
+        logger.exception("[refresh] background refresh failed")
+    finally:
+        with _refresh_lock:
+            _refreshing.difference_update(keys)
+
+
+def _pending_refresh(company_ids, start_date_str, end_date_str):
+    """company_ids のうち、この範囲の再収集を予約中か、いま収集中(このプロセスの別スレッド、
+    または SQLite のリースを持つ別のワーカー)の企業。DB には書き込まない。"""
+    with _refresh_lock:
+        reserved = {cid for cid, start, end in _refreshing if (start, end) == (start_date_str, end_date_str)}
+    pending = {cid for cid in company_ids if cid in reserved or _SOURCE_FLIGHTS.active(cid)}
+    pending |= storage.held_scrape_leases([cid for cid in company_ids if cid not in pending])
+    return [cid for cid in company_ids if cid in pending]
+
+
+def _cached_items(scraper, company, ent, db_items, start_date_str):
+    """収集記録 ent((fetched_at, status, status_code)。None なら成功扱い)に応じて、
+    保存済みの記事 db_items か、403/エラーのフォールバック項目を返す。(items, status)。"""
+    status, code = (ent[1], ent[2]) if ent else ("ok", None)
+    if status == "ok":
+        return db_items, status
+    if status == "404":
+        return [], status
+    fallback = scraper._fallback_item(company, start_date_str, code if status in ("403", "error") else None)
+    return ([fallback] if fallback else []), status
+
+
+def _scrape_and_store(scraper, scrape_ids, start_date_str, end_date_str, days, force=False):
+    """scrape_ids を実際にスクレイピングし、記事の保存と coverage の記録まで行う。
+    (items, logs, revalidated) を返す。revalidated は 304 で変化のなかった企業。"""
+    company_map = {c["id"]: c for c in COMPANIES}
+    name_to_id = {c["name"]: c["id"] for c in COMPANIES}
+    items, logs, _checked = scraper.fetch_news(scrape_ids, start_date_str, end_date_str, force=force)
+    # ページ上の期間外の記事と、そのページが網羅する期間 {company_id: (items, first, last)}
+    harvest = getattr(scraper, "last_harvest", None) or {}
+
+    # 実ニュースを保存(company_name → id へ逆引き。未知の企業名は保存しない)。
+    # 期間外の記事も保存しておき、後から別の日付を検索されたときに DB から返す
+    to_save = []
+    for it in items:
+        if it and not it.get("is_link_only") and not it.get("is_error"):
+            cid = name_to_id.get(it.get("company_name"))
+            if cid:
+                to_save.append({**it, "company_id": cid})
+    for cid, (harvested, _first, _last) in harvest.items():
+        to_save.extend({**it, "company_id": cid} for it in harvested)
+    if to_save:
+        storage.save_items(to_save)
+
+    # 収集結果ステータスを coverage に記録(次回のキャッシュ判断に使う)。
+    # 304(前回から変化なし)は収集成功として記録し、記事は DB の保存済みから返す。
+    # 読めたページは、要求された日付に加えてそのページが網羅する日付も収集済みにする
+    revalidated = set()
+    for cid, (status, code) in (getattr(scraper, "last_status", None) or {}).items():
+        if status == "not_modified":
+            revalidated.add(cid)
+            status = "ok"
+        covered = [(days[0], days[-1])]
+        if status == "ok" and cid in harvest:
+            _harvested, first, last = harvest[cid]
+            covered.extend(_harvested_range(company_map[cid], first, last))
+        storage.record_coverage_ranges(cid, covered, status, code)
+    return items, logs, revalidated
+
+
+def _harvested_range(company, first, last):
+    """ページが網羅する期間 first〜last のうち、収集済みとして記録してよい部分([] か [(first, last)])。
+    情報源の date_span の外と、直近 MAX_COVERAGE_DAYS 日より前の日付は記録しない。"""
+    span = company.get("date_span")
+    if span:
+        first, last = max(first, span[0]), min(last, span[1])
+    oldest = (datetime.now() - timedelta(days=MAX_COVERAGE_DAYS - 1)).strftime("%Y-%m-%d")
+    first = max(first, oldest)
+    return [(first, last)] if first <= last else []
+
+
+def _wait_for_leases(company_ids):
+    """他のワーカーが持つ収集リースが外れる(収集が終わる・延長が止まって期限が切れる)まで待つ。"""
+    while storage.held_scrape_leases(company_ids):
+        time.sleep(LEASE_POLL_SECONDS)
+
+
+def _lease_renewer(company_ids, owner):
+    """収集中、1社ぶんの収集を終えるたびに company_ids のリースを延ばす関数
+    (NewsScraper.on_page_done に渡す)。延長の失敗で収集は止めない。"""
+    def renew(_company_id):
+        try:
+            storage.renew_scrape_leases(company_ids, owner, SCRAPE_LEASE_SECONDS)
+        except Exception:
+            logger.exception("[lease] failed to renew scrape leases")
+    return renew
+
+
+def _shared_coverage(company_ids, days, today_str, since, force):
+    """他の収集を待った企業のうち、その収集で収集記録が新しくなった企業の
+    {company_id: 期間を覆う区間} を返す。
+    force のときは待ち始める前(since)以降に収集されたものだけを新しいとみなす。"""
+    spans = storage.get_coverage_spans(company_ids, days[0], days[-1])
+    now = time.time()
+    shared = {}
+    for cid in company_ids:
+        covering = _covering(spans.get(cid), days[0], days[-1])
+        if force:
+            fresh = bool(covering) and all(span[2] >= since for span in covering)
+        else:
+            fresh = _is_fresh(covering, today_str, now)
+        if fresh:
+            shared[cid] = covering
+    return shared
 
 
 def get_news(company_ids, start_date_str, end_date_str, force=False):
     """(items, debug_logs, checked_names, last_collected_epoch) を返す。
+    古い企業は収集を待つ(定時収集・バックグラウンドの再収集・テスト用)。"""
+    items, logs, checked_names, last_collected, _refreshing = _get_news(
+        company_ids, start_date_str, end_date_str, force
+    )
+    return items, logs, checked_names, last_collected
+
+
+def serve_news(company_ids, start_date_str, end_date_str, force=False):
+    """画面表示用の get_news。(items, debug_logs, checked_names, last_collected_epoch,
+    refreshing_ids) を返す。
+
+    古くなった企業でも NEWS_STALE_SERVE_MAX_SECONDS 以内に収集済みなら保存済みの内容を
+    すぐ返し、再収集をバックグラウンドに予約する(refreshing_ids)。画面はその完了を
+    /refresh で確認して表示を差し替える。応答時間がいちばん遅いサイトに引きずられない。"""
+    return _get_news(company_ids, start_date_str, end_date_str, force, background=True)
+
+
+def _get_news(company_ids, start_date_str, end_date_str, force=False, background=False):
+    """get_news / serve_news の本体。
 
     - force_link 企業は従来どおり毎回リンク項目を生成
+    - 年別ページなど date_span が検索範囲と重ならない情報源は取得しない
+      (記事がありえないので、収集記録がなければ収集済み(0件)として記録する)
     - キャッシュが新しい企業は DB から返す(403/エラーはフォールバック項目を再構成)
     - それ以外の企業だけ実際にスクレイピングし、結果を DB に保存
+      (ページ上の期間外の記事も保存し、ページが網羅する日付も収集済みとして記録する)
+    - 同じ企業を別のリクエスト(スレッド・ワーカー)が収集中なら、その結果を共有する
     """
     company_map = {c["id"]: c for c in COMPANIES}
-    name_to_id = {c["name"]: c["id"] for c in COMPANIES}
     valid_ids = [cid for cid in company_ids if cid in company_map]
     days = _date_range(start_date_str, end_date_str)
     today_str = datetime.now().strftime("%Y-%m-%d")
@@ -69,59 +293,151 @@ def get_news(company_ids, start_date_str, end_date_str, force=False):
     normal_ids = [cid for cid in valid_ids if company_map[cid].get("scraper_type") != "force_link"]
     force_link_ids = {cid for cid in valid_ids if company_map[cid].get("scraper_type") == "force_link"}
 
-    coverage = {} if force else storage.get_coverage(normal_ids, days)
+    # 範囲外の年別ページ等は取得しない。最終収集時刻が出せるよう、期間の収集記録が
+    # まだないときだけ収集済み(0件)として一度記録する(毎回の表示・/refresh で書き込まない)
+    out_of_span = {cid for cid in normal_ids if not _span_overlaps(company_map[cid], start_date_str, end_date_str)}
+    if out_of_span:
+        spans = storage.get_coverage_spans(list(out_of_span), days[0], days[-1])
+        for cid in out_of_span:
+            if not _covering(spans.get(cid), days[0], days[-1]):
+                storage.record_coverage_ranges(cid, [(days[0], days[-1])], "ok")
+
+    # 企業ごとに、期間を隙間なく覆う収集記録の区間(覆えなければ None)
+    coverage = {}
+    if not force:
+        spans = storage.get_coverage_spans(normal_ids, days[0], days[-1])
+        coverage = {cid: _covering(spans.get(cid), days[0], days[-1]) for cid in normal_ids}
     stale = set()
     for cid in normal_ids:
-        if force or not all(_is_fresh(coverage.get((cid, d)), d, today_str, now) for d in days):
+        if cid in out_of_span:
+            continue
+        if force or not _is_fresh(coverage.get(cid), today_str, now):
             stale.add(cid)
 
-    # スクレイピング対象(選択順を維持)。force_link は毎回この経路(ネットワークなし)
-    scrape_ids = [cid for cid in company_ids if cid in stale or cid in force_link_ids]
+    # 画面表示では、収集から STALE_SERVE_MAX_SECONDS 以内の企業は保存済みの内容を返し、
+    # 再収集はバックグラウンドで行う
+    refreshing = []
+    if background and not force and STALE_SERVE_MAX_SECONDS:
+        refreshing = [cid for cid in normal_ids if cid in stale and _servable_while_stale(coverage.get(cid), now)]
+        stale.difference_update(refreshing)
+        _schedule_refresh(refreshing, start_date_str, end_date_str)
+
+    # 同じ企業を同時に収集しない。このプロセスの別スレッドが収集中なら完了を待ち、
+    # 別のワーカープロセスが収集中(SQLite のリースを保持)ならリースが外れるのを待って、
+    # どちらも DB に保存された結果を使う。待った収集が失敗していれば自分で取得する
+    owner = uuid.uuid4().hex
+    led, joined = {}, {}
+    for cid in company_ids:
+        if cid in stale and cid not in led and cid not in joined:
+            flight, leader = _SOURCE_FLIGHTS.begin(cid)
+            (led if leader else joined)[cid] = flight
 
     scraper = NewsScraper()
-    if scrape_ids:
-        items, logs, _checked = scraper.fetch_news(scrape_ids, start_date_str, end_date_str)
-    else:
-        items, logs = [], [f"=== Range: {start_date_str} ~ {end_date_str} ==="]
+    items, logs = [], [f"=== Range: {start_date_str} ~ {end_date_str} ==="]
+    scraped, revalidated, shared = set(), set(), set()
 
-    # 実ニュースを保存(company_name → id へ逆引き。未知の企業名は保存しない)
-    to_save = []
-    for it in items:
-        if it and not it.get("is_link_only") and not it.get("is_error"):
-            cid = name_to_id.get(it.get("company_name"))
-            if cid:
-                to_save.append({**it, "company_id": cid})
-    if to_save:
-        storage.save_items(to_save)
+    def scrape(ids):
+        # スクレイピング対象(選択順を維持)。force_link は毎回この経路(ネットワークなし)
+        if not ids:
+            return
+        batch_items, batch_logs, batch_revalidated = _scrape_and_store(
+            scraper, ids, start_date_str, end_date_str, days, force
+        )
+        items.extend(batch_items)
+        logs.extend(batch_logs[1:])  # 先頭は期間の見出し(記録済み)
+        scraped.update(ids)
+        revalidated.update(batch_revalidated)
 
-    # 収集結果ステータスを coverage に記録(次回のキャッシュ判断に使う)
-    for cid, (status, code) in (getattr(scraper, "last_status", None) or {}).items():
-        storage.record_coverage(cid, days, status, code)
+    def share(ids):
+        # 待っていた収集の結果を使える企業を除き、自分で取得する企業を返す
+        fresh = _shared_coverage(ids, days, today_str, now, force)
+        coverage.update(fresh)
+        shared.update(fresh)
+        return [cid for cid in ids if cid not in shared]
+
+    unfinished = dict(led)
+    try:
+        leased = [cid for cid in led if storage.acquire_scrape_lease(cid, owner, SCRAPE_LEASE_SECONDS)]
+        scraper.on_page_done = _lease_renewer(leased, owner)
+        try:
+            scrape([cid for cid in company_ids if cid in leased or cid in force_link_ids])
+        finally:
+            scraper.on_page_done = None
+            storage.release_scrape_leases(leased, owner)
+            for cid in leased:
+                _SOURCE_FLIGHTS.finish(cid, unfinished.pop(cid))
+        if unfinished:
+            _wait_for_leases(list(unfinished))
+            scrape(share(list(unfinished)))
+    finally:
+        for cid, flight in unfinished.items():
+            _SOURCE_FLIGHTS.finish(cid, flight)
+
+    if joined:
+        wait(list(joined.values()), timeout=SCRAPE_LEASE_SECONDS)
+        scrape(share(list(joined)))
 
     # キャッシュから返す企業ぶんを合成
-    cached_ids = [cid for cid in valid_ids if cid not in stale and cid not in force_link_ids]
+    cached_ids = [
+        cid for cid in valid_ids
+        if (cid not in scraped or cid in revalidated) and cid not in force_link_ids
+    ]
+    stored = storage.get_items_bulk(
+        [cid for cid in cached_ids if cid not in out_of_span], start_date_str, end_date_str
+    )
     for cid in cached_ids:
         company = company_map[cid]
-        ent = coverage.get((cid, days[0]))
-        status = ent[1] if ent else "ok"
-        code = ent[2] if ent else None
+        if cid in out_of_span:
+            logs.append(f"--- {company['name']}: outside date span (skip) ---")
+            continue
+        covering = coverage.get(cid)
+        # 期間の初日の (fetched_at, status, status_code)。304 だった企業は成功扱い
+        ent = covering[0][2:] if covering and cid not in revalidated else None
+        cached, status = _cached_items(scraper, company, ent, stored.get(cid, []), start_date_str)
+        items.extend(cached)
         if status == "ok":
-            db_items = storage.get_items(cid, start_date_str, end_date_str)
-            items.extend(db_items)
-            logs.append(f"--- {company['name']}: cache hit ({len(db_items)} items) ---")
+            if cid in revalidated:
+                source = "not modified"
+            elif cid in shared:
+                source = "shared"
+            elif cid in refreshing:
+                source = "stale, refreshing"
+            else:
+                source = "cache hit"
+            logs.append(f"--- {company['name']}: {source} ({len(cached)} items) ---")
         elif status == "404":
             logs.append(f"--- {company['name']}: cache hit (404 skip) ---")
         else:
-            fallback = scraper._fallback_item(
-                company, start_date_str, code if status in ("403", "error") else None
-            )
-            if fallback:
-                items.append(fallback)
             logs.append(f"--- {company['name']}: cache hit ({status}) ---")
 
     checked_names = [company_map[cid]["name"] for cid in company_ids if cid in company_map]
     last_collected = storage.latest_fetch_time(normal_ids, days)
-    return items, logs, checked_names, last_collected
+    return items, logs, checked_names, last_collected, refreshing
+
+
+def refresh_status(company_ids, start_date_str, end_date_str):
+    """画面の /refresh 用。バックグラウンドの再収集の状況を返すだけで、収集・収集記録の
+    書き込み・再収集の予約はしない。(items, checked_names, last_collected_epoch, pending_ids)
+    を返す。pending_ids が空になったら、items は保存済みの記事(403/エラーはフォールバック項目)。"""
+    company_map = {c["id"]: c for c in COMPANIES}
+    normal_ids = [
+        cid for cid in company_ids
+        if cid in company_map and company_map[cid].get("scraper_type") != "force_link"
+    ]
+    days = _date_range(start_date_str, end_date_str)
+    pending = _pending_refresh(normal_ids, start_date_str, end_date_str)
+    items = []
+    if not pending:
+        spans = storage.get_coverage_spans(normal_ids, days[0], days[-1])
+        stored = storage.get_items_bulk(normal_ids, start_date_str, end_date_str)
+        scraper = NewsScraper()
+        for cid in normal_ids:
+            covering = _covering(spans.get(cid), days[0], days[-1])
+            ent = covering[0][2:] if covering else None
+            cached, _status = _cached_items(scraper, company_map[cid], ent, stored.get(cid, []), start_date_str)
+            items.extend(cached)
+    checked_names = [company_map[cid]["name"] for cid in company_ids if cid in company_map]
+    return items, checked_names, storage.latest_fetch_time(normal_ids, days), pending
 
 
 def collect_all(days_back=1):
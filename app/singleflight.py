@@ -0,0 +1,46 @@
+"""同じ対象への同時の処理を1回にまとめる(single-flight)。
+
+画面からの同時リクエストや、定時収集(collect_all)の最中に届いたリクエストが、
+同じ情報源をそれぞれ独立に取得・解析していた。ここではキーごとに最初の呼び出し
+(リーダー)だけが処理を行い、同時に来た呼び出しはその完了を待って結果を共有する。
+
+1つのプロセス内のスレッド間の調整を受け持つ。uvicorn のワーカー(別プロセス)間の
+調整は storage の scrape_leases テーブル(期限付きのリース)で行う(service を参照)。
+"""
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """キーごとの「処理中」を Future で表す。
+
+    flight, leader = flights.begin(key)
+    leader が True なら自分で処理して flights.finish(key, flight, result) を呼ぶ。
+    False なら flight.result() (asyncio からは asyncio.wrap_future(flight))で待つ。
+    結果が None ならリーダーは失敗しているので、待っていた側が自分で処理する。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def begin(self, key):
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight, False
+            flight = Future()
+            self._flights[key] = flight
+            return flight, True
+
+    def active(self, key):
+        """key の処理が進行中か。"""
+        with self._lock:
+            return key in self._flights
+
+    def finish(self, key, flight, result=None):
+        """リーダーの処理の完了を待っている呼び出しに知らせる。
+        失敗したときは result=None で知らせ、待っていた側が自分で処理する。"""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.set_result(result)
@@ -183,6 +183,7 @@ document.addEventListener('DOMContentLoaded', function() {
     const END_DATE = window.END_DATE;
 
     updateCacheAndRender(START_DATE, END_DATE, SERVER_RESULTS, CHECKED_NAMES);
+    pollRefresh(START_DATE, END_DATE, window.REFRESHING || [], 0);
 
     startInput.addEventListener('change', function() { renderFromCacheRange(); });
     endInput.addEventListener('change', function() { renderFromCacheRange(); });
@@ -193,6 +194,39 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 });
 
+// 保存済みの内容で表示した古い情報源の再収集(サーバーのバックグラウンド処理)の完了を待ち、
+// 終わったらその情報源の表示を差し替える
+const REFRESH_POLL_MS = 3000;
+const REFRESH_MAX_POLLS = 40;
+
+function pollRefresh(startDate, endDate, companyIds, attempt) {
+    const status = document.getElementById('refresh-status');
+    if (!companyIds.length || attempt >= REFRESH_MAX_POLLS) {
+        if (status) status.classList.add('hidden');
+        return;
+    }
+    if (status) status.classList.remove('hidden');
+    setTimeout(function() {
+        const params = new URLSearchParams();
+        params.append('start_date', startDate);
+        params.append('end_date', endDate);
+        companyIds.forEach(id => params.append('companies', id));
+        fetch('/refresh?' + params.toString())
+            .then(r => r.json())
+            .then(data => {
+                if (data.pending && data.pending.length) {
+                    pollRefresh(startDate, endDate, companyIds, attempt + 1);
+                    return;
+                }
+                updateCacheAndRender(startDate, endDate, data.items, data.checked_names);
+                const collected = document.getElementById('last-collected');
+                if (collected && data.last_collected) collected.textContent = '収集: ' + data.last_collected;
+                pollRefresh(startDate, endDate, [], attempt + 1);
+            })
+            .catch(() => pollRefresh(startDate, endDate, companyIds, attempt + 1));
+    }, REFRESH_POLL_MS);
+}
+
 function updateCacheAndRender(startDate, endDate, newItems, checkedNames) {
     let cache = getCache();
 
@@ -1,15 +1,36 @@
 """SQLite による収集結果の永続化層。
 
 - news_items: スクレイピングで見つかった実ニュース(URL+日付で一意、初出優先)
-- coverage:   「どの企業のどの日付を、いつ・どういう結果で収集したか」の記録。
-              サービス層はこれを見て再スクレイピングの要否を判断する。
+- coverage_spans: 「どの企業のどの期間(first_date〜last_date)を、いつ・どういう結果で
+              収集したか」の記録。企業ごとに区間は重ならない。サービス層はこれを見て
+              再スクレイピングの要否を判断する。旧形式の coverage(企業×日付ごとに1行)は
+              接続時に区間へまとめて移し、削除する。
+- http_validators: 情報源ページの ETag / Last-Modified。次回の条件付き GET に使う。
+              range_start..range_end はその応答から抽出・保存した日付範囲で、
+              304 のとき DB の保存済みニュースで代用できる範囲を表す。
+- page_fingerprints: 情報源ページ本文のハッシュと、その本文からの抽出結果
+              (ページ上のすべての日付の記事とフィード候補)。本文が変わっておらず、
+              抽出ロジックの版(extractor_version)も同じなら解析をやり直さずこの結果を使う。
+- source_encodings: 文字コードを宣言していない情報源について、統計的に判定した文字コード。
+- source_feeds: 情報源ページで発見した(または rss_url の)フィードと、読めたかどうか。
+              使えるフィードがある情報源はフィード優先で収集する。html_checked_at は
+              その情報源の HTML を最後に読んだ時刻(定期確認の判断に使う)。
+- extraction_recipes: 情報源ごとの抽出レシピ(記事を含む入れ物の目印と、その中で記事が
+              取れた要素の CSS セレクタとリンクの探し方)。次回はまずその要素だけを見る。
+              学習した抽出ロジックの版(extractor_version)が同じものだけ使う。
+- host_breakers: ホストごとのサーキットブレーカーの状態(連続失敗数・開いた回数・
+              開いている期限・試しのリクエストの期限)。ワーカー間・再起動後も共有する。
+- scrape_leases: 企業ごとの「いま収集中」の期限付きリース。複数のワーカープロセスが
+              同じ企業を同時に収集しないよう、リースを持つワーカーだけが収集する。
 
 DB パスは環境変数 NEWS_DB_PATH で上書き可能(テストが利用)。
 接続のたびに CREATE TABLE IF NOT EXISTS を実行するため、明示的な初期化は不要。
 """
+import json
 import os
 import sqlite3
 import time
+from datetime import date, timedelta
 from pathlib import Path
 
 DEFAULT_DB_PATH = Path(__file__).resolve().parent.parent / "data" / "news.db"
@@ -36,15 +57,83 @@ def _connect() -> sqlite3.Connection:
             PRIMARY KEY (url, date)
         )""")
     conn.execute("""
-        CREATE TABLE IF NOT EXISTS coverage (
+        CREATE TABLE IF NOT EXISTS coverage_spans (
             company_id  TEXT NOT NULL,
-            date        TEXT NOT NULL,
+            first_date  TEXT NOT NULL,
+            last_date   TEXT NOT NULL,
             fetched_at  REAL NOT NULL,
             status      TEXT NOT NULL,
             status_code INTEGER,
-            PRIMARY KEY (company_id, date)
+            PRIMARY KEY (company_id, first_date)
         )""")
+    _migrate_day_coverage(conn)
     conn.execute("CREATE INDEX IF NOT EXISTS idx_items_company_date ON news_items(company_id, date)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS http_validators (
+            company_id    TEXT NOT NULL,
+            url           TEXT NOT NULL,
+            etag          TEXT,
+            last_modified TEXT,
+            range_start   TEXT NOT NULL,
+            range_end     TEXT NOT NULL,
+            updated_at    REAL NOT NULL,
+            PRIMARY KEY (company_id, url)
+        )""")
+    _drop_outdated_cache(conn, "page_fingerprints", "extractor_version")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS page_fingerprints (
+            company_id        TEXT NOT NULL,
+            url               TEXT NOT NULL,
+            body_hash         TEXT NOT NULL,
+            extractor_version INTEGER NOT NULL,
+            items_json        TEXT NOT NULL,
+            feed_candidates TEXT NOT NULL,
+            updated_at      REAL NOT NULL,
+            PRIMARY KEY (company_id, url)
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS source_encodings (
+            company_id TEXT NOT NULL,
+            url        TEXT NOT NULL,
+            encoding   TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (company_id, url)
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS source_feeds (
+            company_id      TEXT NOT NULL,
+            url             TEXT NOT NULL,
+            feed_url        TEXT NOT NULL,
+            good            INTEGER NOT NULL,
+            checked_at      REAL NOT NULL,
+            html_checked_at REAL NOT NULL,
+            PRIMARY KEY (company_id, url, feed_url)
+        )""")
+    _drop_outdated_cache(conn, "extraction_recipes", "extractor_version")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS extraction_recipes (
+            company_id        TEXT NOT NULL,
+            url               TEXT NOT NULL,
+            extractor_version INTEGER NOT NULL,
+            recipe_json       TEXT NOT NULL,
+            updated_at        REAL NOT NULL,
+            PRIMARY KEY (company_id, url)
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS host_breakers (
+            host        TEXT PRIMARY KEY,
+            failures    INTEGER NOT NULL,
+            trips       INTEGER NOT NULL,
+            open_until  REAL,
+            probe_until REAL,
+            updated_at  REAL NOT NULL
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS scrape_leases (
+            company_id TEXT PRIMARY KEY,
+            owner      TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )""")
     conn.execute("""
         CREATE TABLE IF NOT EXISTS digest_cache (
             cache_key  TEXT PRIMARY KEY,
@@ -54,6 +143,67 @@ def _connect() -> sqlite3.Connection:
     return conn
 
 
+def _migrate_day_coverage(conn) -> None:
+    """旧形式の coverage テーブル(企業×日付ごとに1行)があれば、連続する日付で収集時刻・
+    結果が同じ行を1つの区間にまとめて coverage_spans へ移し、旧テーブルを削除する。"""
+    exists = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'coverage'"
+    if not conn.execute(exists).fetchone():
+        return
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute(exists).fetchone():  # 他のワーカーが先に移していなければ
+            spans = []
+            for company_id, day, fetched_at, status, status_code in conn.execute(
+                "SELECT company_id, date, fetched_at, status, status_code FROM coverage "
+                "ORDER BY company_id, date"
+            ):
+                last = spans[-1] if spans else None
+                if (last and last[0] == company_id and tuple(last[3:]) == (fetched_at, status, status_code)
+                        and _next_day(last[2]) == day):
+                    last[2] = day
+                else:
+                    spans.append([company_id, day, day, fetched_at, status, status_code])
+            conn.executemany(
+                "INSERT OR REPLACE INTO coverage_spans "
+                "(company_id, first_date, last_date, fetched_at, status, status_code) VALUES (?, ?, ?, ?, ?, ?)",
+                spans,
+            )
+            conn.execute("DROP TABLE coverage")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def _drop_outdated_cache(conn, table, column) -> None:
+    """抽出結果のキャッシュ table が column を持たない旧形式なら削除する(直後の
+    CREATE TABLE で作り直す)。中身は本文を解析し直せば再現できる。"""
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if columns and column not in columns:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+def _next_day(day):
+    return (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+
+
+def _previous_day(day):
+    return (date.fromisoformat(day) - timedelta(days=1)).isoformat()
+
+
+def _merge_ranges(ranges):
+    """(first, last) の一覧を、重なる・隣り合うものをまとめて first 順に並べる。"""
+    merged = []
+    for first, last in sorted(ranges):
+        if first > last:
+            continue
+        if merged and first <= _next_day(merged[-1][1]):
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+    return [tuple(r) for r in merged]
+
+
 def init() -> None:
     """テーブル作成だけ行う(起動時に一度呼ぶと以後の接続が速い)。"""
     _connect().close()
@@ -82,62 +232,104 @@ def save_items(items) -> int:
 
 def get_items(company_id, start_date, end_date):
     """指定企業・日付範囲の保存済みニュースを item dict のリストで返す。"""
+    return get_items_bulk([company_id], start_date, end_date).get(company_id, [])
+
+
+def get_items_bulk(company_ids, start_date, end_date):
+    """複数企業・日付範囲の保存済みニュースを1回の問い合わせで読み、
+    {company_id: [item dict, ...]}(各企業の並びは get_items と同じ)で返す。"""
+    if not company_ids:
+        return {}
     conn = _connect()
     try:
+        q = ",".join("?" * len(company_ids))
         rows = conn.execute(
-            "SELECT company_name, badge_color, title, url, date FROM news_items "
-            "WHERE company_id = ? AND date BETWEEN ? AND ? ORDER BY date, rowid",
-            (company_id, start_date, end_date),
+            f"SELECT company_id, company_name, badge_color, title, url, date FROM news_items "
+            f"WHERE company_id IN ({q}) AND date BETWEEN ? AND ? ORDER BY date, rowid",
+            (*company_ids, start_date, end_date),
         ).fetchall()
     finally:
         conn.close()
-    return [
-        {
-            "company_name": r[0],
-            "badge_color": r[1],
-            "title": r[2],
-            "url": r[3],
-            "date": r[4],
+    out = {}
+    for r in rows:
+        out.setdefault(r[0], []).append({
+            "company_name": r[1],
+            "badge_color": r[2],
+            "title": r[3],
+            "url": r[4],
+            "date": r[5],
             "is_link_only": False,
             "is_error": False,
-        }
-        for r in rows
-    ]
+        })
+    return out
 
 
 def record_coverage(company_id, dates, status, status_code=None) -> None:
+    """dates(日付の一覧)を収集済みとして記録する。連続する日付は1つの区間になる。"""
+    record_coverage_ranges(company_id, [(day, day) for day in dates], status, status_code)
+
+
+def record_coverage_ranges(company_id, ranges, status, status_code=None) -> None:
+    """ranges([(first, last), ...])の期間を、今の時刻・この結果で収集済みとして記録する。
+    重なる既存の区間は重ならない部分だけを残し、新しい区間に置き換える
+    (隣り合う・重なる ranges は1つの区間にまとめる)。"""
+    ranges = _merge_ranges(ranges)
+    if not ranges:
+        return
     now = time.time()
     conn = _connect()
     try:
-        with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        for first, last in ranges:
+            overlap = (company_id, last, first)
+            rows = conn.execute(
+                "SELECT first_date, last_date, fetched_at, status, status_code FROM coverage_spans "
+                "WHERE company_id = ? AND first_date <= ? AND last_date >= ?",
+                overlap,
+            ).fetchall()
+            conn.execute(
+                "DELETE FROM coverage_spans WHERE company_id = ? AND first_date <= ? AND last_date >= ?",
+                overlap,
+            )
+            spans = [(company_id, first, last, now, status, status_code)]
+            for old_first, old_last, fetched_at, old_status, old_code in rows:
+                if old_first < first:
+                    spans.append((company_id, old_first, _previous_day(first), fetched_at, old_status, old_code))
+                if old_last > last:
+                    spans.append((company_id, _next_day(last), old_last, fetched_at, old_status, old_code))
             conn.executemany(
-                "INSERT INTO coverage (company_id, date, fetched_at, status, status_code) "
-                "VALUES (?, ?, ?, ?, ?) "
-                "ON CONFLICT(company_id, date) DO UPDATE SET "
-                "fetched_at = excluded.fetched_at, status = excluded.status, "
-                "status_code = excluded.status_code",
-                [(company_id, d, now, status, status_code) for d in dates],
+                "INSERT INTO coverage_spans "
+                "(company_id, first_date, last_date, fetched_at, status, status_code) VALUES (?, ?, ?, ?, ?, ?)",
+                spans,
             )
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
     finally:
         conn.close()
 
 
-def get_coverage(company_ids, dates):
-    """{(company_id, date): (fetched_at, status, status_code)} を返す。"""
-    if not company_ids or not dates:
+def get_coverage_spans(company_ids, first, last):
+    """first〜last と重なる収集記録の区間を
+    {company_id: [(first_date, last_date, fetched_at, status, status_code), ...]}(first_date 順)で返す。"""
+    if not company_ids:
         return {}
     conn = _connect()
     try:
-        q_ids = ",".join("?" * len(company_ids))
-        q_dates = ",".join("?" * len(dates))
+        q = ",".join("?" * len(company_ids))
         rows = conn.execute(
-            f"SELECT company_id, date, fetched_at, status, status_code FROM coverage "
-            f"WHERE company_id IN ({q_ids}) AND date IN ({q_dates})",
-            list(company_ids) + list(dates),
+            f"SELECT company_id, first_date, last_date, fetched_at, status, status_code FROM coverage_spans "
+            f"WHERE company_id IN ({q}) AND first_date <= ? AND last_date >= ? "
+            f"ORDER BY company_id, first_date",
+            list(company_ids) + [last, first],
         ).fetchall()
     finally:
         conn.close()
-    return {(r[0], r[1]): (r[2], r[3], r[4]) for r in rows}
+    spans = {}
+    for company_id, *span in rows:
+        spans.setdefault(company_id, []).append(tuple(span))
+    return spans
 
 
 def last_item_dates(company_ids):
@@ -157,6 +349,325 @@ def last_item_dates(company_ids):
     return {r[0]: r[1] for r in rows}
 
 
+def get_validators(company_id, url):
+    """保存済みの検証子 {"etag", "last_modified", "range_start", "range_end"} を返す(なければ None)。"""
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT etag, last_modified, range_start, range_end FROM http_validators "
+            "WHERE company_id = ? AND url = ?",
+            (company_id, url),
+        ).fetchone()
+    finally:
+        conn.close()
+    if not row or not (row[0] or row[1]):
+        return None
+    return {"etag": row[0], "last_modified": row[1], "range_start": row[2], "range_end": row[3]}
+
+
+def save_validators(company_id, url, etag, last_modified, range_start, range_end) -> None:
+    """応答の検証子を保存する。どちらもなければ古い行を消す(送っても無意味なため)。"""
+    conn = _connect()
+    try:
+        with conn:
+            if not (etag or last_modified):
+                conn.execute(
+                    "DELETE FROM http_validators WHERE company_id = ? AND url = ?", (company_id, url)
+                )
+                return
+            conn.execute(
+                "INSERT INTO http_validators "
+                "(company_id, url, etag, last_modified, range_start, range_end, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(company_id, url) DO UPDATE SET etag = excluded.etag, "
+                "last_modified = excluded.last_modified, range_start = excluded.range_start, "
+                "range_end = excluded.range_end, updated_at = excluded.updated_at",
+                (company_id, url, etag, last_modified, range_start, range_end, time.time()),
+            )
+    finally:
+        conn.close()
+
+
+def get_page_fingerprint(company_id, url, extractor_version):
+    """extractor_version の抽出ロジックで保存した本文ハッシュと抽出結果を dict で返す
+    (なければ、または別の版のものなら None)。"""
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT body_hash, items_json, feed_candidates FROM page_fingerprints "
+            "WHERE company_id = ? AND url = ? AND extractor_version = ?",
+            (company_id, url, extractor_version),
+        ).fetchone()
+    finally:
+        conn.close()
+    if not row:
+        return None
+    return {
+        "body_hash": row[0],
+        "items": json.loads(row[1]),
+        "feed_candidates": json.loads(row[2]),
+    }
+
+
+def save_page_fingerprint(company_id, url, body_hash, extractor_version, items, feed_candidates) -> None:
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT INTO page_fingerprints "
+                "(company_id, url, body_hash, extractor_version, items_json, feed_candidates, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(company_id, url) DO UPDATE SET body_hash = excluded.body_hash, "
+                "extractor_version = excluded.extractor_version, "
+                "items_json = excluded.items_json, feed_candidates = excluded.feed_candidates, "
+                "updated_at = excluded.updated_at",
+                (company_id, url, body_hash, extractor_version,
+                 json.dumps(items, ensure_ascii=False), json.dumps(feed_candidates), time.time()),
+            )
+    finally:
+        conn.close()
+
+
+def get_source_encoding(company_id, url):
+    """前回判定した文字コード(なければ None)。"""
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT encoding FROM source_encodings WHERE company_id = ? AND url = ?",
+            (company_id, url),
+        ).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def save_source_encoding(company_id, url, encoding) -> None:
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT INTO source_encodings (company_id, url, encoding, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(company_id, url) DO UPDATE SET encoding = excluded.encoding, "
+                "updated_at = excluded.updated_at",
+                (company_id, url, encoding, time.time()),
+            )
+    finally:
+        conn.close()
+
+
+def get_feeds(company_id, url):
+    """情報源のフィード一覧(使えるものが先、読めたのが新しい順)。"""
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT feed_url, good, checked_at, html_checked_at FROM source_feeds "
+            "WHERE company_id = ? AND url = ? ORDER BY good DESC, checked_at DESC",
+            (company_id, url),
+        ).fetchall()
+    finally:
+        conn.close()
+    return [
+        {"feed_url": r[0], "good": bool(r[1]), "checked_at": r[2], "html_checked_at": r[3]}
+        for r in rows
+    ]
+
+
+def save_feed_check(company_id, url, feed_url, good) -> None:
+    """フィードを読んだ結果を記録する(初めてのフィードは今 HTML で見つけたものとして登録)。"""
+    now = time.time()
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT INTO source_feeds (company_id, url, feed_url, good, checked_at, html_checked_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(company_id, url, feed_url) DO UPDATE SET good = excluded.good, "
+                "checked_at = excluded.checked_at",
+                (company_id, url, feed_url, int(bool(good)), now, now),
+            )
+    finally:
+        conn.close()
+
+
+def touch_feed_html_check(company_id, url) -> None:
+    """情報源の HTML を読んだ時刻を記録する。"""
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                "UPDATE source_feeds SET html_checked_at = ? WHERE company_id = ? AND url = ?",
+                (time.time(), company_id, url),
+            )
+    finally:
+        conn.close()
+
+
+def get_recipe(company_id, url, extractor_version):
+    """extractor_version の抽出ロジックで前回学習した抽出レシピ
+    ({"container": 入れ物の目印, "steps": [[セレクタ, 探し方], ...]}。なければ、
+    または別の版のものなら None)。"""
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT recipe_json FROM extraction_recipes "
+            "WHERE company_id = ? AND url = ? AND extractor_version = ?",
+            (company_id, url, extractor_version),
+        ).fetchone()
+    finally:
+        conn.close()
+    return json.loads(row[0]) if row else None
+
+
+def save_recipe(company_id, url, extractor_version, recipe) -> None:
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT INTO extraction_recipes (company_id, url, extractor_version, recipe_json, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(company_id, url) DO UPDATE SET extractor_version = excluded.extractor_version, "
+                "recipe_json = excluded.recipe_json, updated_at = excluded.updated_at",
+                (company_id, url, extractor_version, json.dumps(recipe, ensure_ascii=False), time.time()),
+            )
+    finally:
+        conn.close()
+
+
+def get_breaker(host):
+    """ホストのブレーカーの状態(記録がなければ None)。"""
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT failures, trips, open_until, probe_until FROM host_breakers WHERE host = ?", (host,)
+        ).fetchone()
+    finally:
+        conn.close()
+    if not row:
+        return None
+    return {"failures": row[0], "trips": row[1], "open_until": row[2], "probe_until": row[3]}
+
+
+def record_breaker_failure(host, threshold, base_seconds, max_seconds) -> None:
+    """失敗を1回数える。連続 threshold 回に達したら(試しのリクエストの失敗も含む)
+    ブレーカーを開き、開いている時間は開くたびに倍にする(上限 max_seconds)。
+    開いている最中に届いた失敗(開く前に送ったリクエスト)では開き直さない。"""
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT failures, trips, open_until FROM host_breakers WHERE host = ?", (host,)
+        ).fetchone()
+        failures, trips, open_until = row if row else (0, 0, None)
+        failures += 1
+        probe_until = None
+        if failures >= threshold and (open_until is None or now >= open_until):
+            trips += 1
+            open_until = now + min(base_seconds * 2 ** (trips - 1), max_seconds)
+        conn.execute(
+            "INSERT INTO host_breakers (host, failures, trips, open_until, probe_until, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(host) DO UPDATE SET failures = excluded.failures, "
+            "trips = excluded.trips, open_until = excluded.open_until, "
+            "probe_until = excluded.probe_until, updated_at = excluded.updated_at",
+            (host, failures, trips, open_until, probe_until, now),
+        )
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def record_breaker_success(host) -> None:
+    """成功したらブレーカーを閉じ、失敗の記録を消す。"""
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute("DELETE FROM host_breakers WHERE host = ?", (host,))
+    finally:
+        conn.close()
+
+
+def claim_breaker_probe(host, now, probe_until) -> bool:
+    """開いている期限が過ぎたホストへの試しのリクエストを1つだけ取る。
+    他のスレッド・ワーカーが先に取っていれば False。"""
+    conn = _connect()
+    try:
+        with conn:
+            cur = conn.execute(
+                "UPDATE host_breakers SET probe_until = ?, updated_at = ? "
+                "WHERE host = ? AND open_until <= ? AND (probe_until IS NULL OR probe_until <= ?)",
+                (probe_until, now, host, now, now),
+            )
+            return cur.rowcount == 1
+    finally:
+        conn.close()
+
+
+def acquire_scrape_lease(company_id, owner, ttl_seconds) -> bool:
+    """企業の収集リースを取る。他の owner が期限内のリースを持っていれば False。"""
+    now = time.time()
+    conn = _connect()
+    try:
+        with conn:
+            cur = conn.execute(
+                "INSERT INTO scrape_leases (company_id, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(company_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE scrape_leases.expires_at <= ? OR scrape_leases.owner = excluded.owner",
+                (company_id, owner, now + ttl_seconds, now),
+            )
+            return cur.rowcount == 1
+    finally:
+        conn.close()
+
+
+def renew_scrape_leases(company_ids, owner, ttl_seconds) -> None:
+    """owner が持つ company_ids のリースの期限を、今から ttl_seconds 秒後まで延ばす(収集中に呼ぶ)。"""
+    if not company_ids:
+        return
+    expires_at = time.time() + ttl_seconds
+    conn = _connect()
+    try:
+        with conn:
+            conn.executemany(
+                "UPDATE scrape_leases SET expires_at = ? WHERE company_id = ? AND owner = ?",
+                [(expires_at, cid, owner) for cid in company_ids],
+            )
+    finally:
+        conn.close()
+
+
+def release_scrape_leases(company_ids, owner) -> None:
+    if not company_ids:
+        return
+    conn = _connect()
+    try:
+        with conn:
+            conn.executemany(
+                "DELETE FROM scrape_leases WHERE company_id = ? AND owner = ?",
+                [(cid, owner) for cid in company_ids],
+            )
+    finally:
+        conn.close()
+
+
+def held_scrape_leases(company_ids):
+    """company_ids のうち、期限内のリースを誰かが持っている企業の集合。"""
+    if not company_ids:
+        return set()
+    conn = _connect()
+    try:
+        q = ",".join("?" * len(company_ids))
+        rows = conn.execute(
+            f"SELECT company_id FROM scrape_leases WHERE company_id IN ({q}) AND expires_at > ?",
+            list(company_ids) + [time.time()],
+        ).fetchall()
+    finally:
+        conn.close()
+    return {r[0] for r in rows}
+
+
 def get_digest(cache_key, max_age_seconds):
     """キャッシュ済みダイジェストを返す(期限切れ・未生成なら None)。"""
     conn = _connect()
@@ -186,17 +697,16 @@ def save_digest(cache_key, content) -> None:
 
 
 def latest_fetch_time(company_ids, dates):
-    """指定範囲の最新収集時刻(epoch 秒)。未収集なら None。"""
+    """指定範囲(dates の最初〜最後の日付)の最新収集時刻(epoch 秒)。未収集なら None。"""
     if not company_ids or not dates:
         return None
     conn = _connect()
     try:
         q_ids = ",".join("?" * len(company_ids))
-        q_dates = ",".join("?" * len(dates))
         row = conn.execute(
-            f"SELECT MAX(fetched_at) FROM coverage "
-            f"WHERE company_id IN ({q_ids}) AND date IN ({q_dates})",
-            list(company_ids) + list(dates),
+            f"SELECT MAX(fetched_at) FROM coverage_spans "
+            f"WHERE company_id IN ({q_ids}) AND first_date <= ? AND last_date >= ?",
+            list(company_ids) + [max(dates), min(dates)],
         ).fetchone()
     finally:
         conn.close()
@@ -5,6 +5,9 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # テスト中はバックグラウンドの定時収集を無効化
 os.environ.setdefault("NEWS_SCHEDULER", "off")
+# 同じ架空ホストに多数の情報源を置くテストが多いため、ホストごとの取得間隔は空けない
+# (間隔そのもののテストは scraper.FETCH_HOST_INTERVAL_MS を個別に設定する)
+os.environ.setdefault("NEWS_FETCH_HOST_INTERVAL_MS", "0")
 
 import pytest
 
@@ -68,3 +68,46 @@ def test_news_items_rendered():
         response = client.get("/?date=2025-10-25")
     assert response.status_code == 200
     assert "Test News Title" in response.text
+
+
+def test_refresh_reports_pending_then_items(monkeypatch):
+    """/refresh は再収集中の企業を pending で返し、終われば保存済みの記事を返す。
+    DB と処理中の状態を読むだけで、収集・収集記録の書き込み・再収集の予約はしない。"""
+    from app import service, storage
+
+    storage.record_coverage("lawson", ["2025-10-25"], "ok", 200)
+    storage.record_coverage("aeon", ["2025-10-25"], "403", 403)
+    storage.save_items([{
+        "company_id": "lawson", "company_name": "ローソン", "badge_color": "#000",
+        "title": "保存済みのニュース", "url": "https://example.com/news/1",
+        "date": "2025-10-25", "is_link_only": False, "is_error": False,
+    }])
+    url = "/refresh?start_date=2025-10-25&end_date=2025-10-25&companies=lawson&companies=aeon"
+
+    def must_not_write(*args, **kwargs):
+        raise AssertionError("/refresh must only read")
+
+    monkeypatch.setattr(service, "TTL_PAST", 0)  # 古くなっていても収集しない
+    monkeypatch.setattr(service, "_schedule_refresh", must_not_write)
+    monkeypatch.setattr(storage, "record_coverage_ranges", must_not_write)
+    monkeypatch.setattr("app.main.NewsScraper.fetch_news", must_not_write)
+    monkeypatch.setattr(service, "_refreshing", {("lawson", "2025-10-25", "2025-10-25")})
+    data = client.get(url).json()
+    assert data["pending"] == ["lawson"]
+    assert data["items"] == []
+
+    service._refreshing.clear()
+    data = client.get(url).json()
+    assert data["pending"] == []
+    assert [i["title"] for i in data["items"]][0] == "保存済みのニュース"
+    assert [i["is_link_only"] for i in data["items"]] == [False, True]  # 403 はリンク項目
+    assert data["checked_names"] and data["last_collected"]
+
+
+def test_refresh_reports_a_scrape_held_by_another_worker():
+    """別のワーカーが収集リースを持つ企業も pending に含める。"""
+    from app import storage
+
+    assert storage.acquire_scrape_lease("lawson", "other-worker", 60)
+    data = client.get("/refresh?start_date=2025-10-25&end_date=2025-10-25&companies=lawson").json()
+    assert data["pending"] == ["lawson"]
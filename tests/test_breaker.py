@@ -0,0 +1,134 @@
+"""ホスト単位のサーキットブレーカーと再試行のテスト。
+
+タイムアウト・5xx が続いたホストにはしばらくリクエストを送らず、即座に
+フォールバック項目を返す。状態は SQLite に置くので、再起動後・ワーカー間でも共有される。
+"""
+import time
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from app import breaker, scraper, storage
+from app.scraper import NewsScraper
+
+COMPANY = {
+    "id": "flaky", "name": "不安定社", "category": "テスト",
+    "url": "https://flaky.example/news/", "scraper_type": "auto",
+    "badge_color": "#111111", "date_format": "%Y.%m.%d",
+}
+PAGE = '<html><body><ul><li>2026.07.06 <a href="/n/1.html">新商品のお知らせです</a></li></ul></body></html>'
+
+
+class FakeResponse:
+    def __init__(self, status, text=""):
+        self.status_code = status
+        self.content = text.encode("utf-8")
+        self.headers = {"Content-Type": "text/html; charset=utf-8"}
+
+
+@pytest.fixture(autouse=True)
+def _fast_retries(monkeypatch):
+    monkeypatch.setattr(breaker, "FETCH_RETRIES", 0)
+    monkeypatch.setattr(breaker, "FETCH_RETRY_BACKOFF_MS", 0)
+
+
+def _fake_site(monkeypatch, outcomes):
+    """outcomes を順に返す(例外なら投げる)。最後の1つは繰り返す。"""
+    calls = []
+
+    def fake_get(self, url, timeout=None, **kwargs):
+        calls.append(url)
+        outcome = outcomes[min(len(calls), len(outcomes)) - 1]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    return calls
+
+
+def _scrape():
+    news = NewsScraper()
+    with patch.object(scraper, "COMPANIES", [COMPANY]):
+        items, logs, _ = news.fetch_news([COMPANY["id"]], "2026-07-01", "2026-07-07")
+    return items, logs, news.last_status[COMPANY["id"]]
+
+
+def test_opens_after_consecutive_failures_and_skips_the_network(monkeypatch):
+    calls = _fake_site(monkeypatch, [requests.Timeout("timed out")])
+    for _ in range(breaker.BREAKER_THRESHOLD):
+        _scrape()
+    assert len(calls) == breaker.BREAKER_THRESHOLD
+
+    items, logs, status = _scrape()
+    assert len(calls) == breaker.BREAKER_THRESHOLD  # ネットワークに出ていない
+    assert status == ("exception", None)
+    assert items[0]["title"].startswith("【エラー】")
+    assert any("Circuit open for flaky.example" in line for line in logs)
+
+
+def test_success_resets_the_failure_count(monkeypatch):
+    _fake_site(monkeypatch, [FakeResponse(500), FakeResponse(500), FakeResponse(200, PAGE), FakeResponse(500)])
+    for _ in range(4):
+        _scrape()
+    assert storage.get_breaker("flaky.example")["failures"] == 1
+
+
+def test_success_without_a_breaker_row_does_not_write(monkeypatch):
+    """記録のないホストへの成功では、ブレーカーの表に書き込まない。"""
+    _fake_site(monkeypatch, [FakeResponse(200, PAGE)])
+    writes = []
+    monkeypatch.setattr(storage, "record_breaker_success", lambda host: writes.append(host))
+    _scrape()
+    assert writes == []
+
+
+def test_client_errors_do_not_count(monkeypatch):
+    _fake_site(monkeypatch, [FakeResponse(404)])
+    for _ in range(breaker.BREAKER_THRESHOLD + 1):
+        _scrape()
+    assert storage.get_breaker("flaky.example") is None
+
+
+def test_half_open_probe_closes_or_reopens_with_longer_interval(monkeypatch):
+    calls = _fake_site(monkeypatch, [FakeResponse(503)])
+    for _ in range(breaker.BREAKER_THRESHOLD):
+        _scrape()
+    first = storage.get_breaker("flaky.example")
+    assert first["trips"] == 1
+
+    # 期限が過ぎたら1回だけ試す。失敗すれば倍の時間開き直す
+    now = first["open_until"] + 1
+    monkeypatch.setattr(breaker.time, "time", lambda: now)
+    monkeypatch.setattr(storage.time, "time", lambda: now)
+    _scrape()
+    assert len(calls) == breaker.BREAKER_THRESHOLD + 1
+    second = storage.get_breaker("flaky.example")
+    assert second["trips"] == 2
+    assert second["open_until"] - now == pytest.approx(2 * breaker.BREAKER_OPEN_SECONDS)
+
+    # 次の試しで成功すれば閉じる
+    now = second["open_until"] + 1
+    _fake_site(monkeypatch, [FakeResponse(200, PAGE)])
+    items, _, status = _scrape()
+    assert status == ("ok", 200)
+    assert [i["title"] for i in items] == ["新商品のお知らせです"]
+    assert storage.get_breaker("flaky.example") is None
+
+
+def test_only_one_probe_is_let_through():
+    """half-open の試しは DB 上で取り合うので、他のワーカーは待たされる。"""
+    storage.record_breaker_failure("flaky.example", 1, 300, 3600)
+    later = time.time() + 301
+    assert storage.claim_breaker_probe("flaky.example", later, later + 60) is True
+    assert storage.claim_breaker_probe("flaky.example", later, later + 60) is False
+
+
+def test_transient_failure_is_retried_within_the_run(monkeypatch):
+    monkeypatch.setattr(breaker, "FETCH_RETRIES", 1)
+    calls = _fake_site(monkeypatch, [requests.ConnectionError("reset"), FakeResponse(200, PAGE)])
+    items, _, status = _scrape()
+    assert len(calls) == 2
+    assert status == ("ok", 200)
+    assert storage.get_breaker("flaky.example") is None
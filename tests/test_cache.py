@@ -1,5 +1,16 @@
 """サーバー側キャッシュ(storage / service)のテスト。"""
-from app import service, storage
+import functools
+import io
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import requests
+import urllib3
+
+from app import scraper, service, storage
 from app.companies import COMPANIES
 from app.scraper import NewsScraper
 
@@ -35,7 +46,7 @@ def test_second_request_served_from_cache(monkeypatch):
     calls = []
     lawson = _company("lawson")["name"]
 
-    def fake_fetch(self, ids, start, end):
+    def fake_fetch(self, ids, start, end, force=False):
         calls.append(list(ids))
         self.last_status = {cid: ("ok", 200) for cid in ids}
         return [_make_item(lawson)], ["scraped"], [lawson]
@@ -59,10 +70,37 @@ def test_second_request_served_from_cache(monkeypatch):
     assert len(calls) == 2
 
 
+def test_cached_companies_are_read_in_one_query(monkeypatch):
+    """キャッシュから返す企業のニュースは、企業ごとではなく1回の問い合わせでまとめて読む。"""
+    lawson, famima = _company("lawson")["name"], _company("famima")["name"]
+    storage.save_items([
+        {**_make_item(famima, title="ファミマのお知らせ"), "company_id": "famima", "url": "https://example.com/s/1"},
+        {**_make_item(lawson), "company_id": "lawson"},
+    ])
+    for cid in ("lawson", "famima"):
+        storage.record_coverage(cid, ["2025-10-25"], "ok", 200)
+    assert storage.get_items_bulk(["lawson", "famima"], "2025-10-25", "2025-10-25") == {
+        cid: storage.get_items(cid, "2025-10-25", "2025-10-25") for cid in ("lawson", "famima")
+    }
+
+    bulk_calls = []
+    real_bulk = storage.get_items_bulk
+
+    def counting_bulk(*args):
+        bulk_calls.append(args)
+        return real_bulk(*args)
+
+    monkeypatch.setattr(storage, "get_items_bulk", counting_bulk)
+    monkeypatch.setattr(storage, "get_items", lambda *a: (_ for _ in ()).throw(AssertionError("per-company read")))
+    items, _logs, _checked, _ = service.get_news(["lawson", "famima"], "2025-10-25", "2025-10-25")
+    assert len(bulk_calls) == 1
+    assert [i["title"] for i in items] == ["ニュースタイトルテスト", "ファミマのお知らせ"]
+
+
 def test_cached_403_reproduces_fallback_link(monkeypatch):
     aeon = _company("aeon")
 
-    def fake_fetch(self, ids, start, end):
+    def fake_fetch(self, ids, start, end, force=False):
         self.last_status = {cid: ("403", 403) for cid in ids}
         return [self._fallback_item(aeon, start, 403)], ["403"], [aeon["name"]]
 
@@ -86,7 +124,7 @@ def test_partial_scrape_only_stale_companies(monkeypatch):
     lawson = _company("lawson")["name"]
     famima = _company("famima")["name"]
 
-    def fake_fetch(self, ids, start, end):
+    def fake_fetch(self, ids, start, end, force=False):
         calls.append(list(ids))
         self.last_status = {cid: ("ok", 200) for cid in ids}
         name_map = {"lawson": lawson, "famima": famima}
@@ -104,3 +142,323 @@ def test_partial_scrape_only_stale_companies(monkeypatch):
     assert calls == [["lawson"], ["famima"]], "only the un-cached company is scraped"
     assert {i["company_name"] for i in items} == {lawson, famima}
     assert checked == [lawson, famima]
+
+
+class _ValidatorResponse:
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+        self.encoding = "utf-8"
+        self.apparent_encoding = "utf-8"
+
+
+LAWSON_PAGE = """<html><body><ul>
+<li>2025.10.25 <a href="/news/1.html">ローソンの新商品発売のお知らせ</a></li>
+</ul></body></html>"""
+
+
+def test_conditional_get_304_serves_stored_items(monkeypatch):
+    """ETag を返したページは次回 If-None-Match 付きで取得し、304 なら
+    本文を解析せず DB の保存済みニュースを返す(収集記録も新しくなる)。"""
+    sent = []
+
+    def fake_get(self, url, timeout=None, headers=None, **kwargs):
+        sent.append(dict(headers or {}))
+        if headers and headers.get("If-None-Match") == '"v1"':
+            return _ValidatorResponse(304)
+        return _ValidatorResponse(200, LAWSON_PAGE, {"ETag": '"v1"'})
+
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    items1, _, _, _ = service.get_news(["lawson"], "2025-10-25", "2025-10-25")
+    assert [i["title"] for i in items1] == ["ローソンの新商品発売のお知らせ"]
+    assert "If-None-Match" not in sent[0]
+
+    def no_parse(*args, **kwargs):
+        raise AssertionError("304 must skip parsing")
+
+    real_soup = scraper.BeautifulSoup
+    monkeypatch.setattr("app.scraper.BeautifulSoup", no_parse)
+    monkeypatch.setattr(service, "TTL_PAST", -1)  # 収集記録を古くして取得させる
+    items2, logs2, _, last_collected = service.get_news(["lawson"], "2025-10-25", "2025-10-25")
+    assert sent[1]["If-None-Match"] == '"v1"'
+    assert [i["title"] for i in items2] == ["ローソンの新商品発売のお知らせ"]
+    assert any("not modified" in l for l in logs2)
+    spans = storage.get_coverage_spans(["lawson"], "2025-10-25", "2025-10-25")
+    assert [span[3] for span in spans["lawson"]] == ["ok"]
+
+    # 強制収集は検証子を送らず、本文を取り直す(保存済みの記事を使い回さない)
+    monkeypatch.setattr("app.scraper.BeautifulSoup", real_soup)
+    _items3, logs3, _, _ = service.get_news(["lawson"], "2025-10-25", "2025-10-25", force=True)
+    assert sent[2] == {}
+    assert not any("not modified" in l for l in logs3)
+
+
+def test_conditional_get_skipped_outside_saved_range():
+    """前回保存した範囲より古い日付を求められたら、304 で代用できないので条件付きにしない。"""
+    lawson = _company("lawson")
+    storage.save_validators("lawson", lawson["url"], '"v1"', None, "2025-10-25", "2025-10-25")
+    assert NewsScraper._conditional_headers(lawson, "2025-10-25") == {"If-None-Match": '"v1"'}
+    assert NewsScraper._conditional_headers(lawson, "2025-10-20") is None
+    # 同じ URL でも別企業の保存済みニュースでは代用できない
+    assert storage.get_validators("kirin", lawson["url"]) is None
+
+
+def test_conditional_get_after_midnight_extends_coverage_to_today(monkeypatch):
+    """前回保存した範囲の終わり(保存時の今日)より後の日付でも条件付き GET にし、
+    304 なら今日までを収集済みにする。"""
+    today = datetime.now()
+    yesterday = (today - timedelta(days=1)).strftime("%Y-%m-%d")
+    today_str = today.strftime("%Y-%m-%d")
+    lawson = _company("lawson")
+    storage.save_validators("lawson", lawson["url"], '"v1"', None, yesterday, yesterday)
+    sent = []
+
+    def fake_get(self, url, timeout=None, headers=None, **kwargs):
+        sent.append(dict(headers or {}))
+        return _ValidatorResponse(304)
+
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    _items, logs, _, _ = service.get_news(["lawson"], today_str, today_str)
+    assert sent == [{"If-None-Match": '"v1"'}]
+    assert any("not modified" in line for line in logs)
+    spans = storage.get_coverage_spans(["lawson"], yesterday, today_str)
+    assert [span[:2] for span in spans["lawson"]] == [(yesterday, today_str)]
+
+
+def test_unchanged_body_skips_reparse(monkeypatch):
+    """検証子を返さないサイトでも、本文が前回と同じなら解析せず前回の抽出結果を使う。"""
+    pages = {"body": LAWSON_PAGE}
+
+    def fake_get(self, url, timeout=None, **kwargs):
+        return _ValidatorResponse(200, pages["body"])
+
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    items1, _, _ = NewsScraper().fetch_news(["lawson"], "2025-10-20", "2025-10-31")
+    assert [i["title"] for i in items1] == ["ローソンの新商品発売のお知らせ"]
+
+    real_soup = scraper.BeautifulSoup
+    parses = []
+
+    def counting_soup(*args, **kwargs):
+        parses.append(1)
+        return real_soup(*args, **kwargs)
+
+    monkeypatch.setattr(scraper, "BeautifulSoup", counting_soup)
+    # 同じ本文・前回範囲の内側 → 解析なし
+    items2, logs2, _ = NewsScraper().fetch_news(["lawson"], "2025-10-25", "2025-10-25")
+    assert items2 == items1
+    assert parses == []
+    assert any("fingerprint match" in l for l in logs2)
+
+    # 前回とは違う期間でも、本文が同じなら解析しない(抽出結果はページ上のすべての記事)
+    items2b, _, _ = NewsScraper().fetch_news(["lawson"], "2025-10-01", "2025-11-05")
+    assert items2b == items1
+    assert parses == []
+
+    # 強制収集は本文が同じでも解析し直す
+    NewsScraper().fetch_news(["lawson"], "2025-10-25", "2025-10-25", force=True)
+    assert parses == [1]
+
+    # 抽出ロジックの版が変われば、保存済みの抽出結果は使わない
+    monkeypatch.setattr(scraper, "EXTRACTOR_VERSION", scraper.EXTRACTOR_VERSION + 1)
+    NewsScraper().fetch_news(["lawson"], "2025-10-25", "2025-10-25")
+    assert parses == [1, 1]
+    NewsScraper().fetch_news(["lawson"], "2025-10-25", "2025-10-25")
+    assert parses == [1, 1]
+
+    # 本文が変われば解析し直す
+    pages["body"] = LAWSON_PAGE.replace("新商品発売", "キャンペーン開始")
+    items3, _, _ = NewsScraper().fetch_news(["lawson"], "2025-10-25", "2025-10-25")
+    assert parses == [1, 1, 1]
+    assert [i["title"] for i in items3] == ["ローソンのキャンペーン開始のお知らせ"]
+
+
+def test_fingerprints_without_extractor_version_are_dropped():
+    """抽出ロジックの版を持たない旧形式の抽出結果は、接続時に捨てて作り直す。"""
+    path = storage.db_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE page_fingerprints (company_id TEXT, url TEXT, body_hash TEXT, range_start TEXT, "
+            "range_end TEXT, items_json TEXT, feed_candidates TEXT, updated_at REAL, PRIMARY KEY (company_id, url))"
+        )
+        conn.execute("INSERT INTO page_fingerprints VALUES ('lawson', 'u', 'h', '', '', '[]', '[]', 0)")
+    assert storage.get_page_fingerprint("lawson", "u", scraper.EXTRACTOR_VERSION) is None
+    storage.save_page_fingerprint("lawson", "u", "h", scraper.EXTRACTOR_VERSION, [], [])
+    assert storage.get_page_fingerprint("lawson", "u", scraper.EXTRACTOR_VERSION)["body_hash"] == "h"
+
+
+def test_year_pages_outside_range_are_not_fetched(monkeypatch):
+    """date_span が検索範囲と重ならない年別ページは取得せず、収集済みとして記録する。"""
+    calls = []
+
+    def fake_fetch(self, ids, start, end, force=False):
+        calls.append(list(ids))
+        self.last_status = {cid: ("ok", 200) for cid in ids}
+        return [], ["scraped"], []
+
+    monkeypatch.setattr(NewsScraper, "fetch_news", fake_fetch)
+    ids = ["seven_2026", "seven_2025", "ministop", "ministop_2025"]
+    _, logs, checked, _ = service.get_news(ids, "2026-07-06", "2026-07-06")
+    assert calls == [["seven_2026", "ministop"]]
+    assert checked == [_company(cid)["name"] for cid in ids]
+    assert any("outside date span" in line for line in logs)
+    spans = storage.get_coverage_spans(["seven_2025"], "2026-07-06", "2026-07-06")
+    assert [span[3] for span in spans["seven_2025"]] == ["ok"]
+
+    # 収集記録があれば、次の表示では書き込まない
+    with patch.object(storage, "record_coverage_ranges", wraps=storage.record_coverage_ranges) as record:
+        service.get_news(ids, "2026-07-06", "2026-07-06")
+    assert not {c.args[0] for c in record.call_args_list} & {"seven_2025", "ministop_2025"}
+
+    # 年をまたぐ範囲なら両方の年を取得する(強制収集でも範囲外は取得しない)
+    service.get_news(ids, "2025-12-30", "2026-01-02", force=True)
+    assert calls[-1] == ids
+    service.get_news(ids, "2026-07-07", "2026-07-07", force=True)
+    assert calls[-1] == ["seven_2026", "ministop"]
+
+
+def _wait_for_background_refresh():
+    deadline = time.monotonic() + 5
+    while service._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not service._refreshing
+
+
+def test_stale_companies_served_while_refreshing_in_background(monkeypatch):
+    lawson = _company("lawson")["name"]
+    release = threading.Event()
+    calls = []
+
+    def fake_fetch(self, ids, start, end, force=False):
+        calls.append(list(ids))
+        if len(calls) > 1:
+            release.wait(5)  # バックグラウンドの再収集は遅いサイトを模す
+        self.last_status = {cid: ("ok", 200) for cid in ids}
+        title = "ニュースタイトルテスト" if len(calls) == 1 else "再収集後のタイトル"
+        return [_make_item(lawson, title=title, url=f"https://example.com/n/{len(calls)}")], [], [lawson]
+
+    monkeypatch.setattr(NewsScraper, "fetch_news", fake_fetch)
+    service.get_news(["lawson"], "2025-10-25", "2025-10-25")
+    monkeypatch.setattr(service, "TTL_PAST", 0)  # 以後は古い扱い
+
+    items, logs, _checked, _, refreshing = service.serve_news(["lawson"], "2025-10-25", "2025-10-25")
+    assert refreshing == ["lawson"]
+    assert [i["title"] for i in items] == ["ニュースタイトルテスト"]  # 収集を待たずに保存済みを返す
+    assert any("stale, refreshing (1 items)" in line for line in logs)
+    # 再収集中に来たリクエストは重ねて予約しない
+    service.serve_news(["lawson"], "2025-10-25", "2025-10-25")
+
+    release.set()
+    _wait_for_background_refresh()
+    assert len(calls) == 2
+    titles = {i["title"] for i in storage.get_items("lawson", "2025-10-25", "2025-10-25")}
+    assert "再収集後のタイトル" in titles
+
+
+def test_hard_stale_companies_still_block(monkeypatch):
+    calls = []
+
+    def fake_fetch(self, ids, start, end, force=False):
+        calls.append(list(ids))
+        self.last_status = {cid: ("ok", 200) for cid in ids}
+        return [], [], []
+
+    monkeypatch.setattr(NewsScraper, "fetch_news", fake_fetch)
+    # 未収集の企業は返せる内容がないので収集を待つ
+    *_rest, refreshing = service.serve_news(["lawson"], "2025-10-25", "2025-10-25")
+    assert calls == [["lawson"]] and refreshing == []
+
+    # NEWS_STALE_SERVE_MAX_SECONDS より前の収集も待つ
+    monkeypatch.setattr(service, "TTL_PAST", 0)
+    monkeypatch.setattr(service, "STALE_SERVE_MAX_SECONDS", 0)
+    *_rest, refreshing = service.serve_news(["lawson"], "2025-10-25", "2025-10-25")
+    assert calls == [["lawson"]] * 2 and refreshing == []
+
+
+def test_whole_page_is_harvested_for_later_dates(monkeypatch):
+    """期間外の記事も保存し、ページが網羅する日付は収集済みにする。
+    後から同じページの別の日付を検索しても再取得しない。"""
+    today = datetime.now()
+    day = [(today - timedelta(days=n)).strftime("%Y-%m-%d") for n in range(10)]
+    page = "<html><body><ul>" + "".join(
+        f'<li>{day[n].replace("-", ".")} <a href="/news/{n}.html">ローソンのお知らせ その{n}</a></li>'
+        for n in (0, 3, 8)
+    ) + "</ul></body></html>"
+    gets = []
+
+    def fake_get(self, url, timeout=None, **kwargs):
+        gets.append(url)
+        return _ValidatorResponse(200, page)
+
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    items, logs, _, _ = service.get_news(["lawson"], day[0], day[0])
+    assert [i["title"] for i in items] == ["ローソンのお知らせ その0"]
+    assert len(gets) == 1
+    # 期間外の記事はログに1件ずつは出さず、件数の1行だけにする
+    assert [line for line in logs if line.startswith("★ MATCH")] == [f"★ MATCH: {day[0]} in <li>"]
+    assert [line for line in logs if line.startswith("  -> Found")] == ["  -> Found: ローソンのお知らせ その0..."]
+    assert any(line.startswith("Harvested 3 items") for line in logs)
+
+    # 最も古い記事の翌日から今日までは収集済み(記事のない日も)。最も古い日は
+    # 一覧の途中で切れているかもしれないので含めない
+    spans = storage.get_coverage_spans(["lawson"], day[9], day[0])
+    assert [span[:2] for span in spans["lawson"]] == [(day[7], day[0])]
+
+    items, logs, _, _ = service.get_news(["lawson"], day[7], day[1])
+    assert len(gets) == 1, "harvested dates must be served from the cache"
+    assert [i["title"] for i in items] == ["ローソンのお知らせ その3"]
+    assert any("cache hit (1 items)" in line for line in logs)
+
+    service.get_news(["lawson"], day[8], day[8])
+    assert len(gets) == 2
+
+
+def test_early_stopped_page_covers_only_the_requested_range(monkeypatch):
+    """先頭だけ読んだページは、読んでいない続きの日付を収集済みにしない。"""
+    today = datetime.now()
+    day = [(today - timedelta(days=n)).strftime("%Y-%m-%d") for n in range(10)]
+    rows = [(day[3], n) for n in range(3)] + [(day[9], n) for n in range(3, 3000)]
+    page = "<html><body><ul>" + "".join(
+        f'<li>{d.replace("-", ".")} <a href="/news/{n}.html">ローソンのお知らせ その{n}</a></li>'
+        for d, n in rows
+    ) + "</ul></body></html>"
+    company = {**_company("lawson"), "early_stop": True}
+
+    def fake_get(self, url, timeout=None, **kwargs):
+        r = requests.Response()
+        r.status_code = 200
+        r.raw = urllib3.HTTPResponse(body=io.BytesIO(page.encode("utf-8")), preload_content=False, status=200)
+        return r
+
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    with patch.object(scraper, "COMPANIES", [company]), patch.object(service, "COMPANIES", [company]):
+        items, logs, _, _ = service.get_news(["lawson"], day[3], day[3])
+    assert len(items) == 3
+    assert any("Early stop" in line for line in logs)
+    spans = storage.get_coverage_spans(["lawson"], day[9], day[0])
+    assert [span[:2] for span in spans["lawson"]] == [(day[3], day[3])]
+
+
+def test_harvest_span_only_extends_a_contiguous_range():
+    span = functools.partial(scraper.harvest_span, start_date_str="2026-07-01", end_date_str="2026-07-02",
+                             today_str="2026-07-10")
+    assert span([]) == ("2026-07-01", "2026-07-02")
+    assert span(["2026-07-05", "2026-06-20"]) == ("2026-06-21", "2026-07-10")
+    # 読み止めた本文は、要求された期間の外を網羅していない
+    assert span(["2026-07-05", "2026-06-20"], complete=False) == ("2026-07-01", "2026-07-02")
+    # ページの記事がすべて期間より新しければ、期間との間の日付は網羅していない
+    assert span(["2026-07-05"]) == ("2026-07-01", "2026-07-02")
+    assert span(["2026-07-02"]) == ("2026-07-01", "2026-07-10")
+
+
+def test_harvest_span_follows_only_the_newest_first_run():
+    span = functools.partial(scraper.harvest_span, start_date_str="2026-07-01", end_date_str="2026-07-02",
+                             today_str="2026-07-10")
+    # フッターの古い日付のような、並びから大きく離れた記事から先は網羅していない
+    assert span(["2026-07-05", "2026-06-28", "2019-04-01"]) == ("2026-06-29", "2026-07-10")
+    # 並びが逆転したらそこまで
+    assert span(["2026-07-05", "2026-06-28", "2026-07-03", "2026-06-01"]) == ("2026-06-29", "2026-07-10")
+    # 先頭が最新の記事でない(古い順・固定表示の古い記事が先頭)なら広げない
+    assert span(["2025-01-01", "2026-07-05", "2026-06-28"]) == ("2026-07-01", "2026-07-02")
@@ -0,0 +1,82 @@
+"""文字コード判定のテスト。
+
+統計的な判定(apparent_encoding)は重いので、Content-Type・BOM・<meta charset> で
+宣言されていればそれを使い、判定した結果は情報源ごとに覚えて次回に使い回す。
+"""
+from unittest.mock import patch
+
+import requests
+
+from app import scraper, storage
+from app.scraper import NewsScraper, declared_encoding
+
+COMPANY = {
+    "id": "sjisco", "name": "SJIS社", "category": "テスト",
+    "url": "https://sjis.example/news/", "scraper_type": "auto",
+    "badge_color": "#111111", "date_format": "%Y.%m.%d",
+}
+
+PAGE = """<html><head>{meta}</head><body><ul>
+<li>2026.07.06 <a href="/n/1.html">①新商品のお知らせ{suffix}</a></li>
+</ul></body></html>"""
+
+
+class FakeResponse:
+    def __init__(self, body, headers=None, detected="cp932"):
+        self.status_code = 200
+        self.content = body
+        self.headers = headers or {}
+        self.detected = detected
+        self.detections = 0
+
+    @property
+    def apparent_encoding(self):
+        self.detections += 1
+        return self.detected
+
+
+def _fetch(monkeypatch, response):
+    monkeypatch.setattr(requests.Session, "get", lambda self, url, **kwargs: response)
+    with patch.object(scraper, "COMPANIES", [COMPANY]):
+        items, logs, _ = NewsScraper().fetch_news([COMPANY["id"]], "2026-07-01", "2026-07-07")
+    return items, logs
+
+
+def test_declared_encoding_sources():
+    assert declared_encoding(b"\xef\xbb\xbf<html>") == "utf-8-sig"
+    assert declared_encoding(b"<html>", "text/html; charset=UTF-8") == "utf-8"
+    assert declared_encoding(b'<meta http-equiv="Content-Type" content="text/html; charset=euc-jp">') == "euc_jp"
+    # Shift_JIS 宣言は Windows 拡張文字を含む cp932 として読む
+    assert declared_encoding(b'<meta charset="Shift_JIS">') == "cp932"
+    assert declared_encoding(b"<html><body>no charset</body></html>") is None
+
+
+def test_meta_charset_skips_statistical_detection(monkeypatch):
+    body = PAGE.format(meta='<meta charset="Shift_JIS">', suffix="").encode("cp932")
+    resp = FakeResponse(body)
+    items, _ = _fetch(monkeypatch, resp)
+    assert resp.detections == 0
+    assert [i["title"] for i in items] == ["①新商品のお知らせ"]
+
+
+def test_detected_encoding_remembered_per_source(monkeypatch):
+    first = FakeResponse(PAGE.format(meta="", suffix="").encode("cp932"))
+    items, logs = _fetch(monkeypatch, first)
+    assert first.detections == 1
+    assert any("Charset detected" in l for l in logs)
+    assert storage.get_source_encoding(COMPANY["id"], COMPANY["url"]) == "cp932"
+
+    # 本文が変わっても、覚えた文字コードで読めれば判定し直さない
+    second = FakeResponse(PAGE.format(meta="", suffix="(更新)").encode("cp932"))
+    items, _ = _fetch(monkeypatch, second)
+    assert second.detections == 0
+    assert [i["title"] for i in items] == ["①新商品のお知らせ(更新)"]
+
+
+def test_remembered_encoding_rechecked_when_it_no_longer_fits(monkeypatch):
+    storage.save_source_encoding(COMPANY["id"], COMPANY["url"], "ascii")
+    resp = FakeResponse(PAGE.format(meta="", suffix="").encode("utf-8"), detected="utf-8")
+    items, _ = _fetch(monkeypatch, resp)
+    assert resp.detections == 1
+    assert [i["title"] for i in items] == ["①新商品のお知らせ"]
+    assert storage.get_source_encoding(COMPANY["id"], COMPANY["url"]) == "utf-8"
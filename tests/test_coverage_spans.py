@@ -0,0 +1,81 @@
+"""収集記録を企業ごとの日付区間(coverage_spans)として持つことのテスト。
+
+書き込みのたびに区間をまとめ・分割し、鮮度の判断は企業ごとの範囲検索で行う。
+旧形式の coverage(企業×日付ごとに1行)は接続時に区間へ移す。
+"""
+import sqlite3
+import time
+
+from app import service, storage
+from app.scraper import NewsScraper
+
+
+def _spans(cid):
+    return [s[:2] + s[3:] for s in storage.get_coverage_spans([cid], "0000-00-00", "9999-99-99").get(cid, [])]
+
+
+def test_write_over_several_spans_leaves_one_span():
+    storage.record_coverage("lawson", ["2026-07-01", "2026-07-02", "2026-07-03"], "ok", 200)
+    storage.record_coverage_ranges("lawson", [("2026-07-05", "2026-07-06")], "ok", 200)
+    assert _spans("lawson") == [("2026-07-01", "2026-07-03", "ok", 200), ("2026-07-05", "2026-07-06", "ok", 200)]
+
+    storage.record_coverage_ranges("lawson", [("2026-07-01", "2026-07-04"), ("2026-07-04", "2026-07-06")], "ok", 200)
+    assert _spans("lawson") == [("2026-07-01", "2026-07-06", "ok", 200)]
+
+
+def test_overlapping_write_splits_the_older_span():
+    storage.record_coverage_ranges("lawson", [("2026-07-01", "2026-07-10")], "ok", 200)
+    storage.record_coverage_ranges("lawson", [("2026-07-04", "2026-07-05")], "error", 503)
+    assert _spans("lawson") == [
+        ("2026-07-01", "2026-07-03", "ok", 200),
+        ("2026-07-04", "2026-07-05", "error", 503),
+        ("2026-07-06", "2026-07-10", "ok", 200),
+    ]
+    # 範囲検索は指定した期間と重なる区間だけを返す
+    spans = storage.get_coverage_spans(["lawson"], "2026-07-03", "2026-07-04")["lawson"]
+    assert [span[3:] for span in spans] == [("ok", 200), ("error", 503)]
+    assert storage.get_coverage_spans(["lawson"], "2026-07-11", "2026-07-12") == {}
+
+
+def test_old_day_rows_are_migrated_into_spans():
+    path = storage.db_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE coverage (
+            company_id TEXT NOT NULL, date TEXT NOT NULL, fetched_at REAL NOT NULL,
+            status TEXT NOT NULL, status_code INTEGER, PRIMARY KEY (company_id, date)
+        )""")
+    rows = [("lawson", f"2026-07-0{d}", 100.0, "ok", 200) for d in (1, 2, 3, 5)]
+    rows.append(("lawson", "2026-07-06", 200.0, "ok", 200))
+    conn.executemany("INSERT INTO coverage VALUES (?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+    assert storage.get_coverage_spans(["lawson"], "2026-07-01", "2026-07-31")["lawson"] == [
+        ("2026-07-01", "2026-07-03", 100.0, "ok", 200),
+        ("2026-07-05", "2026-07-05", 100.0, "ok", 200),
+        ("2026-07-06", "2026-07-06", 200.0, "ok", 200),
+    ]
+    with sqlite3.connect(path) as conn:
+        assert not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'coverage'").fetchone()
+
+
+def test_wide_range_is_fresh_from_one_span(monkeypatch):
+    """400日の期間でも、区間1つで覆われていれば再収集しない。"""
+    monkeypatch.setattr(
+        NewsScraper, "fetch_news", lambda *a, **k: (_ for _ in ()).throw(AssertionError("must not scrape"))
+    )
+    storage.record_coverage_ranges("lawson", [("2025-01-01", "2026-02-04")], "ok", 200)
+    _items, logs, _checked, _ = service.get_news(["lawson"], "2025-01-01", "2026-02-04")
+    assert any(": cache hit (0 items)" in line for line in logs)
+    assert len(storage.get_coverage_spans(["lawson"], "2025-01-01", "2026-02-04")["lawson"]) == 1
+
+
+def test_gap_in_coverage_makes_the_company_stale():
+    assert service._covering([("2026-07-01", "2026-07-03", 1.0, "ok", 200)], "2026-07-02", "2026-07-03") == [
+        ("2026-07-02", "2026-07-03", 1.0, "ok", 200)
+    ]
+    spans = [("2026-07-01", "2026-07-02", 1.0, "ok", 200), ("2026-07-04", "2026-07-05", 1.0, "ok", 200)]
+    assert service._covering(spans, "2026-07-01", "2026-07-05") is None
+    assert not service._is_fresh(None, "2026-07-05", time.time())
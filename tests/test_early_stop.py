@@ -0,0 +1,130 @@
+"""早期打ち切り(companies.py の "early_stop")のテスト。
+
+新しい順に並ぶ一覧ページは、期間より古い日付が続いた時点でダウンロードを止めて
+先頭部分だけを解析する。日付は一覧の行の中だけを数え、先頭部分に期間内の記事が
+なければ全文を取り直す。
+"""
+import io
+from unittest.mock import patch
+
+import requests
+import urllib3
+
+from app import scraper
+from app.scraper import NewsScraper, _EarlyStopScanner
+
+COMPANY = {
+    "id": "yearly", "name": "年別一覧社", "category": "テスト",
+    "url": "https://yearly.example/news/2026.html", "scraper_type": "auto",
+    "badge_color": "#111111", "date_format": "%Y.%m.%d", "early_stop": True,
+}
+
+
+def _rows(days, month):
+    return "".join(
+        f'<li>2026.{month:02d}.{day:02d} <a href="/n/{month}-{day}.html">{month}月{day}日のお知らせ本文タイトル</a></li>\n'
+        for day in days
+    )
+
+
+def _page(rows):
+    # 古い記事を大量に並べて、打ち切らなければ数百KBを読むページにする
+    old = "".join(_rows(range(28, 0, -1), month) for month in range(6, 0, -1)) * 20
+    return f'<html><head><meta charset="utf-8"></head><body><ul>\n{rows}{old}</ul></body></html>'.encode("utf-8")
+
+
+def _streaming_response(payload):
+    r = requests.Response()
+    r.status_code = 200
+    r.raw = urllib3.HTTPResponse(body=io.BytesIO(payload), preload_content=False, status=200)
+    return r
+
+
+def _fetch(monkeypatch, payload, company=COMPANY, start="2026-07-06", end="2026-07-06"):
+    calls = []
+
+    def fake_get(self, url, timeout=None, **kwargs):
+        calls.append(url)
+        return _streaming_response(payload)
+
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    with patch.object(scraper, "COMPANIES", [company]):
+        items, logs, _ = NewsScraper().fetch_news([company["id"]], start, end)
+    return items, logs, calls
+
+
+def test_scanner_stops_after_consecutive_older_dates():
+    scanner = _EarlyStopScanner("2026-07-06")
+    assert scanner.feed(b"<ul><li>2026.07.08 a</li><li>2026.07.06 b</li>") is False
+    # 古い日付の途中に新しい日付が挟まれば数え直す
+    assert scanner.feed(b"<li>2026.07.01</li>" * 4 + b"<li>2026.07.07</li>") is False
+    # 日付がチャンクの境目で分かれても1つとして数える
+    assert scanner.feed(b"<li>2026.07.01</li>" * 4 + b"<li>2026.0") is False
+    assert scanner.feed(b"6.30 x</li>") is True
+
+
+def test_scanner_ignores_dates_in_scripts():
+    scanner = _EarlyStopScanner("2026-07-06")
+    assert scanner.feed(b"<script>var d = '2020.01.01 2020.01.02 2020.01.03 2020.01.04 2020.01.05 x';</script>") is False
+
+
+def test_early_stop_reads_only_the_head_of_the_page(monkeypatch):
+    payload = _page(_rows([8, 6], 7))
+    assert len(payload) > 200_000
+    items, logs, calls = _fetch(monkeypatch, payload)
+    assert [(i["date"], i["title"]) for i in items] == [("2026-07-06", "7月6日のお知らせ本文タイトル")]
+    assert len(calls) == 1
+    stop_log = next(line for line in logs if line.startswith("Early stop: read"))
+    read_bytes = int(stop_log.split("read ")[1].split(" bytes")[0])
+    assert read_bytes < len(payload) // 2
+
+
+def test_early_stop_matches_full_parse(monkeypatch):
+    """打ち切った場合と全文を解析した場合とで、期間内の記事は同じ。"""
+    payload = _page(_rows([8, 7, 6, 3], 7))
+    early, _, _ = _fetch(monkeypatch, payload, start="2026-07-03", end="2026-07-07")
+    full, _, _ = _fetch(monkeypatch, payload, company={**COMPANY, "early_stop": False},
+                        start="2026-07-03", end="2026-07-07")
+    assert early == full
+    assert len(early) == 3
+
+
+def test_scanner_counts_only_dates_in_list_rows():
+    """ヘッダー・メニューや一覧の行の外にある日付では止まらない。"""
+    scanner = _EarlyStopScanner("2026-07-06")
+    head = (b"<header><p>2020.01.01 2020.01.02</p></header><nav><ul>"
+            + b"<li>2020.01.0%d</li>" % 3 * 5 + b"</ul></nav><p>2020.01.04 2020.01.05 2020.01.06</p>")
+    assert scanner.feed(head) is False
+    assert scanner.older_run == 0
+    assert scanner.feed(b"<ul>" + b"<li>2026.07.01 a</li>" * 5) is True
+
+
+def test_old_dates_in_the_header_do_not_stop_the_download(monkeypatch):
+    header = "<header><ul>" + "".join(f"<li>2025.0{m}.01 更新情報</li>" for m in range(1, 7)) + "</ul></header>"
+    payload = _page(_rows([8, 6], 7)).replace(b"<body>", f"<body>{header}".encode("utf-8"))
+    items, logs, calls = _fetch(monkeypatch, payload)
+    assert [i["date"] for i in items] == ["2026-07-06"]
+    assert len(calls) == 1
+    assert any(line.startswith("Early stop: read") for line in logs)
+
+
+def test_pinned_old_items_ahead_of_the_list_fall_back_to_the_full_page(monkeypatch):
+    """一覧の前に古い記事が固定表示されて読み止めても、期間内の記事がなければ全文を取り直す。"""
+    banner = "<div>" + "<p>キャンペーン</p>" * 5000 + "</div>"  # 一覧を最初の受信チャンクの外へ
+    pinned = f'<ul class="pickup">{_rows(range(10, 4, -1), 3)}</ul>{banner}'
+    payload = _page(_rows([8, 6], 7)).replace(b"<body>", f"<body>{pinned}".encode("utf-8"))
+    items, logs, calls = _fetch(monkeypatch, payload)
+    assert len(calls) == 2
+    assert [i["date"] for i in items] == ["2026-07-06"]
+    assert "Early stop found no items. Refetched the full page." in logs
+
+
+def test_falls_back_to_full_page_when_head_has_no_items(monkeypatch):
+    """期間内の記事が古い記事の後ろにある(新しい順でない)ページは、全文を取り直して拾う。"""
+    ascending = "".join(_rows(range(1, 29), month) for month in range(1, 7)) * 20
+    payload = f'<html><head><meta charset="utf-8"></head><body><ul>\n{ascending}{_rows([6], 7)}</ul></body></html>'
+    payload = payload.encode("utf-8")
+    items, logs, calls = _fetch(monkeypatch, payload)
+    assert len(calls) == 2
+    assert [i["date"] for i in items] == ["2026-07-06"]
+    assert "Early stop found no items. Refetched the full page." in logs
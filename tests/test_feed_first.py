@@ -0,0 +1,111 @@
+"""フィード優先の収集のテスト。
+
+ページが宣言する(または rss_url の)フィードを読めると確認できた情報源は、
+次回から一覧ページより先にフィードを読む。HTML はフィードで足りないときと
+定期確認(NEWS_FEED_HTML_CHECK_HOURS ごと)のときだけ読む。
+"""
+import time
+from contextlib import asynccontextmanager
+from unittest.mock import patch
+
+import requests
+
+from app import scraper, storage
+from app.scraper import NewsScraper
+
+from test_scraper_fallbacks import FakeResponse, RSS_DISCOVERY_HTML, RSS_XML, TEST_COMPANY
+
+HTML_WITH_ITEMS_AND_FEED = """
+<html><head>
+<link rel="alternate" type="application/rss+xml" href="/news/feed.xml">
+</head><body><ul>
+  <li>2026.07.06 <a href="/press/a.html">新しい支援制度を開始します(HTML)</a></li>
+</ul></body></html>
+"""
+
+FEED_URL = "https://example.gov/news/feed.xml"
+
+
+def _fetch(monkeypatch, pages, start="2026-07-01", end="2026-07-07"):
+    calls = []
+
+    def fake_get(self, url, timeout=None, **kwargs):
+        calls.append(url)
+        for key, body in pages.items():
+            if key in url:
+                return FakeResponse(200, body)
+        return FakeResponse(404, "")
+
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    with patch.object(scraper, "COMPANIES", [TEST_COMPANY]):
+        items, logs, _ = NewsScraper().fetch_news([TEST_COMPANY["id"]], start, end)
+    return items, logs, calls
+
+
+def test_feed_found_by_fallback_is_read_first_next_time(monkeypatch):
+    pages = {"/press/": RSS_DISCOVERY_HTML, "/news/feed.xml": RSS_XML}
+    _fetch(monkeypatch, pages)
+    items, logs, calls = _fetch(monkeypatch, pages)
+    assert calls == [FEED_URL]
+    assert [i["title"] for i in items] == ["新しい支援制度を開始します"]
+    assert f"Feed-first: 1 items from {FEED_URL}" in logs
+
+
+def test_feed_is_verified_even_when_html_has_items(monkeypatch):
+    pages = {"/press/": HTML_WITH_ITEMS_AND_FEED, "/news/feed.xml": RSS_XML}
+    items, logs, calls = _fetch(monkeypatch, pages)
+    assert [i["title"] for i in items] == ["新しい支援制度を開始します(HTML)"]
+    assert f"Feed verified: {FEED_URL}" in logs
+    _, _, calls = _fetch(monkeypatch, pages)
+    assert calls == [FEED_URL]
+
+
+def test_feeds_are_read_in_the_feed_hosts_slot(monkeypatch):
+    """フィードの確認・フィード優先の読み込みは、ページの枠を返してからフィードのホストの枠で行う。"""
+    events = []
+    real_slot = scraper._HostGate.slot
+
+    @asynccontextmanager
+    async def recording_slot(self, url):
+        async with real_slot(self, url):
+            events.append(("enter", url))
+            yield
+            events.append(("exit", url))
+
+    monkeypatch.setattr(scraper._HostGate, "slot", recording_slot)
+    pages = {"/press/": HTML_WITH_ITEMS_AND_FEED, "/news/feed.xml": RSS_XML}
+    _, logs, _ = _fetch(monkeypatch, pages)
+    assert f"Feed verified: {FEED_URL}" in logs
+    assert events == [("enter", TEST_COMPANY["url"]), ("exit", TEST_COMPANY["url"]),
+                      ("enter", FEED_URL), ("exit", FEED_URL)]
+
+    events.clear()
+    _fetch(monkeypatch, pages)
+    assert events == [("enter", FEED_URL), ("exit", FEED_URL)]
+
+
+def test_html_is_read_when_feed_does_not_reach_back(monkeypatch):
+    """フィードの最古の記事より前からの範囲は、フィードだけでは分からないので HTML を読む。"""
+    pages = {"/press/": RSS_DISCOVERY_HTML, "/news/feed.xml": RSS_XML}
+    _fetch(monkeypatch, pages)
+    _, logs, calls = _fetch(monkeypatch, pages, start="2024-12-01", end="2026-07-07")
+    assert calls[0] == FEED_URL and any("/press/" in c for c in calls)
+    assert "Feed does not reach back to 2024-12-01. Scraping HTML." in logs
+
+
+def test_html_is_checked_periodically(monkeypatch):
+    pages = {"/press/": RSS_DISCOVERY_HTML, "/news/feed.xml": RSS_XML}
+    _fetch(monkeypatch, pages)
+    later = time.time() + scraper.FEED_HTML_CHECK_HOURS * 3600 + 1
+    monkeypatch.setattr(scraper.time, "time", lambda: later)
+    _, _, calls = _fetch(monkeypatch, pages)
+    assert any("/press/" in c for c in calls)
+
+
+def test_broken_feed_falls_back_to_html_and_is_marked_bad(monkeypatch):
+    _fetch(monkeypatch, {"/press/": RSS_DISCOVERY_HTML, "/news/feed.xml": RSS_XML})
+    pages = {"/press/": HTML_WITH_ITEMS_AND_FEED, "/news/feed.xml": "this is not xml <<<"}
+    items, logs, calls = _fetch(monkeypatch, pages)
+    assert "Feed-first failed. Scraping HTML." in logs
+    assert [i["title"] for i in items] == ["新しい支援制度を開始します(HTML)"]
+    assert storage.get_feeds(TEST_COMPANY["id"], TEST_COMPANY["url"])[0]["good"] is False
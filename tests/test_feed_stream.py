@@ -0,0 +1,93 @@
+"""フィードの逐次読み込み(XMLPullParser)のテスト。
+
+エントリを1件ずつ処理して木から外し、新しい順のフィードでは期間より古い記事が
+続いた時点でダウンロードごと打ち切る。
+"""
+import io
+
+import requests
+import urllib3
+
+from app.scraper import NewsScraper
+
+COMPANY = {
+    "id": "feedco", "name": "フィード社", "category": "テスト",
+    "url": "https://feed.example/news/", "scraper_type": "auto",
+    "badge_color": "#111111", "date_format": "%Y.%m.%d",
+}
+FEED_URL = "https://feed.example/news/feed.xml"
+
+
+def _rss(days):
+    body = "<p>" + "本文の HTML をまるごと載せるフィード。" * 200 + "</p>"
+    entries = "".join(
+        f"""<item><title>7月{d}日のお知らせ</title><link>https://feed.example/n/{d}.html</link>
+<pubDate>{d:02d} Jul 2026 10:00:00 +0900</pubDate><description><![CDATA[{body}]]></description></item>"""
+        for d in days
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>{entries}</channel></rss>'.encode("utf-8")
+
+
+class _CountingBody(io.BytesIO):
+    """読み出したバイト数を覚えておく本文(close 後も確認できるように)。"""
+
+    consumed = 0
+
+    def read(self, *args, **kwargs):
+        data = super().read(*args, **kwargs)
+        self.consumed += len(data)
+        return data
+
+
+def _read(monkeypatch, payload, start, end, harvested=None):
+    raw = _CountingBody(payload)
+
+    def fake_get(self, url, timeout=None, **kwargs):
+        r = requests.Response()
+        r.status_code = 200
+        r.raw = urllib3.HTTPResponse(body=raw, preload_content=False, status=200)
+        return r
+
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    logs = []
+    result = NewsScraper()._read_feed(COMPANY, FEED_URL, start, end, logs, harvested=harvested)
+    return result, logs, raw.consumed
+
+
+def test_sorted_feed_stops_after_older_entries(monkeypatch):
+    payload = _rss(range(28, 0, -1))
+    (items, oldest, complete), logs, read = _read(monkeypatch, payload, "2026-07-20", "2026-07-21")
+    assert [i["date"] for i in items] == ["2026-07-21", "2026-07-20"]
+    assert oldest < "2026-07-20"
+    assert read < len(payload) and not complete
+    assert any("Stopped reading" in line for line in logs)
+
+
+def test_unsorted_feed_is_read_to_the_end(monkeypatch):
+    days = list(range(28, 0, -1))
+    days.append(25)  # 末尾に新しい記事(並びが崩れている)
+    days.insert(3, 27)
+    payload = _rss(days)
+    (items, oldest, complete), logs, read = _read(monkeypatch, payload, "2026-07-20", "2026-07-21")
+    assert oldest == "2026-07-01"
+    assert read == len(payload) and complete
+    assert not any("Stopped reading" in line for line in logs)
+
+
+def test_missing_dates_keep_reading(monkeypatch):
+    """日付のないエントリは並び順の判断にも打ち切りにも使わない。"""
+    payload = _rss(range(28, 0, -1)).replace(b"<pubDate>", b"<note>").replace(b"</pubDate>", b"</note>")
+    (items, oldest, _complete), logs, read = _read(monkeypatch, payload, "2026-07-20", "2026-07-21")
+    assert items == [] and oldest is None
+    assert read == len(payload)
+
+
+def test_harvest_keeps_entries_outside_the_range(monkeypatch):
+    """harvested を渡すと、読み止めるまでに読んだ期間外の記事も残す。"""
+    harvested = []
+    (items, oldest, _complete), _logs, _read_bytes = _read(
+        monkeypatch, _rss(range(28, 0, -1)), "2026-07-20", "2026-07-21", harvested
+    )
+    assert [i["date"] for i in items] == ["2026-07-21", "2026-07-20"]
+    assert [i["date"] for i in harvested] == [f"2026-07-{d:02d}" for d in range(28, 14, -1)]
+    assert oldest == "2026-07-15"
@@ -0,0 +1,114 @@
+"""メモリを見て同時実行数を調整するガバナー(MemoryGovernor)のテスト。
+
+RSS が上限に近づいたら同時に取得・解析するページ数を半分に減らし、余裕が戻ったら
+1つずつ NEWS_FETCH_MAX_WORKERS まで戻す。判断はスクレイピングのログに残す。
+"""
+import threading
+import time
+from unittest.mock import patch
+
+import requests
+
+from app import governor, scraper
+from app.governor import MemoryGovernor
+from app.scraper import NewsScraper
+
+MB = 1024 * 1024
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += governor.SAMPLE_INTERVAL_SECONDS
+        return self.now
+
+
+def test_shrinks_near_the_ceiling_and_grows_back():
+    usage = [95 * MB]
+    gov = MemoryGovernor(8, ceiling=100 * MB, sample=lambda: usage[0], clock=_Clock())
+    gov.observe()
+    assert gov.limit == 4
+    gov.observe()
+    gov.observe()
+    gov.observe()
+    assert gov.limit == 1  # 1 より下げない
+
+    usage[0] = 80 * MB  # 減らしも増やしもしない帯
+    gov.observe()
+    assert gov.limit == 1
+
+    usage[0] = 50 * MB
+    for _ in range(20):
+        gov.observe()
+    assert gov.limit == 8  # 最大は NEWS_FETCH_MAX_WORKERS
+    assert gov.logs[0] == "Memory governor: RSS 95 MB / ceiling 100 MB. Concurrency 8 -> 4."
+    assert gov.logs[-1] == "Memory governor: RSS 50 MB / ceiling 100 MB. Concurrency 7 -> 8."
+
+
+def test_samples_at_most_once_per_interval():
+    calls = []
+    gov = MemoryGovernor(4, ceiling=100 * MB, sample=lambda: calls.append(1) or 95 * MB, clock=lambda: 1.0)
+    gov.observe()
+    gov.observe()
+    assert len(calls) == 1 and gov.limit == 2
+
+
+def test_disabled_without_a_ceiling():
+    gov = MemoryGovernor(5, ceiling=None, sample=lambda: 10 ** 12)
+    assert gov.observe() is False and gov.limit == 5 and gov.logs == []
+
+
+def test_ceiling_from_env_or_cgroup(monkeypatch, tmp_path):
+    limit_file = tmp_path / "memory.max"
+    monkeypatch.setattr(governor, "CGROUP_LIMIT_FILES", (str(limit_file),))
+    monkeypatch.setattr(governor, "MEMORY_CEILING_MB", 0)
+    assert governor.memory_ceiling_bytes() is None  # cgroup なし
+    limit_file.write_text("max\n")
+    assert governor.memory_ceiling_bytes() is None
+    limit_file.write_text(str(512 * MB))
+    assert governor.memory_ceiling_bytes() == 512 * MB * governor.CGROUP_CEILING_PERCENT // 100
+    monkeypatch.setattr(governor, "MEMORY_CEILING_MB", 300)
+    assert governor.memory_ceiling_bytes() == 300 * MB
+
+
+def test_fetches_are_throttled_under_memory_pressure(monkeypatch):
+    """RSS が上限に近いと、FETCH_MAX_WORKERS が大きくても1件ずつ取得する。"""
+    companies = [
+        {
+            "id": f"co{i}", "name": f"会社{i}", "category": "テスト",
+            "url": f"https://co{i}.fake.example/news", "scraper_type": "auto",
+            "badge_color": "#111111", "date_format": "%Y.%m.%d",
+        }
+        for i in range(6)
+    ]
+    lock = threading.Lock()
+    in_flight = {"now": 0, "max": 0}
+
+    class FakeResponse:
+        status_code = 200
+        text = '<ul><li>2026.07.06 <a href="/n/1.html">お知らせタイトルです</a></li></ul>'
+        encoding = apparent_encoding = "utf-8"
+
+    def fake_get(self, url, timeout=None, **kwargs):
+        with lock:
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        time.sleep(0.02)
+        with lock:
+            in_flight["now"] -= 1
+        return FakeResponse()
+
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    monkeypatch.setattr(scraper, "FETCH_MAX_WORKERS", 4)
+    monkeypatch.setattr(scraper, "memory_ceiling_bytes", lambda: 100 * MB)
+    monkeypatch.setattr(governor, "rss_bytes", lambda: 99 * MB)
+    monkeypatch.setattr(governor, "SAMPLE_INTERVAL_SECONDS", 0)
+    with patch.object(scraper, "COMPANIES", companies):
+        items, logs, _ = NewsScraper().fetch_news([c["id"] for c in companies], "2026-07-01", "2026-07-07")
+
+    assert len(items) == 6
+    assert in_flight["max"] == 1
+    assert "Memory governor: ceiling 100 MB, up to 4 concurrent pages." in logs
+    assert "Memory governor: RSS 99 MB / ceiling 100 MB. Concurrency 4 -> 2." in logs
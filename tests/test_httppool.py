@@ -0,0 +1,109 @@
+"""ホスト単位の Session プール(httppool)のテスト。
+
+同じホストへの取得では Session(keep-alive 接続)が使い回され、
+プールの上限・アイドル期限で古い Session が閉じられることを確認する。
+"""
+import threading
+from unittest.mock import patch
+
+import requests
+
+from app import scraper
+from app.httppool import SessionPool
+from app.scraper import NewsScraper
+
+
+class FakeResponse:
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+        self.encoding = "utf-8"
+        self.apparent_encoding = "utf-8"
+
+
+def test_same_host_reuses_session():
+    pool = SessionPool({"X-Test": "1"})
+    with pool.session("https://www.7andi.com/company/news/2026.html") as s1:
+        assert s1.headers["X-Test"] == "1"
+    with pool.session("https://www.7andi.com/company/news/2025.html") as s2:
+        pass
+    with pool.session("https://www.sej.co.jp/company/news_release/news/2026.html") as s3:
+        pass
+    assert s1 is s2
+    assert s3 is not s1
+
+
+def test_concurrent_borrowers_get_distinct_sessions():
+    """貸し出し中の Session は専有され、同じホストの同時利用には別の Session が渡る。"""
+    pool = SessionPool()
+    with pool.session("https://example.com/a") as s1:
+        with pool.session("https://example.com/b") as s2:
+            assert s1 is not s2
+
+
+def test_per_host_limit_closes_extra_sessions():
+    pool = SessionPool(per_host=1)
+    s1 = pool.acquire("https://example.com/")
+    s2 = pool.acquire("https://example.com/")
+    with patch.object(s2, "close") as close2:
+        pool.release("https://example.com/", s1)
+        pool.release("https://example.com/", s2)
+    close2.assert_called_once()
+    assert pool.idle_count("https://example.com/") == 1
+
+
+def test_idle_sessions_are_evicted(monkeypatch):
+    clock = {"now": 1000.0}
+    monkeypatch.setattr("app.httppool.time.monotonic", lambda: clock["now"])
+    pool = SessionPool(idle_seconds=60)
+    with pool.session("https://example.com/") as s1:
+        pass
+    clock["now"] += 61
+    with patch.object(s1, "close") as close1:
+        with pool.session("https://other.example/"):
+            pass
+    close1.assert_called_once()
+    assert pool.idle_count("https://example.com/") == 0
+
+
+def test_max_hosts_evicts_least_recently_used_host():
+    pool = SessionPool(max_hosts=2)
+    for host in ("a", "b", "c"):
+        with pool.session(f"https://{host}.example/"):
+            pass
+    assert pool.idle_count("https://a.example/") == 0
+    assert pool.idle_count("https://c.example/") == 1
+
+
+def test_failed_session_is_not_returned_to_pool():
+    pool = SessionPool()
+    try:
+        with pool.session("https://example.com/"):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert pool.idle_count() == 0
+
+
+def test_scraper_instances_share_pool_across_runs(monkeypatch):
+    """別々の NewsScraper(定時収集と画面からの収集)でも同じホストの Session を使い回す。"""
+    used = []
+    lock = threading.Lock()
+
+    def fake_get(self, url, timeout=None, **kwargs):
+        with lock:
+            used.append(self)
+        return FakeResponse(200, "<html><body>no news</body></html>")
+
+    company = {
+        "id": "co", "name": "会社", "category": "テスト",
+        "url": "https://shared.example/news/", "scraper_type": "auto",
+        "badge_color": "#111111", "date_format": "%Y.%m.%d",
+    }
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    monkeypatch.setattr(scraper, "HTTP_POOL", SessionPool())
+    with patch.object(scraper, "COMPANIES", [company]):
+        NewsScraper().fetch_news(["co"], "2026-07-01", "2026-07-07")
+        NewsScraper().fetch_news(["co"], "2026-07-01", "2026-07-07")
+    assert len(used) == 2
+    assert used[0] is used[1]
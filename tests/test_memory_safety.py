@@ -2,9 +2,11 @@
 
 - バッチ取得: 同時に取得・保持するページ数が FETCH_MAX_WORKERS を超えない
 - 巨大ページの切り詰め: 上限を超える HTML はメモリに載せきらない
+- 大きな本文は一時ファイルに逃がし、メモリマップからデコード・解析する
 - スケジューラ既定値: 12時間おき
 - env_int: 不正な環境変数値でアプリが落ちない
 """
+import mmap
 import threading
 import time
 from unittest.mock import patch
@@ -118,6 +120,49 @@ def test_cap_response_body_keeps_small_body_intact():
     assert r._news_truncated is False
 
 
+def test_large_body_is_spooled_to_a_memory_map(monkeypatch):
+    """しきい値を超える本文は一時ファイルに逃がし、メモリマップのまま解析まで進める。"""
+    monkeypatch.setattr(scraper, "SPOOL_THRESHOLD_BYTES", 1024)
+    rows = "".join(
+        f'<li>2026.07.0{d} <a href="/n/{d}.html">大きなページのお知らせ {d}</a></li>' for d in range(1, 8)
+    )
+    payload = ('<html><head><meta charset="utf-8"></head><body><ul>' + rows * 20 + "</ul></body></html>").encode()
+    r = _make_streaming_response(payload)
+    NewsScraper._cap_response_body(r)
+    assert isinstance(r.content, mmap.mmap)
+    assert r.content[:] == payload
+
+    company = {"id": "big", "name": "大", "badge_color": "#000", "url": "https://example.com/",
+               "date_format": "%Y.%m.%d"}
+    done, job = NewsScraper()._prepare_page(company, [r], "2026-07-06", "2026-07-07")
+    assert done is None and isinstance(job["body"], mmap.mmap)
+    assert job["encoding"] == "utf-8"
+    body = job["body"]
+    items, *_ = scraper._parse_job(job)
+    # 解析はページ上のすべての日付の記事を返す(期間内に絞るのは _finish_page)
+    assert {i["date"] for i in items} == {f"2026-07-0{d}" for d in range(1, 8)}
+    assert body.closed  # 解析後はマップを外す
+
+
+def test_small_body_stays_in_memory(monkeypatch):
+    monkeypatch.setattr(scraper, "SPOOL_THRESHOLD_BYTES", 1024)
+    r = _make_streaming_response(b"a" * 1024)
+    NewsScraper._cap_response_body(r)
+    assert type(r.content) is bytes and len(r.content) == 1024
+
+
+def test_zero_threshold_spools_every_body(monkeypatch):
+    """NEWS_SPOOL_THRESHOLD_KB=0 は、空でない本文をすべて一時ファイルに逃がす。"""
+    monkeypatch.setattr(scraper, "SPOOL_THRESHOLD_BYTES", 0)
+    r = _make_streaming_response(b"<html>tiny</html>")
+    NewsScraper._cap_response_body(r)
+    assert isinstance(r.content, mmap.mmap)
+    assert r.content[:] == b"<html>tiny</html>"
+    empty = _make_streaming_response(b"")
+    NewsScraper._cap_response_body(empty)
+    assert empty.content == b""
+
+
 def test_cap_response_body_tolerates_non_streaming_objects():
     """iter_content を持たないオブジェクト(テスト用ダミー等)はそのまま通す。"""
     fake = FakeResponse(200, "<html></html>")
@@ -0,0 +1,144 @@
+"""抽出レシピ(情報源ごとに学習した要素の位置とリンクの探し方)のテスト。
+
+記事が取れた要素の CSS セレクタと探し方を SQLite に保存し、次回はその要素だけを
+見る。0件・検証失敗のときは従来どおり全要素を走査する。
+"""
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from app import scraper, storage
+from app.scraper import NewsScraper, parse_page
+
+from test_parser_backends import COMPANY, RECORDED_PAGES
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.status_code = 200
+        self.content = text.encode("utf-8")
+        self.headers = {"Content-Type": "text/html; charset=utf-8"}
+
+
+PAGE = """<html><body><ul class="news-list">{rows}</ul>{extra}</body></html>"""
+
+
+def _rows(*days):
+    return "".join(
+        f'<li><span class="date">2026.07.{d:02d}</span><a href="/n/{d}.html">7月{d}日の新商品のお知らせです</a></li>'
+        for d in days
+    )
+
+
+def _fetch(monkeypatch, html, start="2026-07-01", end="2026-07-10", force=False):
+    monkeypatch.setattr(requests.Session, "get", lambda self, url, **kwargs: FakeResponse(html))
+    with patch.object(scraper, "COMPANIES", [COMPANY]):
+        items, logs, _ = NewsScraper().fetch_news([COMPANY["id"]], start, end, force=force)
+    return items, logs
+
+
+@pytest.mark.parametrize("name", sorted(RECORDED_PAGES))
+def test_recipe_path_matches_full_scan(name):
+    """学習したレシピで抽出しても、全要素の走査と同じ記事になる。"""
+    body = RECORDED_PAGES[name].encode("utf-8")
+    full, _, _, _, recipe = parse_page(body, "utf-8", COMPANY, "2026-05-01", "2026-07-31")
+    fast, _, logs, _, relearned = parse_page(body, "utf-8", COMPANY, "2026-05-01", "2026-07-31", recipe)
+    assert fast == full
+    if full:
+        assert any(line.startswith("Recipe:") for line in logs)
+        assert relearned == recipe
+
+
+def test_recipe_is_learned_and_used_on_the_next_run(monkeypatch):
+    _fetch(monkeypatch, PAGE.format(rows=_rows(6, 3), extra=""))
+    recipe = storage.get_recipe(COMPANY["id"], COMPANY["url"], scraper.EXTRACTOR_VERSION)
+    assert recipe == {
+        "container": {"name": "ul", "class": "news-list"},
+        "steps": [["body > ul.news-list > li", "inner"]],
+    }
+
+    items, logs = _fetch(monkeypatch, PAGE.format(rows=_rows(8, 6, 3), extra=""))
+    assert [i["date"] for i in items] == ["2026-07-08", "2026-07-06", "2026-07-03"]
+    assert any(line.startswith("Recipe: 3 items") for line in logs)
+    assert not any(line.startswith("★ MATCH: 2026-07-08 in <span>") for line in logs)
+
+
+def test_falls_back_to_full_scan_when_items_appear_elsewhere(monkeypatch):
+    """入れ物の中のレシピにない場所に期間内の記事が増えたら、全要素を走査して拾う。"""
+    _fetch(monkeypatch, PAGE.format(rows=_rows(6, 3), extra=""))
+    notice = ('<li class="notice"><p>2026年7月9日</p>'
+              '<p><a href="/important.html">重要なお知らせがあります</a></p></li>')
+    items, logs = _fetch(monkeypatch, PAGE.format(rows=notice + _rows(6, 3), extra=""))
+    assert sorted(i["date"] for i in items) == ["2026-07-03", "2026-07-06", "2026-07-09"]
+    assert any(line.startswith("Recipe validation failed") for line in logs)
+    # 新しい場所も含めて学習し直す
+    assert len(storage.get_recipe(COMPANY["id"], COMPANY["url"], scraper.EXTRACTOR_VERSION)["steps"]) == 2
+
+
+def test_unexplained_dates_in_the_container_force_a_full_scan(monkeypatch):
+    _fetch(monkeypatch, PAGE.format(rows=_rows(6, 3), extra=""))
+    items, logs = _fetch(monkeypatch, PAGE.format(rows="<li><p>2026年7月9日</p></li>" + _rows(6, 3), extra=""))
+    assert [i["date"] for i in items] == ["2026-07-06", "2026-07-03"]
+    assert "Recipe validation failed (dates outside the recipe). Running full scan." in logs
+
+
+def test_recipe_reads_only_its_container(monkeypatch):
+    """レシピは入れ物を find でたどり、入れ物の外の要素にはセレクタを当てない。"""
+    _fetch(monkeypatch, PAGE.format(rows=_rows(6, 3), extra=""))
+    footer = "<div>" + "<p>お知らせ一覧</p>" * 200 + "</div>"
+    seen = []
+    real_select = scraper.Tag.select
+
+    def recording_select(self, selector, *args, **kwargs):
+        seen.append(self.name)
+        return real_select(self, selector, *args, **kwargs)
+
+    monkeypatch.setattr(scraper.Tag, "select", recording_select)
+    items, logs = _fetch(monkeypatch, PAGE.format(rows=_rows(8, 6, 3), extra=footer))
+    assert [i["date"] for i in items] == ["2026-07-08", "2026-07-06", "2026-07-03"]
+    assert any(line.startswith("Recipe: 3 items") for line in logs)
+    assert seen == ["ul"]
+
+
+def test_missing_container_falls_back_to_full_scan(monkeypatch):
+    _fetch(monkeypatch, PAGE.format(rows=_rows(6, 3), extra=""))
+    moved = PAGE.format(rows=_rows(6, 3), extra="").replace('class="news-list"', 'class="topics"')
+    items, logs = _fetch(monkeypatch, moved)
+    assert [i["date"] for i in items] == ["2026-07-06", "2026-07-03"]
+    assert "Recipe container not found. Running full scan." in logs
+
+
+def test_falls_back_to_full_scan_when_layout_changes(monkeypatch):
+    _fetch(monkeypatch, PAGE.format(rows=_rows(6), extra=""))
+    # 同じ li でも、リンクが外(次の li)に移った
+    changed = ('<html><body><ul class="news-list"><li><span class="date">2026.07.08</span></li>'
+               '<li><a href="/n/8.html">7月8日の新商品のお知らせです</a></li></ul></body></html>')
+    items, logs = _fetch(monkeypatch, changed)
+    assert [i["url"] for i in items] == ["https://example.com/n/8.html"]
+    assert "Recipe validation failed (layout changed). Running full scan." in logs
+
+
+def test_days_without_items_keep_the_recipe(monkeypatch):
+    _fetch(monkeypatch, PAGE.format(rows=_rows(6), extra=""))
+    recipe = storage.get_recipe(COMPANY["id"], COMPANY["url"], scraper.EXTRACTOR_VERSION)
+    items, _ = _fetch(monkeypatch, PAGE.format(rows=_rows(6), extra="<p>更新</p>"), start="2026-07-20", end="2026-07-21")
+    assert items == []
+    assert storage.get_recipe(COMPANY["id"], COMPANY["url"], scraper.EXTRACTOR_VERSION) == recipe
+
+
+def test_forced_collect_and_new_extractor_relearn_the_recipe(monkeypatch):
+    """強制収集と抽出ロジックの版の変更では、保存済みのレシピを使わず学習し直す。"""
+    _fetch(monkeypatch, PAGE.format(rows=_rows(6, 3), extra=""))
+    key = (COMPANY["id"], COMPANY["url"])
+    storage.save_recipe(*key, scraper.EXTRACTOR_VERSION, {"container": None, "steps": [["p", "inner"]]})
+
+    _items, logs = _fetch(monkeypatch, PAGE.format(rows=_rows(8, 6, 3), extra=""), force=True)
+    assert not any(line.startswith("Recipe") for line in logs)
+    assert storage.get_recipe(*key, scraper.EXTRACTOR_VERSION)["steps"] == [["body > ul.news-list > li", "inner"]]
+
+    monkeypatch.setattr(scraper, "EXTRACTOR_VERSION", scraper.EXTRACTOR_VERSION + 1)
+    assert storage.get_recipe(*key, scraper.EXTRACTOR_VERSION) is None
+    _items, logs = _fetch(monkeypatch, PAGE.format(rows=_rows(9, 8, 6, 3), extra=""))
+    assert not any(line.startswith("Recipe") for line in logs)
+    assert storage.get_recipe(*key, scraper.EXTRACTOR_VERSION) is not None
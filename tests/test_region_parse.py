@@ -0,0 +1,65 @@
+"""ニュース一覧の入れ物だけを解析する(companies.py の "region")のテスト。
+
+ヘッダー・メニュー・フッターを木にせず、指定した要素の部分木だけから記事を取る。
+入れ物が見つからない・入れ物から記事が取れないときは文書全体を解析し直す。
+"""
+import pytest
+
+from app.scraper import parse_page
+
+COMPANY = {
+    "id": "regionco", "name": "リージョン社", "category": "テスト",
+    "url": "https://example.com/news/", "scraper_type": "auto",
+    "badge_color": "#111111", "date_format": "%Y.%m.%d",
+}
+
+PAGE = """<html><head><title>ニュース</title>
+<link rel="alternate" type="application/rss+xml" href="/news/feed.xml">
+<script>var updated = "2026.07.06";</script></head><body>
+<nav><ul><li>2026.07.06 <a href="/campaign.html">メニュー内のキャンペーン告知</a></li></ul></nav>
+<div id="news" class="news-list"><ul>
+  <li><span>2026.07.06</span><a href="/n/1.html">新商品の発売についてのお知らせ</a></li>
+  <li><span>2026.07.03</span><a href="/n/2.html">店舗営業時間の変更について</a></li>
+</ul></div>
+<footer><p>2026.01.01 <a href="/policy.html">プライバシーポリシー改定</a></p></footer>
+</body></html>"""
+
+
+def _parse(region, html=PAGE, start="2026-07-01", end="2026-07-07", parser="html.parser"):
+    company = {**COMPANY, "region": region, "parser": parser}
+    items, feeds, logs, status, _ = parse_page(html.encode("utf-8"), "utf-8", company, start, end)
+    assert status == ("ok", 200)
+    return items, feeds, logs
+
+
+@pytest.mark.parametrize("parser", ["html.parser", "lxml"])
+@pytest.mark.parametrize("region", [{"id": "news"}, {"name": "div", "class": "news-list"}])
+def test_region_parses_only_the_news_list(region, parser):
+    if parser == "lxml":
+        pytest.importorskip("lxml")
+    items, feeds, logs = _parse(region, parser=parser)
+    assert [i["title"] for i in items] == ["新商品の発売についてのお知らせ", "店舗営業時間の変更について"]
+    assert feeds == ["https://example.com/news/feed.xml"]  # <head> のフィード宣言は別途読む
+    assert not any("Parsing the full page" in line for line in logs)
+
+
+def test_missing_region_falls_back_to_the_full_page():
+    items, feeds, logs = _parse({"id": "renamed"})
+    assert "Region yielded no items. Parsing the full page." in logs
+    assert "メニュー内のキャンペーン告知" in [i["title"] for i in items]
+    assert feeds == ["https://example.com/news/feed.xml"]
+
+
+def test_region_with_only_older_dates_is_not_reparsed():
+    """入れ物に期間外の日付しかなければ、記事0件が正しい結果なので全体は解析しない。"""
+    items, _, logs = _parse({"id": "news"}, start="2026-07-20", end="2026-07-21")
+    assert items == []
+    assert not any("Parsing the full page" in line for line in logs)
+
+
+def test_links_outside_the_region_fall_back():
+    """期間内の日付はあるのにリンクが入れ物の外にある(レイアウト変更)なら全体を見る。"""
+    html = PAGE.replace('<div id="news" class="news-list">', '<div id="news">2026.07.05</div><div>')
+    items, _, logs = _parse({"id": "news"}, html=html)
+    assert "Region yielded no items. Parsing the full page." in logs
+    assert items
@@ -4,8 +4,14 @@
 NEWS_FETCH_MAX_WORKERS で並列数を調整できることを確認する。
 """
 import importlib
+import threading
+import time
+from unittest.mock import patch
+
+import requests
 
 from app import scraper
+from app.scraper import NewsScraper
 
 
 def test_default_fetch_max_workers_is_conservative(monkeypatch):
@@ -47,3 +53,92 @@ def test_fetch_max_workers_clamped_to_at_least_one(monkeypatch):
         finally:
             monkeypatch.delenv("NEWS_FETCH_MAX_WORKERS", raising=False)
             importlib.reload(scraper)
+
+
+def test_slow_site_does_not_stall_other_slots(monkeypatch):
+    """1サイトが遅くても、空いた枠で後続サイトの取得が進む(バッチ待ちをしない)。
+
+    co0 の応答は「最後の co4 の取得が始まるまで」返らないようにしておく。
+    以前のバッチ方式では co0 と同じバッチが終わるまで co4 は始まらず、待ちがタイムアウトする。"""
+    companies = [
+        {
+            "id": f"co{i}", "name": f"会社{i}", "category": "テスト",
+            "url": f"https://co{i}.fake.example/news", "scraper_type": "auto",
+            "badge_color": "#111111", "date_format": "%Y.%m.%d",
+        }
+        for i in range(5)
+    ]
+    last_started = threading.Event()
+    observed = {}
+
+    class FakeResponse:
+        def __init__(self, i):
+            self.status_code = 200
+            self.text = f'<ul><li>2026.07.06 <a href="/n/{i}.html">会社{i}のお知らせタイトル</a></li></ul>'
+            self.encoding = self.apparent_encoding = "utf-8"
+
+    def fake_get(self, url, timeout=None, **kwargs):
+        i = url.split("//co", 1)[1].split(".", 1)[0]
+        if i == "0":
+            observed["co4_started_while_co0_in_flight"] = last_started.wait(timeout=2)
+        elif i == "4":
+            last_started.set()
+        return FakeResponse(i)
+
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    monkeypatch.setattr(scraper, "FETCH_MAX_WORKERS", 2)
+    with patch.object(scraper, "COMPANIES", companies):
+        items, logs, checked = NewsScraper().fetch_news(
+            [c["id"] for c in companies], "2026-07-01", "2026-07-07"
+        )
+
+    assert observed["co4_started_while_co0_in_flight"] is True
+    # 完了順ではなく選択順で並ぶ
+    assert [i["title"] for i in items] == [f"会社{i}のお知らせタイトル" for i in range(5)]
+
+
+def test_same_host_is_throttled_while_other_hosts_proceed(monkeypatch):
+    """同じホストの情報源は1つずつ・間隔を空けて取得し、その間も他のホストは取得が進む。"""
+    companies = [
+        {
+            "id": cid, "name": cid, "category": "テスト", "url": url, "scraper_type": "auto",
+            "badge_color": "#111111", "date_format": "%Y.%m.%d",
+        }
+        for cid, url in [
+            ("y2026", "https://shared.example/news/2026.html"),
+            ("y2025", "https://shared.example/news/2025.html"),
+            ("y2024", "https://shared.example/news/2024.html"),
+            ("other", "https://other.example/news/"),
+        ]
+    ]
+    lock = threading.Lock()
+    in_flight = {"shared": 0, "max_shared": 0}
+    starts = {}
+
+    class FakeResponse:
+        status_code = 200
+        text = '<ul><li>2026.07.06 <a href="/n/1.html">お知らせタイトルです</a></li></ul>'
+        encoding = apparent_encoding = "utf-8"
+
+    def fake_get(self, url, timeout=None, **kwargs):
+        starts[url] = time.monotonic()
+        shared = "shared.example" in url
+        if shared:
+            with lock:
+                in_flight["shared"] += 1
+                in_flight["max_shared"] = max(in_flight["max_shared"], in_flight["shared"])
+            time.sleep(0.05)
+            with lock:
+                in_flight["shared"] -= 1
+        return FakeResponse()
+
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    monkeypatch.setattr(scraper, "FETCH_HOST_INTERVAL_MS", 200)
+    with patch.object(scraper, "COMPANIES", companies):
+        NewsScraper().fetch_news([c["id"] for c in companies], "2026-07-01", "2026-07-07")
+
+    assert in_flight["max_shared"] == 1
+    shared_starts = sorted(t for url, t in starts.items() if "shared.example" in url)
+    assert all(b - a >= 0.19 for a, b in zip(shared_starts, shared_starts[1:]))
+    # 他のホストは同じホストの順番待ちの後ろに並ばない
+    assert starts["https://other.example/news/"] < shared_starts[1]
@@ -5,6 +5,8 @@
 2. フィード(RSS/Atom)フォールバック: HTML から0件のとき、ページが宣言する
    フィードや設定済み rss_url から自動取得する自己修復
 """
+import threading
+import time
 from unittest.mock import patch
 
 import requests
@@ -188,4 +190,53 @@ def test_feed_errors_never_crash(monkeypatch):
         "/news/feed.xml": "this is not xml <<<",
     })
     assert items == []
-    assert any("Feed error" in l for l in logs)
\ No newline at end of file
+    assert any("Feed error" in l for l in logs)
+
+MULTI_FEED_HTML = """
+<html><head>
+<link rel="alternate" type="application/rss+xml" href="https://slow.example/slow-feed.xml">
+<link rel="alternate" type="application/rss+xml" href="/news/feed.xml">
+<link rel="alternate" type="application/atom+xml" href="https://atom.example/atom.xml">
+</head><body><p>JavaScript を有効にしてください。</p></body></html>
+"""
+
+
+def test_feed_candidates_are_read_in_parallel(monkeypatch):
+    """フィード候補はまとめて読み、最初に記事が取れたものを採用する
+    (遅い候補の応答を待たない)。"""
+    release = threading.Event()
+    pages = {"/press/": MULTI_FEED_HTML, "/news/feed.xml": RSS_XML, "/atom.xml": "this is not xml <<<"}
+
+    def fake_get(self, url, timeout=None, **kwargs):
+        if "slow-feed" in url:
+            release.wait(5)
+            return FakeResponse(200, ATOM_XML)
+        return _fake_get_factory(pages)(self, url)
+
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    started = time.monotonic()
+    try:
+        with patch.object(scraper, "COMPANIES", [TEST_COMPANY]):
+            items, logs, _ = NewsScraper().fetch_news([TEST_COMPANY["id"]], "2026-07-01", "2026-07-07")
+    finally:
+        release.set()
+    assert time.monotonic() - started < 2
+    assert [i["title"] for i in items] == ["新しい支援制度を開始します"]
+    assert "  -> Feed fallback: 1 items from https://example.gov/news/feed.xml" in logs
+
+
+def test_feed_fallback_keeps_company_order(monkeypatch):
+    """フィードで補った会社の結果も company_ids の順に並ぶ。"""
+    other = {**TEST_COMPANY, "id": "othergov", "name": "別の省", "url": "https://other.example/press/"}
+    pages = {
+        "example.gov/press/": RSS_DISCOVERY_HTML,
+        "/news/feed.xml": RSS_XML,
+        "other.example/press/": METI_LIKE_HTML,
+    }
+    monkeypatch.setattr(requests.Session, "get", _fake_get_factory(pages))
+    with patch.object(scraper, "COMPANIES", [TEST_COMPANY, other]):
+        items, logs, checked = NewsScraper().fetch_news([TEST_COMPANY["id"], other["id"]], "2026-07-01", "2026-07-07")
+    assert checked == ["テスト省", "別の省"]
+    assert items[0]["company_name"] == "テスト省"
+    assert {i["company_name"] for i in items[1:]} == {"別の省"}
+    assert logs.index("--- Checking 別の省 ---") > logs.index("  -> Feed fallback: 1 items from https://example.gov/news/feed.xml")
@@ -0,0 +1,176 @@
+"""同じ情報源への同時の収集を1回にまとめる(single-flight)テスト。
+
+同じプロセスの別スレッド・別ワーカー(SQLite のリース)が同じ企業を収集中なら
+自分では取得せず、その結果を DB から共有する。スクレイパーの中でも、同じページ・
+同じ期間の取得が重なれば1回だけ取得する。
+"""
+import threading
+import time
+from unittest.mock import patch
+
+import requests
+
+from app import scraper, service, storage
+from app.companies import COMPANIES
+from app.scraper import NewsScraper
+
+
+def _item(name):
+    return {
+        "company_name": name, "badge_color": "#123456", "title": "ニュースタイトルテスト",
+        "url": "https://example.com/n/1", "date": "2025-10-25",
+        "is_link_only": False, "is_error": False,
+    }
+
+
+def _lawson_name():
+    return next(c["name"] for c in COMPANIES if c["id"] == "lawson")
+
+
+def test_concurrent_requests_scrape_once(monkeypatch):
+    calls = []
+    started = threading.Event()
+
+    def fake_fetch(self, ids, start, end, force=False):
+        calls.append(list(ids))
+        started.set()
+        time.sleep(0.2)  # 2つ目のリクエストが届くまで収集中のままにする
+        self.last_status = {cid: ("ok", 200) for cid in ids}
+        return [_item(_lawson_name())], [f"=== Range: {start} ~ {end} ===", "scraped"], []
+
+    monkeypatch.setattr(NewsScraper, "fetch_news", fake_fetch)
+    results = {}
+
+    def request(key):
+        results[key] = service.get_news(["lawson"], "2025-10-25", "2025-10-25", force=True)
+
+    first = threading.Thread(target=request, args=("first",))
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=request, args=("second",))
+    second.start()
+    first.join(5)
+    second.join(5)
+
+    assert calls == [["lawson"]]
+    for items, _logs, _checked, _ in results.values():
+        assert [i["title"] for i in items] == ["ニュースタイトルテスト"]
+    assert any(": shared (1 items)" in line for line in results["second"][1])
+
+
+def test_waits_for_another_workers_lease(monkeypatch):
+    """別のワーカーがリースを持つ企業は、リースが外れたあとその結果を使う。"""
+    monkeypatch.setattr(service, "LEASE_POLL_SECONDS", 0.01)
+    monkeypatch.setattr(
+        NewsScraper, "fetch_news", lambda *a, **k: (_ for _ in ()).throw(AssertionError("must not scrape"))
+    )
+    assert storage.acquire_scrape_lease("lawson", "other-worker", 60)
+    assert not storage.acquire_scrape_lease("lawson", "this-worker", 60)
+
+    def other_worker():
+        time.sleep(0.1)
+        storage.save_items([{**_item(_lawson_name()), "company_id": "lawson"}])
+        storage.record_coverage("lawson", ["2025-10-25"], "ok", 200)
+        storage.release_scrape_leases(["lawson"], "other-worker")
+
+    thread = threading.Thread(target=other_worker)
+    thread.start()
+    items, logs, _checked, _ = service.get_news(["lawson"], "2025-10-25", "2025-10-25")
+    thread.join()
+
+    assert [i["title"] for i in items] == ["ニュースタイトルテスト"]
+    assert any(": shared (1 items)" in line for line in logs)
+    assert storage.held_scrape_leases(["lawson"]) == set()
+
+
+def test_expired_lease_is_taken_over(monkeypatch):
+    calls = []
+
+    def fake_fetch(self, ids, start, end, force=False):
+        calls.append(list(ids))
+        assert storage.held_scrape_leases(ids) == set(ids)  # 収集中は自分がリースを持つ
+        self.last_status = {cid: ("ok", 200) for cid in ids}
+        return [], [f"=== Range: {start} ~ {end} ==="], []
+
+    monkeypatch.setattr(NewsScraper, "fetch_news", fake_fetch)
+    assert storage.acquire_scrape_lease("lawson", "crashed-worker", -1)  # 期限切れ
+    service.get_news(["lawson"], "2025-10-25", "2025-10-25")
+    assert calls == [["lawson"]]
+    assert storage.held_scrape_leases(["lawson"]) == set()  # 収集後は手放す
+
+
+def test_concurrent_fetches_of_the_same_page_share_one_get(monkeypatch):
+    company = {
+        "id": "sharedco", "name": "共有社", "category": "テスト",
+        "url": "https://shared.fake.example/news", "scraper_type": "auto",
+        "badge_color": "#111111", "date_format": "%Y.%m.%d",
+    }
+    gets = []
+
+    class FakeResponse:
+        status_code = 200
+        text = '<ul><li>2026.07.06 <a href="/n/1.html">お知らせタイトルです</a></li></ul>'
+        encoding = apparent_encoding = "utf-8"
+
+    def fake_get(self, url, timeout=None, **kwargs):
+        gets.append(url)
+        time.sleep(0.2)
+        return FakeResponse()
+
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    results = []
+
+    def fetch():
+        results.append(NewsScraper().fetch_news(["sharedco"], "2026-07-01", "2026-07-07"))
+
+    with patch.object(scraper, "COMPANIES", [company]):
+        threads = [threading.Thread(target=fetch) for _ in range(2)]
+        for t in threads:
+            t.start()
+            time.sleep(0.05)
+        for t in threads:
+            t.join(5)
+
+    assert gets == [company["url"]]
+    assert [[i["title"] for i in items] for items, _logs, _ in results] == [["お知らせタイトルです"]] * 2
+    assert sum("Joined a concurrent fetch of the same page." in logs for _items, logs, _ in results) == 1
+
+
+def test_lease_is_renewed_while_collecting(monkeypatch):
+    """収集がリースの期限より長くかかっても、1社ぶん終えるたびに延ばすので奪われない。"""
+    monkeypatch.setattr(service, "SCRAPE_LEASE_SECONDS", 1)
+    held = []
+
+    def fake_fetch(self, ids, start, end, force=False):
+        time.sleep(0.7)
+        self.on_page_done(ids[0])
+        time.sleep(0.7)
+        held.append(storage.held_scrape_leases(ids))
+        held.append(storage.acquire_scrape_lease("lawson", "other-worker", 60))
+        self.last_status = {cid: ("ok", 200) for cid in ids}
+        return [], [f"=== Range: {start} ~ {end} ==="], []
+
+    monkeypatch.setattr(NewsScraper, "fetch_news", fake_fetch)
+    service.get_news(["lawson"], "2025-10-25", "2025-10-25")
+    assert held == [{"lawson"}, False]
+    assert storage.held_scrape_leases(["lawson"]) == set()
+
+
+def test_fetch_engine_reports_each_finished_page(monkeypatch):
+    class FakeResponse:
+        status_code = 200
+        text = '<ul><li>2026.07.06 <a href="/n/1.html">お知らせタイトルです</a></li></ul>'
+        encoding = apparent_encoding = "utf-8"
+
+    companies = [
+        {"id": f"co{i}", "name": f"社{i}", "category": "テスト", "url": f"https://co{i}.fake.example/news",
+         "scraper_type": "auto", "badge_color": "#111111", "date_format": "%Y.%m.%d"}
+        for i in range(3)
+    ]
+    monkeypatch.setattr(requests.Session, "get", lambda self, url, **kwargs: FakeResponse())
+    done = []
+    news = NewsScraper()
+    news.on_page_done = done.append
+    with patch.object(scraper, "COMPANIES", companies):
+        news.fetch_news([c["id"] for c in companies], "2026-07-01", "2026-07-07")
+    assert sorted(done) == ["co0", "co1", "co2"]
@@ -0,0 +1,97 @@
+"""汎用ロジックのテキスト索引(_TextIndex)のテスト。
+
+1回の走査で作る索引が、要素ごとの NFKC(get_text(" ", strip=True)) と
+同じテキスト・日付数を返すこと、深い入れ子でも抽出結果が変わらないことを確認する。
+情報源の date_format から作る日付の正規表現(date_matcher)を使っても、
+汎用の正規表現と同じ記事が取れることも確認する。
+"""
+import unicodedata
+
+import pytest
+from bs4 import BeautifulSoup
+
+from app.scraper import DATE_FLEX_FINDALL_RE, GENERIC_TARGET_TAGS, NewsScraper, _TextIndex, date_matcher
+
+MIXED_HTML = """<html><head><style>.a{}</style><script>var d = "2026.01.01";</script></head>
+<body><div class="news"><!-- 2026.02.02 -->
+  <ul><li><span>２０２６年７月６日</span> <a href="/a.html">全角ｶﾅの お知らせ</a></li>
+      <li><span>2026 . 7 . 5</span><a href="/b.html"> 半角 </a>&nbsp;</li></ul>
+  <template><div>2026.03.03</div></template>
+  <p>   </p><p><![CDATA[2026.04.04]]></p>
+</div></body></html>"""
+
+
+def test_index_matches_get_text_for_every_element():
+    soup = BeautifulSoup(MIXED_HTML, "html.parser")
+    index = _TextIndex(soup, GENERIC_TARGET_TAGS)
+    for tag in soup.find_all(True):
+        expected = unicodedata.normalize("NFKC", tag.get_text(" ", strip=True))
+        assert index.text(tag) == expected, tag.name
+        assert index.length(tag) == len(expected)
+        assert index.date_count(tag) == len(DATE_FLEX_FINDALL_RE.findall(expected))
+    assert index.targets == soup.find_all(list(GENERIC_TARGET_TAGS))
+
+
+def test_deeply_nested_page_extracts_same_items():
+    """深い入れ子の中の記事も、従来どおり1件ずつ抽出できる。"""
+    rows = "".join(
+        f'<li><span>2026.07.0{d}</span><a href="/n/{d}.html">入れ子の中のお知らせ {d}</a></li>'
+        for d in range(1, 8)
+    )
+    html = "<html><body>" + "<div>" * 300 + f"<ul>{rows}</ul>" + "</div>" * 300 + "</body></html>"
+    company = {"id": "x", "name": "X", "badge_color": "#000", "url": "https://example.com/"}
+    items = NewsScraper._extract_items(
+        company, BeautifulSoup(html, "html.parser"), "2026-07-01", "2026-07-07", []
+    )
+    assert [i["title"] for i in items] == [f"入れ子の中のお知らせ {d}" for d in range(1, 8)]
+
+
+@pytest.mark.parametrize("date_format, text, expected", [
+    ("%Y年%m月%d日", "発表日 2026 年 7月6日 です", "2026 年 7月6日"),
+    ("%Y.%m.%d", "2026.07.06 更新", "2026.07.06"),
+    ("%Y/%m/%d", "2026.07.06 更新", None),
+])
+def test_date_matcher_follows_the_declared_format(date_format, text, expected):
+    match = date_matcher(date_format).search(text)
+    assert (match.group() if match else None) == expected
+
+
+def test_date_matcher_rejects_incomplete_formats():
+    assert date_matcher("%Y-%m") is None
+    assert date_matcher("%Y年%m月%d日 %H:%M") is None
+    assert date_matcher(None) is None
+
+
+def _rows(date_text):
+    return "".join(
+        f'<li><span>{date_text(d)}</span><p>第{d}期 2026 年度の説明</p><a href="/n/{d}.html">お知らせ {d} の詳細</a></li>'
+        for d in range(1, 8)
+    )
+
+
+@pytest.mark.parametrize("html", [
+    f"<ul>{_rows(lambda d: f'2026年7月{d}日')}</ul>",
+    # 書式の違う日付が混じるページは汎用の正規表現に戻る
+    f"<ul>{_rows(lambda d: f'2026年7月{d}日' if d % 2 else f'2026.07.0{d}')}</ul>",
+    # 宣言と違う書式だけのページも同じ
+    f"<ul>{_rows(lambda d: f'2026/7/{d}')}</ul>",
+])
+def test_declared_format_extracts_same_items(html):
+    base = {"id": "x", "name": "X", "badge_color": "#000", "url": "https://example.com/"}
+    results = [
+        NewsScraper._extract_items(
+            {**base, "date_format": fmt}, BeautifulSoup(html, "html.parser"), "2026-07-02", "2026-07-05", []
+        )
+        for fmt in (None, "%Y年%m月%d日")
+    ]
+    assert [i["date"] for i in results[0]] == ["2026-07-02", "2026-07-03", "2026-07-04", "2026-07-05"]
+    assert results[1] == results[0]
+
+
+def test_declared_format_index_uses_the_targeted_matcher():
+    soup = BeautifulSoup(f"<ul>{_rows(lambda d: f'2026年7月{d}日')}</ul>", "html.parser")
+    index = _TextIndex(soup, GENERIC_TARGET_TAGS, date_matcher("%Y年%m月%d日"))
+    assert index.date_re is date_matcher("%Y年%m月%d日")
+    assert index.dates(soup.ul) == [f"2026-07-0{d}" for d in range(1, 8)]
+    assert index.dates(soup.ul, limit=2) == ["2026-07-01", "2026-07-02"]
+    assert index.date_count(soup.li.p) == 0
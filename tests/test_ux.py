@@ -5,7 +5,7 @@ from unittest.mock import patch
 from fastapi.testclient import TestClient
 
 from app import storage
-from app.main import app
+from app.main import _stale_source_warnings, app
 
 client = TestClient(app)
 
@@ -48,3 +48,11 @@ def test_no_warning_for_recent_or_ancient():
     with patch("app.main.NewsScraper.fetch_news", return_value=([], [], [])):
         res = client.get("/?companies=lawson&companies=aeon")
     assert "しばらく新着を取得できていない情報源" not in res.text
+
+
+def test_no_warning_for_finished_year_page():
+    """date_span が終わった年別ページ(前年分)は新着がなくて当然なので警告しない。"""
+    _seed("seven_2025", "セブン&アイ・HD(2025)", "2025-12-20", "https://example.com/last-year")
+    _seed("seven_2026", "セブン&アイ・HD(2026)", "2025-12-20", "https://example.com/this-year")
+    warnings = _stale_source_warnings(["seven_2025", "seven_2026"], datetime(2026, 1, 15))
+    assert [w["name"] for w in warnings] == ["セブン&アイ・HD(2026)"]